@@ -0,0 +1,195 @@
+"""
+End-to-end throughput benchmark: the real cli_downloader.download_poet pipeline
+(fetch, parse, audio download, store) against the local stand-in server, with the
+fetch workers, store workers and parse processes set the way the command-line flags
+of cli_downloader set them.
+
+Usage:
+  python benchmarks/bench_e2e.py                                   # default sweep
+  python benchmarks/bench_e2e.py --workers 1,4,8,16 --rate-ms 0,100 --poems 300
+  python benchmarks/bench_e2e.py --workers 8 --store-workers 1,2,4 --parse-procs 0,2
+  python benchmarks/bench_e2e.py --latency-ms 80 --jitter-ms 40 --error-rate 0.05 --audio-kb 1024
+  python benchmarks/bench_e2e.py --out after.json --baseline before.json
+
+Each setting runs in its own process (so CPU time and peak RSS are its own) with
+GANJOOR_BASE_URL pointing at the server and a temporary working directory.
+Reports poems/s, p50/p99 per-poem latency, CPU seconds and peak RSS; with
+--baseline, settings that got slower than --tolerance exit with status 1.
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+for p in (ROOT, SRC):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from benchmarks.fake_ganjoor import FakeGanjoor
+from profiling import profiled_main
+
+RESULTS_DIR = os.path.join("data", "metadata", "bench")
+POET, SECTION = "bench", "ghazal"
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[max(0, math.ceil(q / 100.0 * len(s)) - 1)]  # nearest rank
+
+class _Collector:
+    """Progress hook for the pipeline: keeps per-poem latency and outcome."""
+
+    def __init__(self):
+        self.latency_ms = []
+        self.ok = 0
+        self.failed = 0
+
+    def attach(self, pipeline):
+        pass
+
+    def add_total(self, poet, section_path, n):
+        pass
+
+    def update(self, res):
+        self.latency_ms.append(res.elapsed_ms)
+        if res.ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+
+def setting_key(workers: int, store_workers: int, parse_procs: int, rate_ms: int) -> str:
+    """e.g. w8_s4_p2_r0; store workers and parse processes appear only when not the defaults (2, 0)."""
+    key = f"w{workers}"
+    if store_workers != 2:
+        key += f"_s{store_workers}"
+    if parse_procs:
+        key += f"_p{parse_procs}"
+    return f"{key}_r{rate_ms}"
+
+def run_child(cfg: dict) -> dict:
+    """One setting, in this process (cwd is a scratch directory, GANJOOR_BASE_URL is set)."""
+    import cli_downloader
+    collector = _Collector()
+    cli_downloader.PIPELINE_OPTS.update(fetch_workers=cfg["workers"], store_workers=cfg["store_workers"],
+                                        parse_processes=cfg["parse_procs"], verbose=False, progress=collector)
+    modes = {POET: {SECTION: {"mode": "sh_pages", "count": cfg["poems"]}}}
+    t0 = time.perf_counter()
+    cli_downloader.download_poet(POET, modes, cfg["rate_ms"])
+    wall = time.perf_counter() - t0
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    # parse processes are children; their CPU counts once they are reaped
+    ru_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "workers": cfg["workers"],
+        "store_workers": cfg["store_workers"],
+        "parse_procs": cfg["parse_procs"],
+        "rate_ms": cfg["rate_ms"],
+        "poems": cfg["poems"],
+        "saved": collector.ok,
+        "failed": collector.failed,
+        "wall_s": round(wall, 3),
+        "poems_per_s": round(collector.ok / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(collector.latency_ms, 50), 1),
+        "p99_ms": round(percentile(collector.latency_ms, 99), 1),
+        "cpu_s": round(ru.ru_utime + ru.ru_stime + ru_children.ru_utime + ru_children.ru_stime, 3),
+        "rss_mb": round(ru.ru_maxrss / 1024.0, 1),  # KB on Linux
+        "rss_children_mb": round(ru_children.ru_maxrss / 1024.0, 1),  # largest child, not a sum
+    }
+
+def run_setting(server: FakeGanjoor, cfg: dict) -> dict:
+    env = dict(os.environ, GANJOOR_BASE_URL=server.base_url)
+    env.pop("GANJOOR_METRICS_PORT", None)
+    env.pop("GANJOOR_METRICS_FILE", None)
+    with tempfile.TemporaryDirectory() as scratch:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", json.dumps(cfg)],
+                              cwd=scratch, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"setting {cfg} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print the change against a baseline; return the settings that regressed."""
+    regressed = []
+    print(f"\n{'setting':18} {'poems/s':>18} {'p99 ms':>18}")
+    for key, r in results.items():
+        b = baseline.get(key)
+        if b is None:
+            print(f"{key:18} {'(not in baseline)':>18}")
+            continue
+        d_rate = (r["poems_per_s"] - b["poems_per_s"]) / b["poems_per_s"] if b["poems_per_s"] else 0.0
+        d_p99 = (r["p99_ms"] - b["p99_ms"]) / b["p99_ms"] if b["p99_ms"] else 0.0
+        bad = d_rate < -tolerance or d_p99 > tolerance
+        if bad:
+            regressed.append(key)
+        print(f"{key:18} {b['poems_per_s']:>7} -> {r['poems_per_s']:<7} {d_rate:+.0%}"
+              f" {b['p99_ms']:>7} -> {r['p99_ms']:<7} {d_p99:+.0%}" + ("  REGRESSED" if bad else ""))
+    return regressed
+
+def _ints(s: str):
+    return [int(x) for x in s.split(",") if x.strip()]
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        print(json.dumps(run_child(json.loads(sys.argv[2]))))
+        return
+
+    ap = argparse.ArgumentParser(description="End-to-end download benchmark against a local stand-in server")
+    ap.add_argument("--workers", type=_ints, default=[1, 4, 8], help="fetch worker counts to sweep (default 1,4,8)")
+    ap.add_argument("--store-workers", type=_ints, default=[2], help="store worker counts to sweep (default 2)")
+    ap.add_argument("--parse-procs", type=_ints, default=[0], help="parse process counts to sweep (default 0)")
+    ap.add_argument("--rate-ms", type=_ints, default=[0], help="request spacing values to sweep (default 0)")
+    ap.add_argument("--poems", type=int, default=200, help="poems per setting (default 200)")
+    ap.add_argument("--latency-ms", type=float, default=30.0, help="server latency per request (default 30)")
+    ap.add_argument("--jitter-ms", type=float, default=20.0, help="extra random latency, up to (default 20)")
+    ap.add_argument("--error-rate", type=float, default=0.01, help="fraction of requests answered 503 (default 0.01)")
+    ap.add_argument("--audio-kb", type=int, default=256, help="audio size per poem (default 256)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help=f"results JSON (default {RESULTS_DIR}/e2e-<time>.json)")
+    ap.add_argument("--baseline", help="earlier results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown vs baseline (default 0.10)")
+    args = ap.parse_args()
+
+    server_cfg = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+                  "audio_kb": args.audio_kb, "seed": args.seed}
+    results = {}
+    print(f"{'setting':18} {'saved':>6} {'failed':>6} {'poems/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'cpu s':>7} {'rss MB':>7} {'child MB':>8}")
+    settings = [(w, s, p, r) for r in args.rate_ms for p in args.parse_procs
+                for s in args.store_workers for w in args.workers]
+    for workers, store_workers, parse_procs, rate_ms in settings:
+        # a fresh server per setting keeps the injected errors identical across runs
+        server = FakeGanjoor(poems=args.poems, **server_cfg).start()
+        try:
+            r = run_setting(server, {"workers": workers, "store_workers": store_workers, "parse_procs": parse_procs,
+                                     "rate_ms": rate_ms, "poems": args.poems})
+        finally:
+            server.stop()
+        key = setting_key(workers, store_workers, parse_procs, rate_ms)
+        results[key] = r
+        print(f"{key:18} {r['saved']:>6} {r['failed']:>6} {r['poems_per_s']:>8} {r['p50_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['cpu_s']:>7} {r['rss_mb']:>7} {r.get('rss_children_mb', 0.0):>8}")
+
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("e2e-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"server": server_cfg, "poems": args.poems, "python": sys.version.split()[0],
+                   "results": results}, f, indent=2)
+    print(f"[OK] results -> {out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressed = compare(results, baseline, args.tolerance)
+        if regressed:
+            print(f"[FAIL] slower than baseline: {', '.join(regressed)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    profiled_main(main)
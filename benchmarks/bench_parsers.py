@@ -0,0 +1,186 @@
+"""
+Parser micro-benchmarks over the recorded pages in benchmarks/fixtures.
+
+Usage:
+  python benchmarks/bench_parsers.py                 # check outputs, then time every case
+  python benchmarks/bench_parsers.py --only parse    # cases whose name contains "parse"
+  python benchmarks/bench_parsers.py --repeat 100 --json before.json
+  python benchmarks/bench_parsers.py --update        # accept the current outputs as expected
+  python benchmarks/bench_parsers.py --only none --processes 0,1,2,4   # parse pool scaling
+
+Every case's output is compared with benchmarks/expected_parsers.json before it is
+timed, so an optimization that changes results fails instead of looking fast.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from extractor import parse_poem_page
+from parse_cache import ParseCache
+from parse_executor import ParseExecutor
+from subsection_finder import find_subsection_links
+from url_builder import build_poem_url
+from parser_excel import read_excel_tasks
+from profiling import profiled_main
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+EXPECTED_PATH = os.path.join(BENCH_DIR, "expected_parsers.json")
+EXCELS_DIR = os.path.join(ROOT, "inputs", "excels")
+
+POEM_PAGES = ["ghazal", "masnavi", "robaee", "qaside", "no_audio", "landing_no_sh", "empty_hemistich"]
+URL_SAMPLES = [("hafez", "ghazal"), ("attar", "divana/ghazal-attar"), ("ferdousi", "shahname/aghaz"), ("khayyam", None)]
+URLS_PER_CALL = 1000
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name + ".html"), encoding="utf-8") as f:
+        return f.read()
+
+def _build_urls():
+    return [build_poem_url(poet, sh, section) for sh in range(1, URLS_PER_CALL // len(URL_SAMPLES) + 1)
+            for poet, section in URL_SAMPLES]
+
+def _read_excels(paths):
+    out = []
+    for p in paths:
+        poet = os.path.splitext(os.path.basename(p))[0]
+        out += [[t.poet, t.book_or_style, t.subsection] for t in read_excel_tasks(poet, p)]
+    return out
+
+def cases():
+    """name -> (fn, items per call, input bytes per call)."""
+    out = {}
+    for name in POEM_PAGES:
+        html = read_fixture(name)
+        # the parsers themselves, not the parse cache in front of them
+        out[f"parse_poem_page[{name}]"] = (lambda html=html: list(parse_poem_page(html, cache=False)), 1,
+                                           len(html.encode("utf-8")))
+    ghazal = read_fixture("ghazal")
+    out["parse_poem_page[ghazal,cached]"] = (lambda: list(parse_poem_page(ghazal)), 1, len(ghazal.encode("utf-8")))
+    landing = read_fixture("landing_no_sh")
+    out["find_subsection_links[landing_no_sh]"] = (lambda: find_subsection_links(landing, "attar", "divana"), 1,
+                                                   len(landing.encode("utf-8")))
+    out["build_poem_url"] = (_build_urls, URLS_PER_CALL, 0)
+    excels = sorted(glob.glob(os.path.join(EXCELS_DIR, "*.xlsx")))
+    out["read_excel_tasks[inputs/excels]"] = (lambda: _read_excels(excels), len(excels),
+                                              sum(os.path.getsize(p) for p in excels))
+    return out
+
+def fingerprint(result) -> dict:
+    """Hash of the whole output plus a short readable summary for diffs."""
+    blob = json.dumps(result, ensure_ascii=False, sort_keys=True)
+    summary = {"items": len(result)}
+    if isinstance(result, list) and len(result) == 2 and (result[0] is None or isinstance(result[0], str)):
+        text, audio = result
+        summary = {"lines": len(text.splitlines()) if text else 0, "audio": audio}
+    return {"sha256": hashlib.sha256(blob.encode("utf-8")).hexdigest(), "summary": summary}
+
+def load_expected() -> dict:
+    if not os.path.exists(EXPECTED_PATH):
+        return {}
+    with open(EXPECTED_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def check(selected: dict, expected: dict) -> list:
+    """Names of cases whose output differs from the recorded one (or was never recorded)."""
+    bad = []
+    for name, (fn, _, _) in selected.items():
+        got = fingerprint(fn())
+        want = expected.get(name)
+        if want != got:
+            bad.append(name)
+            print(f"[MISMATCH] {name}: expected {want['summary'] if want else None}, got {got['summary']}")
+    return bad
+
+def measure(fn, items: int, nbytes: int, repeat: int) -> dict:
+    fn()  # warm-up
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    med = statistics.median(times)
+    return {
+        "calls": repeat,
+        "median_ms": round(med / items * 1000, 4),
+        "min_ms": round(min(times) / items * 1000, 4),
+        "per_s": round(items / med, 1) if med else None,
+        "peak_kb": round(peak / 1024, 1),
+        "input_kb": round(nbytes / items / 1024, 1),
+    }
+
+def parse_scaling(process_counts, rounds: int = 20) -> dict:
+    """Pages/s through a ParseExecutor per process count (0 = inline), parse cache off."""
+    pages = [read_fixture(n).encode("utf-8") for n in POEM_PAGES] * rounds
+    out, base, want = {}, None, None
+    for n in process_counts:
+        with ParseExecutor(n, inline_below=0, cache=ParseCache(max_entries=0)) as ex:
+            ex.parse_many(pages[:len(POEM_PAGES) * n])  # start the workers before timing
+            t0 = time.perf_counter()
+            poems = ex.parse_many(pages)
+            elapsed = time.perf_counter() - t0
+        got = [p.couplet_lists() for p in poems]
+        if want is None:
+            want = got
+        elif got != want:
+            raise SystemExit(f"[FAIL] parse results with {n} processes differ from {process_counts[0]}")
+        per_s = len(pages) / elapsed
+        base = base or per_s
+        out[n] = {"pages": len(pages), "pages_per_s": round(per_s, 1), "speedup": round(per_s / base, 2)}
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Parser micro-benchmarks over recorded pages")
+    ap.add_argument("--repeat", type=int, default=30, help="timed calls per case (default 30)")
+    ap.add_argument("--only", help="run cases whose name contains this text")
+    ap.add_argument("--update", action="store_true", help="record the current outputs as expected and exit")
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--processes", help="also measure parse throughput with these pool sizes, e.g. 0,1,2,4")
+    args = ap.parse_args()
+
+    selected = {k: v for k, v in cases().items() if not args.only or args.only in k}
+    if args.update:
+        expected = load_expected()
+        expected.update({name: fingerprint(fn()) for name, (fn, _, _) in selected.items()})
+        with open(EXPECTED_PATH, "w", encoding="utf-8") as f:
+            json.dump(expected, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"[OK] recorded {len(selected)} outputs -> {EXPECTED_PATH}")
+        return
+
+    bad = check(selected, load_expected())
+    if bad:
+        print(f"[FAIL] {len(bad)} case(s) changed output; fix them or re-record with --update")
+        sys.exit(1)
+
+    results = {}
+    print(f"{'case':42} {'in KB':>7} {'ms/call':>9} {'min ms':>9} {'calls/s':>10} {'peak KB':>9}")
+    for name, (fn, items, nbytes) in selected.items():
+        r = results[name] = measure(fn, items, nbytes, args.repeat)
+        print(f"{name:42} {r['input_kb']:>7} {r['median_ms']:>9} {r['min_ms']:>9} {r['per_s']:>10} {r['peak_kb']:>9}")
+    if args.processes:
+        print(f"\n{'parse processes (cpus: ' + str(os.cpu_count()) + ')':42} {'pages':>7} {'pages/s':>9} {'speedup':>9}")
+        for n, r in parse_scaling([int(x) for x in args.processes.split(",")]).items():
+            results[f"parse_pool[{n}]"] = r
+            print(f"{n:<42} {r['pages']:>7} {r['pages_per_s']:>9} {r['speedup']:>9}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] results -> {args.json}")
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -0,0 +1,124 @@
+"""
+Local stand-in for ganjoor.net used by the end-to-end benchmark and tests.
+
+  /<poet>/<section...>/sh<N>   poem page (the recorded ghazal fixture) for N <= poems, else 404
+  /audio/<poet>/<section...>/sh<N>.mp3   audio_kb of bytes
+  anything else                 empty landing page
+
+Every request waits latency_ms (+ up to jitter_ms) and fails with 503 at error_rate.
+HEAD is answered 405, so HEAD-first clients (the validator) fall back to GET.
+"""
+from __future__ import annotations
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ghazal.html")
+FIXTURE_AUDIO = "https://i.ganjoor.net/a2/41234.mp3"
+CHUNK = 64 * 1024
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients hang up mid-body when a run stops early; that is not a server error
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+class FakeGanjoor:
+    def __init__(self, poems: int = 100, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, audio_kb: int = 64, seed: int = 1, port: int = 0):
+        self.poems = poems
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.audio_kb = audio_kb
+        self.requests: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._port = port
+        self._server: Optional[_Server] = None
+        with open(FIXTURE, encoding="utf-8") as f:
+            self._page = f.read()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def _delay_and_fail(self) -> bool:
+        with self._lock:
+            jitter = self._rng.random() * self.jitter_ms
+            fail = self._rng.random() < self.error_rate
+        if self.latency_ms or jitter:
+            time.sleep((self.latency_ms + jitter) / 1000.0)
+        return fail
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: bytes = b"", ctype: str = "text/html; charset=utf-8"):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                is_audio = path.startswith("/audio/")
+                fake._count("audio" if is_audio else "page")
+                if fake._delay_and_fail():
+                    self._send(503, b"busy")
+                    return
+                m = re.search(r"/sh(\d+)(\.mp3)?$", path)
+                if m and int(m.group(1)) > fake.poems:
+                    self._send(404, b"not found")
+                elif is_audio:
+                    size = fake.audio_kb * 1024
+                    self.send_response(200)
+                    self.send_header("Content-Type", "audio/mpeg")
+                    self.send_header("Content-Length", str(size))
+                    self.end_headers()
+                    chunk = b"\0" * CHUNK
+                    while size > 0:
+                        self.wfile.write(chunk[:size])
+                        size -= CHUNK
+                elif m:
+                    audio = f"{fake.base_url}/audio{path}.mp3"
+                    self._send(200, fake._page.replace(FIXTURE_AUDIO, audio).encode("utf-8"))
+                else:
+                    self._send(200, b"<html><body><div id='garticle'></div></body></html>")
+
+            def do_HEAD(self):
+                self._send(405)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeGanjoor":
+        self._server = _Server(("127.0.0.1", self._port), self.handler())
+        threading.Thread(target=self._server.serve_forever, name="fake-ganjoor", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
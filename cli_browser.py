@@ -2,6 +2,7 @@ import os
 import sys
 import json
 import re
+import argparse
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
 SRC = os.path.join(ROOT, "src")
@@ -9,10 +10,17 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from parser_excel import read_excel_tasks
-from url_builder import build_section_url, build_poem_url
-from extractor import fetch_html, parse_poem_page
+from url_builder import BASE_URL, build_section_url, build_poem_url
+from page_cache import PageCache, Prefetcher, discover_count
+from pipeline import RateLimiter
+from profiling import profiled_main
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
+# with --prefetch, pages the user is likely to open next are fetched in the background at this pace
+BROWSE_DELAY_S = 0.3
+WARM_SECTIONS = 6
+PAGE_CACHE = PageCache()
+LIMITER = RateLimiter(BROWSE_DELAY_S)
 
 def load_modes():
     if not os.path.exists(MODES_PATH):
@@ -39,29 +47,6 @@ def to_int_safe(s: str) -> int:
         raise ValueError("invalid number")
     return int(m.group(1))
 
-def discover_count(poet: str, section_path: str) -> int:
-    # lightweight count discovery like before (exponential + binary)
-    def has_text(sh: int) -> bool:
-        try:
-            url = build_poem_url(poet, sh, section_path)
-        except Exception:
-            return False
-        html = fetch_html(url)
-        if not html: return False
-        text, _ = parse_poem_page(html)
-        return bool(text)
-
-    if not has_text(1):
-        return 0
-    lo, hi = 1, 64
-    while has_text(hi):
-        lo, hi = hi, hi * 2
-    while lo + 1 < hi:
-        mid = (lo + hi) // 2
-        if has_text(mid): lo = mid
-        else: hi = mid
-    return lo
-
 def pick(items: list[str], title: str) -> str:
     if not items:
         return ""
@@ -78,12 +63,30 @@ def pick(items: list[str], title: str) -> str:
             pass
         print("Invalid choice, try again.")
 
+def warm_landings(prefetcher: Prefetcher | None, poet: str, sections: list[str], modes: dict):
+    """Fetch landing pages the browser would need (no_sh sections without mapped nested paths)."""
+    if prefetcher is None:
+        return
+    nested = list_nested_from_modes(poet, modes)
+    urls = []
+    for sec in sections:
+        if modes.get(poet, {}).get(sec, {}).get("mode") == "no_sh" and \
+                not any(k.startswith(sec + "/") for k in nested):
+            urls.append(build_section_url(poet, sec))
+    prefetcher.submit(urls[:WARM_SECTIONS])
+
 def list_nested_from_modes(poet: str, modes: dict) -> list[str]:
     # nested paths are those containing '/'
     if poet not in modes: return []
     keys = [k for k in modes[poet].keys() if "/" in k]
     return sorted(keys)
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive Ganjoor section browser")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="fetch landing and sample pages you are likely to open next in the background")
+    return parser.parse_args(argv)
+
 def main():
     """
     Interactive CLI to browse poets -> sections -> nested sections using url_modes.json.
@@ -91,8 +94,12 @@ def main():
       - Only prints/validates URLs; does not download.
       - Shows mode and count if available.
       - Can compute count on-demand for sh_pages without count.
+      - With --prefetch, landing pages and sample pages likely to be opened next are
+        fetched in the background; without it only pages the user asks for are requested.
     """
+    args = parse_args()
     modes = load_modes()
+    prefetcher = Prefetcher(PAGE_CACHE, LIMITER) if args.prefetch else None
     poets = sorted(modes.keys())
     if not poets:
         # fallback to excels list
@@ -111,6 +118,7 @@ def main():
     l1 = sections_from_excel(poet)
     if not l1 and poet in modes:
         l1 = sorted([k for k in modes[poet].keys() if "/" not in k])
+    warm_landings(prefetcher, poet, l1, modes)
 
     section = pick(l1, f"Choose a level-1 section for {poet}")
     if not section:
@@ -128,13 +136,18 @@ def main():
     if m.get("mode") == "no_sh" and not nested_options:
         # quick derive from landing
         from subsection_finder import find_subsection_links
-        html = fetch_html(build_section_url(poet, section))
+        html = PAGE_CACHE.fetch(build_section_url(poet, section), limiter=LIMITER)
         subs = find_subsection_links(html, poet, section)
         for u in subs:
-            rel = u.replace("https://ganjoor.net","").strip("/").split("/",1)[1]
+            rel = u.replace(BASE_URL,"").strip("/").split("/",1)[1]
             nested_options.append(rel)
 
     nested_options = sorted(set(nested_options))
+    # sh1 of nested sections without a count is what "Compute count now?" fetches first
+    if prefetcher is not None:
+        prefetcher.submit([build_poem_url(poet, 1, k) for k in nested_options
+                           if modes.get(poet, {}).get(k, {}).get("mode") == "sh_pages"
+                           and "count" not in modes[poet][k]][:WARM_SECTIONS])
     if nested_options:
         nested = pick(nested_options, f"Choose nested under {section}")
         if nested:
@@ -145,7 +158,7 @@ def main():
             if mm.get("mode") == "sh_pages" and "count" not in mm:
                 ans = input("Compute count now? (y/n): ").strip().lower()
                 if ans.startswith("y"):
-                    cnt = discover_count(poet, nested)
+                    cnt = discover_count(poet, nested, PAGE_CACHE, LIMITER)
                     print(f"[COUNT] {poet}/{nested} -> {cnt}")
                     modes.setdefault(poet,{}).setdefault(nested,{})["mode"]="sh_pages"
                     modes[poet][nested]["count"] = cnt
@@ -157,4 +170,4 @@ def main():
     print("Exit.")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
@@ -1,8 +1,8 @@
 import os
 import sys
 import json
+import argparse
 import re
-import time
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
 SRC = os.path.join(ROOT, "src")
@@ -11,9 +11,29 @@ if SRC not in sys.path:
 
 from parser_excel import read_excel_tasks
 from url_builder import build_section_url, build_poem_url
-from extractor import fetch_html, parse_poem_page, store_pair
+from manifest import load_manifest
+from jobs import new_job, load_job, list_jobs
+from corpus_writer import ShardWriter
+from pipeline import Pipeline, RateLimiter, section_tasks
+from page_cache import PageCache, Prefetcher, discover_count
+from scheduler import FairScheduler, SECTION_CAP
+from planner import load_history, plan_sections, format_plan
+from budget import add_budget_args, budget_from_args
+from dashboard import Dashboard
+from profiling import profiled_main
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
+# concurrency, optional run budget and progress display of the fetch/parse/store pipeline;
+# set from the command line
+PIPELINE_OPTS = {"fetch_workers": 4, "parse_processes": 0, "store_workers": 2, "budget": None, "progress": None,
+                 "verbose": True}
+# per-poet weights and per-section in-flight cap for job runs
+SCHED_OPTS = {"weights": {}, "section_cap": SECTION_CAP}
+# pages warmed while the user types an interactive range (not during the download itself)
+PREFETCH_OPTS = {"ahead": 4}
+PAGE_CACHE = PageCache()
+# paces section-count probes outside a range download
+COUNT_LIMITER = RateLimiter(0.1)
 
 # ---------- helpers ----------
 def load_modes():
@@ -67,93 +87,182 @@ def prompt_choice(items: list[str], title: str, extras: list[str] = None) -> str
             pass
         print("Invalid choice.")
 
-def discover_count(poet: str, section_path: str) -> int:
-    def has_text(sh: int) -> bool:
-        try:
-            url = build_poem_url(poet, sh, section_path)
-        except Exception:
-            return False
-        html = fetch_html(url)
-        if not html: return False
-        text, _ = parse_poem_page(html)
-        return bool(text)
-    if not has_text(1): return 0
-    lo, hi = 1, 64
-    while has_text(hi):
-        lo, hi = hi, hi * 2
-        time.sleep(0.1)
-    while lo + 1 < hi:
-        mid = (lo + hi) // 2
-        if has_text(mid): lo = mid
-        else: hi = mid
-        time.sleep(0.05)
-    return lo
-
-def extract_range(poet: str, section_path: str, start_sh: int, end_sh: int, sleep_s: float):
-    base_dir = "data"
-    os.makedirs(base_dir, exist_ok=True)
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
-    os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-    if not os.path.exists(failed_csv):
-        with open(failed_csv, "w", encoding="utf-8") as f:
-            f.write("poet,section,sh,reason,url\n")
+def extract_range(poet: str, section_path: str, start_sh: int, end_sh: int, sleep_s: float, manifest=None, job=None, corpus=None,
+                  page_cache=None, limiter=None):
+    if PIPELINE_OPTS["progress"] is not None:
+        PIPELINE_OPTS["progress"].add_total(poet, section_path, end_sh - start_sh + 1)
+    pipe = Pipeline(rate_ms=int(sleep_s * 1000), manifest=manifest, corpus=corpus, job=job,
+                    page_cache=page_cache, limiter=limiter, **PIPELINE_OPTS)
+    stats = pipe.run(section_tasks(poet, section_path, start_sh, end_sh))
+    already = stats.get("already_done", 0)
+    if already:
+        print(f"[manifest] {poet}/{section_path}: {already} poems already done, not re-fetched")
+    return Pipeline.saved_skipped(stats)
 
-    saved, skipped = 0, 0
-    for sh in range(start_sh, end_sh + 1):
-        url = build_poem_url(poet, sh, section_path)
-        html = fetch_html(url)
-        if not html:
-            with open(failed_csv, "a", encoding="utf-8") as f:
-                f.write(f"{poet},{section_path},{sh},html_not_200,{url}\n")
-            print(f"[skip] {url} -> no HTML")
-            skipped += 1
-            time.sleep(sleep_s)
-            continue
-        text, audio = parse_poem_page(html)
-        if not text or not audio:
-            with open(failed_csv, "a", encoding="utf-8") as f:
-                f.write(f"{poet},{section_path},{sh},missing_text_or_audio,{url}\n")
-            print(f"[skip] {url} -> missing text/audio")
-            skipped += 1
-            time.sleep(sleep_s)
-            continue
-        ok = store_pair(base_dir, poet, section_path, sh, text, audio)
-        if ok:
-            print(f"[saved] {poet}/{section_path}/sh{sh}")
-            saved += 1
-        else:
-            with open(failed_csv, "a", encoding="utf-8") as f:
-                f.write(f"{poet},{section_path},{sh},audio_download_failed,{url}\n")
-            print(f"[skip] {url} -> audio download failed")
-            skipped += 1
-        time.sleep(sleep_s)
-    return saved, skipped
+def section_range(poet: str, section_path: str, modes: dict, manifest=None, job=None):
+    """(start_sh, end_sh) still to download for a sh_pages section, or None if nothing is left."""
+    cfg = modes[poet][section_path]
+    if cfg.get("mode") != "sh_pages":
+        return None
+    if job is not None:
+        job.add_section(poet, section_path, cfg.get("count"))
+        if job.section_done(poet, section_path):
+            return None
+    cnt = cfg.get("count")
+    if not cnt:
+        print(f"[INFO] discovering count for {poet}/{section_path} ...")
+        cnt = discover_count(poet, section_path, PAGE_CACHE, COUNT_LIMITER)
+        modes[poet][section_path]["count"] = cnt
+        save_modes(modes)
+        if job is not None:
+            job.set_count(poet, section_path, cnt)
+    if cnt <= 0:
+        print(f"[INFO] no poems for {poet}/{section_path}")
+        return None
+    if manifest is not None and manifest.done_count(poet, section_path) >= cnt:
+        print(f"[manifest] {poet}/{section_path}: all {cnt} poems done")
+        return None
+    start = job.next_sh(poet, section_path) if job is not None else 1
+    return start, cnt
 
-def download_poet(poet: str, modes: dict, rate_ms: int):
+def download_poet(poet: str, modes: dict, rate_ms: int, manifest=None, job=None, corpus=None):
     if poet not in modes:
         print(f"[WARN] Poet '{poet}' not in mapping; skipping.")
         return
     sleep_s = max(rate_ms, 0) / 1000.0
+    budget = PIPELINE_OPTS["budget"]
     total_saved, total_skipped = 0, 0
-    for section_path, cfg in modes[poet].items():
-        if cfg.get("mode") != "sh_pages": 
-            continue
-        cnt = cfg.get("count")
-        if not cnt:
-            print(f"[INFO] discovering count for {poet}/{section_path} ...")
-            cnt = discover_count(poet, section_path)
-            modes[poet][section_path]["count"] = cnt
-            save_modes(modes)
-        if cnt <= 0:
-            print(f"[INFO] no poems for {poet}/{section_path}")
-            continue
-        print(f"[RUN] {poet}/{section_path}: sh1..sh{cnt}")
-        s, k = extract_range(poet, section_path, 1, cnt, sleep_s)
+    ranges = []
+    for section_path in modes[poet]:
+        rng = section_range(poet, section_path, modes, manifest=manifest, job=job)
+        if rng is not None:
+            ranges.append((section_path, rng))
+    if budget is not None:
+        # inside a budget, finish the sections closest to complete first
+        ranges.sort(key=lambda r: r[1][1] - r[1][0])
+    for section_path, (start, cnt) in ranges:
+        if budget is not None and (budget.exhausted() or not budget.poet_allows(poet)):
+            print(f"[BUDGET] {budget.exhausted() or 'poet quota'} reached: {budget.summary()}")
+            break
+        print(f"[RUN] {poet}/{section_path}: sh{start}..sh{cnt}")
+        s, k = extract_range(poet, section_path, start, cnt, sleep_s, manifest=manifest, job=job, corpus=corpus)
         total_saved += s
         total_skipped += k
+        if job is not None:
+            if corpus is not None:
+                corpus.flush()
+            job.checkpoint()
     print(f"[POET DONE] {poet}: saved={total_saved}, skipped={total_skipped}")
 
+def run_job(job, modes: dict, manifest=None, corpus=None):
+    """
+    Run (or continue) a checkpointed job; Ctrl-C leaves it resumable.
+    All sections of all poets go through one pipeline, interleaved by FairScheduler,
+    so every poet gets poems early instead of waiting for the poets before it.
+    """
+    print(f"[JOB] {job.job_id} poets={len(job.poets)} rate={job.rate_ms}ms")
+    job.status = "running"
+    for p in job.poets:
+        for section_path, cfg in modes.get(p, {}).items():
+            if cfg.get("mode") == "sh_pages":
+                job.add_section(p, section_path, cfg.get("count"))
+    job.checkpoint()
+    budget = PIPELINE_OPTS["budget"]
+    sched = FairScheduler(SCHED_OPTS["weights"], SCHED_OPTS["section_cap"], budget=budget)
+    per_poet: dict[str, list[int]] = {}
+
+    def on_result(res):
+        sched.release(res)
+        if res.reason != "already_done":
+            tally = per_poet.setdefault(res.task.poet, [0, 0])
+            tally[0 if res.ok else 1] += 1
+
+    try:
+        for p in job.poets:
+            if p not in modes:
+                print(f"[WARN] Poet '{p}' not in mapping; skipping.")
+                continue
+            for section_path in modes[p]:
+                rng = section_range(p, section_path, modes, manifest=manifest, job=job)
+                if rng is not None:
+                    served = manifest.done_count(p, section_path) if manifest is not None else 0
+                    sched.add_section(p, section_path, *rng, served=served)
+                    if PIPELINE_OPTS["progress"] is not None:
+                        PIPELINE_OPTS["progress"].add_total(p, section_path, rng[1] - rng[0] + 1)
+        job.checkpoint()
+        print(f"[SCHED] {sched.pending()} poems queued, section cap={sched.section_cap}")
+        pipe = Pipeline(rate_ms=job.rate_ms, manifest=manifest, corpus=corpus, job=job,
+                        on_result=on_result, **PIPELINE_OPTS)
+        pipe.run(sched.tasks())
+        for p in sorted(per_poet):
+            print(f"[POET DONE] {p}: saved={per_poet[p][0]}, skipped={per_poet[p][1]}")
+        if budget is not None and (pipe.stopped or sched.pending()):
+            if corpus is not None:
+                corpus.flush()
+            job.finish("budget")
+            print(f"[BUDGET] {pipe.stopped or 'poet quota'} reached: {budget.summary()}")
+            print(f"[JOB] stopped within budget; continue with: python cli_downloader.py --resume {job.job_id}")
+            return
+    except KeyboardInterrupt:
+        sched.close()
+        if corpus is not None:
+            corpus.flush()
+        job.finish("interrupted")
+        print(f"\n[JOB] interrupted; resume with: python cli_downloader.py --resume {job.job_id}")
+        return
+    except Exception:
+        sched.close()
+        if corpus is not None:
+            corpus.flush()
+        job.finish("failed")
+        print(f"[JOB] failed; resume with: python cli_downloader.py --resume {job.job_id}")
+        raise
+    if corpus is not None:
+        corpus.flush()
+    job.finish("done")
+    done, total = job.progress()
+    print(f"[JOB DONE] {job.job_id}: {done}/{total} poems handled")
+
+def show_plan(poets: list[str], modes: dict, rate_ms: int, manifest=None, show_sections: bool = True):
+    """Print the estimated requests, bytes and time for downloading `poets` at the current settings."""
+    history = load_history(manifest=manifest)
+    plans = plan_sections(modes, poets, manifest=manifest, history=history, rate_ms=rate_ms,
+                          fetch_workers=PIPELINE_OPTS["fetch_workers"])
+    src = f"{history.samples} logged poems" if history.samples else "defaults (no history yet)"
+    print(f"\n== Plan: delay={rate_ms}ms, fetch workers={PIPELINE_OPTS['fetch_workers']}, estimates from {src} ==")
+    for line in format_plan(plans, show_sections=show_sections):
+        print(line)
+
 # ---------- CLI ----------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive Ganjoor downloader")
+    parser.add_argument("--resume", metavar="JOB_ID", help="continue a checkpointed download job")
+    parser.add_argument("--list-jobs", action="store_true", help="list saved jobs and exit")
+    parser.add_argument("--packed", action="store_true",
+                        help="write poem text into compressed shards under data/corpus instead of one file per poem")
+    parser.add_argument("--fetch-workers", type=int, default=4,
+                        help="concurrent page fetches (still paced by the delay; default 4)")
+    parser.add_argument("--parse-procs", type=int, default=0,
+                        help="worker processes for HTML parsing (0 = parse in-process; default 0)")
+    parser.add_argument("--store-workers", type=int, default=2,
+                        help="threads downloading audio and writing files (default 2)")
+    parser.add_argument("--plan", nargs="*", metavar="POET",
+                        help="only print the estimated cost of downloading these poets (all if none) and exit")
+    parser.add_argument("--delay-ms", type=int, default=300, help="delay assumed by --plan (default 300)")
+    parser.add_argument("--weight", action="append", default=[], metavar="POET=N",
+                        help="share of requests for a poet in multi-poet runs (default 1 each)")
+    parser.add_argument("--section-cap", type=int, default=SECTION_CAP,
+                        help=f"max poems of one section in flight at once (default {SECTION_CAP})")
+    parser.add_argument("--dashboard", action="store_true",
+                        help="live progress bars (poems/s, MB/s, errors, ETA) instead of one line per poem")
+    parser.add_argument("--quiet", action="store_true",
+                        help="no per-poem output; progress goes to data/metadata/events.jsonl every 10 s")
+    parser.add_argument("--prefetch", type=int, default=4, metavar="K",
+                        help="first pages of a range fetched while you type it; the download itself "
+                             "does not prefetch (0 = off; default 4)")
+    add_budget_args(parser)
+    return parser.parse_args(argv)
+
 def main():
     """
     Interactive downloader/browser:
@@ -163,8 +272,52 @@ def main():
         * Download all sh_pages for this poet
     - Nested navigation: option to pick a specific section_path and download partial range.
     - Rate limit: user can set delay between requests (ms).
+    - Full downloads run as checkpointed jobs under data/jobs; continue one with --resume <job_id>.
+    - --packed stores poem text in compressed shards under data/corpus.
+    - --dashboard shows live progress per poet with rate and ETA; --quiet logs it to events.jsonl.
+    - Before a full download the estimated requests/bytes/time are shown; --plan prints them only.
+    - Job runs interleave poets and sections fairly; tune with --weight POET=N and --section-cap.
+    - --max-requests/--max-bytes/--deadline/--poet-quota bound a run; a job stopped by its budget
+      is checkpointed and continues with --resume.
     """
+    args = parse_args()
+    PIPELINE_OPTS.update(fetch_workers=args.fetch_workers, parse_processes=args.parse_procs,
+                         store_workers=args.store_workers)
+    SCHED_OPTS["section_cap"] = args.section_cap
+    PREFETCH_OPTS["ahead"] = max(0, args.prefetch)
+    if args.dashboard or args.quiet:
+        PIPELINE_OPTS.update(progress=Dashboard(quiet=args.quiet), verbose=False)
+    budget = budget_from_args(args)
+    if budget.limited:
+        PIPELINE_OPTS["budget"] = budget.install()
+    for w in args.weight:
+        poet, _, n = w.partition("=")
+        SCHED_OPTS["weights"][poet.strip()] = float(n or 1)
+    if args.list_jobs:
+        for j in list_jobs():
+            done, total = j.progress()
+            print(f"{j.job_id}  status={j.status}  poets={','.join(j.poets)}  progress={done}/{total}")
+        return
+
     modes = load_modes()
+    if args.plan is not None:
+        poets = args.plan or sorted(modes.keys())
+        show_plan(poets, modes, args.delay_ms, manifest=load_manifest(), show_sections=len(poets) == 1)
+        return
+    corpus = ShardWriter() if args.packed else None
+    try:
+        if args.resume:
+            run_job(load_job(args.resume), modes, manifest=load_manifest(), corpus=corpus)
+            return
+        interactive(modes, corpus=corpus)
+    finally:
+        if PIPELINE_OPTS["progress"] is not None:
+            PIPELINE_OPTS["progress"].close()
+        if corpus is not None:
+            corpus.close()
+            print(f"[CORPUS] {corpus.records_written} poems packed into {corpus.out_dir}")
+
+def interactive(modes: dict, corpus=None):
     poets = sorted(modes.keys())
     if not poets:
         print("No poets in mapping. Build url_modes.json first.")
@@ -172,12 +325,13 @@ def main():
 
     choice_poet = prompt_choice(poets, "Choose a poet (or All at end)", extras=["All"])
     rate_ms = to_int_safe(input("Delay between requests in milliseconds (e.g., 300): ").strip() or "300", 300)
+    manifest = load_manifest()
 
     if choice_poet == "All":
+        show_plan(poets, modes, rate_ms, manifest=manifest, show_sections=False)
         print("WARNING: downloading ALL poets can be heavy and long. Proceed? (y/n)")
         if input().strip().lower().startswith("y"):
-            for p in poets:
-                download_poet(p, modes, rate_ms)
+            run_job(new_job(poets, rate_ms), modes, manifest=manifest, corpus=corpus)
         else:
             print("Cancelled.")
         return
@@ -190,9 +344,10 @@ def main():
     )
 
     if action == "Download ALL sections of this poet":
+        show_plan([poet], modes, rate_ms, manifest=manifest)
         print("WARNING: full download for this poet can be heavy. Proceed? (y/n)")
         if input().strip().lower().startswith("y"):
-            download_poet(poet, modes, rate_ms)
+            run_job(new_job([poet], rate_ms), modes, manifest=manifest, corpus=corpus)
         else:
             print("Cancelled.")
         return
@@ -236,22 +391,38 @@ def main():
         if cfg.get("mode") != "sh_pages":
             print(f"[INFO] {poet}/{target} is not marked sh_pages (mode={cfg.get('mode')}). Aborting.")
             return
+        # warm the first pages while the user answers the range prompts; the prefetcher
+        # and the download share one limiter, so the configured delay still holds. Once the
+        # run starts its fetch workers already keep the limiter busy, so nothing more is queued
+        limiter = RateLimiter(rate_ms / 1000.0)
+        prefetcher = Prefetcher(PAGE_CACHE, limiter)
+        ahead = PREFETCH_OPTS["ahead"]
+
+        def warm(first: int, last: int):
+            if ahead > 0:
+                prefetcher.submit(build_poem_url(poet, sh, target) for sh in range(first, min(first + ahead, last + 1)))
+
         cnt = cfg.get("count")
+        if cnt:
+            warm(1, cnt)
         if not cnt:
             print("[INFO] discovering count...")
-            cnt = discover_count(poet, target)
+            cnt = discover_count(poet, target, PAGE_CACHE, limiter)
             modes[poet][target] = modes.get(poet, {}).get(target, {})
             modes[poet][target]["mode"] = "sh_pages"
             modes[poet][target]["count"] = cnt
             save_modes(modes)
         print(f"Range available: 1..{cnt}")
         start = to_int_safe(input("Start sh (default 1): ").strip() or "1", 1)
+        warm(start, cnt)
         end = to_int_safe(input(f"End sh (default {cnt}): ").strip() or str(cnt), cnt)
         end = min(end, cnt)
         print(f"[RUN] downloading {poet}/{target} sh{start}..sh{end}")
-        saved, skipped = extract_range(poet, target, start, end, rate_ms/1000.0)
-        print(f"[DONE] saved={saved}, skipped={skipped}")
+        saved, skipped = extract_range(poet, target, start, end, rate_ms/1000.0, manifest=manifest, corpus=corpus,
+                                       page_cache=PAGE_CACHE, limiter=limiter)
+        prefetcher.close()
+        print(f"[DONE] saved={saved}, skipped={skipped} (prefetched pages used: {PAGE_CACHE.hits})")
         return
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
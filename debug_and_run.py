@@ -2,7 +2,6 @@ import sys
 import os
 import json
 import time
-import csv
 
 # Ensure src is importable
 ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -17,6 +16,8 @@ print("[INFO] SRC path:", SRC)
 try:
     from url_builder import build_poem_url, build_section_url
     from extractor import fetch_html, parse_poem_page, store_pair, load_modes
+    from event_log import get_event_log, ms_since
+    from profiling import profiled_main
 except Exception as e:
     print("[ERROR] Import failed:", e)
     sys.exit(2)
@@ -107,11 +108,7 @@ def ensure_sh_section(modes: dict, poet: str):
 def extract_range(poet: str, section: str, start_sh: int, end_sh: int):
     base_dir = "data"
     os.makedirs(base_dir, exist_ok=True)
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
-    os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-    if not os.path.exists(failed_csv):
-        with open(failed_csv, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(["poet", "section", "sh", "reason", "url"])
+    events = get_event_log()
 
     saved = 0
     skipped = 0
@@ -119,10 +116,10 @@ def extract_range(poet: str, section: str, start_sh: int, end_sh: int):
     for sh in range(start_sh, end_sh + 1):
         url = build_poem_url(poet, sh, section)
         print("[RUN] GET:", url)
+        t0 = time.perf_counter()
         html = fetch_html(url)
         if not html:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "html_not_200", url])
+            events.failure(poet, section, sh, "html_not_200", url, elapsed_ms=ms_since(t0))
             print("[skip]", url, "-> no HTML")
             skipped += 1
             time.sleep(0.3)
@@ -130,19 +127,18 @@ def extract_range(poet: str, section: str, start_sh: int, end_sh: int):
         text, audio = parse_poem_page(html)
         print(f"[RUN] parsed sh{sh}: text={'yes' if text else 'no'}, audio={'yes' if audio else 'no'}")
         if not text or not audio:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "missing_text_or_audio", url])
+            events.failure(poet, section, sh, "missing_text_or_audio", url, elapsed_ms=ms_since(t0))
             print("[skip]", url, "-> missing text/audio")
             skipped += 1
             time.sleep(0.3)
             continue
         ok = store_pair(base_dir, poet, section, sh, text, audio)
         if ok:
+            events.saved(poet, section, sh, url, elapsed_ms=ms_since(t0))
             print("[saved]", f"{poet}/{section}/sh{sh}")
             saved += 1
         else:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "audio_download_failed", url])
+            events.failure(poet, section, sh, "audio_download_failed", url, elapsed_ms=ms_since(t0))
             print("[skip]", url, "-> audio download failed")
             skipped += 1
         time.sleep(0.4)
@@ -177,4 +173,4 @@ def main():
     extract_range(poet, section, start_sh, end_sh)
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import argparse
 import glob
 import re
 import time
@@ -13,6 +14,9 @@ if SRC not in sys.path:
 from parser_excel import read_excel_tasks
 from url_builder import build_section_url, build_poem_url
 from extractor import fetch_html, parse_poem_page
+from budget import add_budget_args, budget_from_args
+from dashboard import Dashboard
+from profiling import profiled_main
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
 
@@ -86,7 +90,7 @@ def sections_from_excel(poet: str, excel_path: str):
 def main():
     """
     Usage:
-      python discover_sh_counts.py
+      python discover_sh_counts.py [--max-requests N] [--max-bytes 200MB] [--deadline 90m|06:30] [--poet-quota N]
     Behavior:
       - Scans inputs/excels/*.xlsx
       - For each poet:
@@ -102,7 +106,21 @@ def main():
              "section_or_nested": { "mode": "sh_pages", "count": 495 },
              ...
           }
+      - With a budget, sections without a count are done first (re-counts after them), and the
+        run stops cleanly when the budget is spent; the mapping is saved after every section.
+        --poet-quota limits the number of sections counted per poet.
+      - --dashboard replaces the per-section lines with live progress bars; --quiet writes
+        the progress to data/metadata/events.jsonl instead.
     """
+    parser = argparse.ArgumentParser(description="Discover sh counts into url_modes.json")
+    parser.add_argument("--dashboard", action="store_true", help="live progress bars instead of log lines")
+    parser.add_argument("--quiet", action="store_true", help="progress to the event log only")
+    add_budget_args(parser)
+    args = parser.parse_args()
+    budget = budget_from_args(args).install()
+    dash = Dashboard(unit="sections", quiet=args.quiet) if args.dashboard or args.quiet else None
+    say = print if dash is None else (lambda *a, **k: None)
+
     modes = load_json_safe(MODES_PATH)
     excels = sorted(glob.glob(os.path.join("inputs", "excels", "*.xlsx")))
     if not excels:
@@ -111,22 +129,24 @@ def main():
 
     for xlsx in excels:
         poet = os.path.splitext(os.path.basename(xlsx))[0].lower()
-        print("\n" + "="*70)
-        print(f"[POET] {poet}")
+        say("\n" + "="*70)
+        say(f"[POET] {poet}")
 
         if poet not in modes:
             modes[poet] = {}
 
         # Level-1 sections from Excel
         l1_sections = sections_from_excel(poet, xlsx)
-        print("[INFO] L1 from Excel:", l1_sections)
+        say("[INFO] L1 from Excel:", l1_sections)
 
         # Ensure at least minimal mapping for L1 sections (probe sh1 quickly)
         for l1 in l1_sections:
+            if budget.exhausted():
+                break
             if l1 not in modes[poet]:
                 # minimal probe to assign mode quickly
                 landing = build_section_url(poet, l1)
-                print("[CHECK] landing:", landing)
+                say("[CHECK] landing:", landing)
                 html = fetch_html(landing)
                 if not html:
                     modes[poet][l1] = {"mode": "unknown"}
@@ -136,20 +156,37 @@ def main():
                 else:
                     modes[poet][l1] = {"mode": "no_sh"}
 
-        # For every mapping entry of this poet that is sh_pages, compute count
-        for section_path, cfg in list(modes[poet].items()):
-            if cfg.get("mode") != "sh_pages":
-                continue
-            print(f"[COUNT] discovering last sh for {poet}/{section_path} ...")
+        # For every mapping entry of this poet that is sh_pages, compute count;
+        # sections that have never been counted come first
+        todo = [sp for sp, cfg in modes[poet].items() if cfg.get("mode") == "sh_pages"]
+        todo.sort(key=lambda sp: "count" in modes[poet][sp])
+        if dash is not None:
+            for section_path in todo:
+                dash.add_total(poet, section_path, 1)
+        for section_path in todo:
+            if budget.exhausted() or not budget.take(poet):
+                break
+            say(f"[COUNT] discovering last sh for {poet}/{section_path} ...")
             last_sh = find_last_sh(poet, section_path, start_guess=64)
             modes[poet][section_path]["count"] = last_sh
-            print(f"[COUNT] {poet}/{section_path} -> {last_sh}")
+            say(f"[COUNT] {poet}/{section_path} -> {last_sh}")
+            if dash is not None:
+                dash.advance(poet, section_path, ok=last_sh > 0)
+            if budget.limited:
+                save_json(MODES_PATH, modes)
 
         # Persist after each poet
         save_json(MODES_PATH, modes)
-        print("[WRITE] mapping updated:", MODES_PATH)
-
+        say("[WRITE] mapping updated:", MODES_PATH)
+        if budget.exhausted():
+            if dash is not None:
+                dash.close()
+            print(f"[BUDGET] {budget.exhausted()} reached: {budget.summary()}; rerun to continue")
+            return
+
+    if dash is not None:
+        dash.close()
     print("\n[DONE] counts discovered and written to url_modes.json")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
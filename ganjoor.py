@@ -0,0 +1,65 @@
+import os
+import sys
+import importlib
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from profiling import profiled_main
+
+# command -> (script module, summary); a script is imported only when its command runs
+COMMANDS = {
+    "browse": ("cli_browser", "browse poets/sections and their URLs from url_modes.json"),
+    "discover": ("discover_sh_counts", "discover sh counts into url_modes.json"),
+    "download": ("cli_downloader", "download poems and audio (interactive; --resume, --list-jobs, --plan, --packed, ...)"),
+    "validate": ("run_validate_urls", "probe section/poem URLs for a poet's Excel"),
+    "redrive": ("redrive_failed", "retry only the poems that failed"),
+    "worker": ("run_lease_worker", "lease-based distributed worker"),
+    "daemon": ("run_daemon", "long-running downloader with warm caches (serve/submit/status/stop)"),
+}
+
+# shown in the usage text; tests/test_cli_startup.py runs each through its command's parser
+EXAMPLES = [
+    "download --packed --dashboard",
+    "download --list-jobs",
+    "download --resume JOB_ID",
+    "download --plan hafez saadi --delay-ms 300",
+    "discover --max-requests 500 --deadline 90m",
+    "validate hafez inputs/excels/hafez.xlsx 1 2 10",
+    "redrive --reason html_not_200 --dry-run",
+    "worker --seed --poet hafez",
+    "daemon submit hafez ghazal 1 50",
+]
+
+def usage() -> str:
+    lines = ["Usage: python ganjoor.py <command> [options]   (python ganjoor.py <command> --help)", "", "Commands:"]
+    lines += [f"  {name:10} {summary}" for name, (_, summary) in COMMANDS.items()]
+    lines += ["", "Examples:"] + [f"  python ganjoor.py {e}" for e in EXAMPLES]
+    lines += ["", "Every command also accepts --profile[=PATH] and --trace[=PATH]."]
+    return "\n".join(lines)
+
+def main():
+    """
+    Single entry point for the runner scripts:
+      python ganjoor.py browse
+      python ganjoor.py download --plan hafez
+    The remaining arguments are passed to the command's own parser unchanged.
+    """
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print(usage())
+        return
+    cmd = sys.argv[1]
+    if cmd not in COMMANDS:
+        print(f"[ERROR] unknown command: {cmd}\n")
+        print(usage())
+        sys.exit(2)
+    module = importlib.import_module(COMMANDS[cmd][0])
+    sys.argv = [f"ganjoor.py {cmd}"] + sys.argv[2:]
+    module.main()
+
+if __name__ == "__main__":
+    profiled_main(main)
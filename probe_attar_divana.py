@@ -9,10 +9,11 @@ SRC = os.path.join(ROOT, "src")
 if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
-from url_builder import build_section_url, build_poem_url
+from url_builder import BASE_URL, build_section_url, build_poem_url
 from extractor import fetch_html, parse_poem_page, store_pair
+from profiling import profiled_main
 
-BASE = "https://ganjoor.net"
+BASE = BASE_URL
 
 def find_subsection_links(html: str, poet: str, section: str):
     """
@@ -117,4 +118,4 @@ def main():
     print("[DONE] Probe finished.")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
@@ -0,0 +1,58 @@
+import os
+import sys
+import argparse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from manifest import load_manifest
+from redrive import load_failures, group_by_reason, redrive, MAX_ATTEMPTS
+from profiling import profiled_main
+
+def main():
+    """
+    Usage:
+      python redrive_failed.py [--reason R ...] [--poet P] [--retries N] [--max-attempts N] [--delay-ms MS] [--dry-run]
+    Behavior:
+      - Reads data/metadata/events.jsonl (and a legacy data/metadata/failed.csv if present).
+      - Deduplicates failures per (poet, section_path, sh) and drops anything saved since.
+      - Groups what is left by reason and re-runs only those poems.
+      - Successes are logged as resolved, so the next re-drive only sees what still fails.
+    """
+    parser = argparse.ArgumentParser(description="Retry only the poems that failed")
+    parser.add_argument("--reason", action="append",
+                        help="only re-drive this reason (html_not_200, missing_text_or_audio, audio_download_failed)")
+    parser.add_argument("--poet", help="only re-drive this poet")
+    parser.add_argument("--retries", type=int, default=2, help="tries per poem in this run (default 2)")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help=f"skip poems that already failed this many times (default {MAX_ATTEMPTS})")
+    parser.add_argument("--delay-ms", type=int, default=300, help="delay between requests in ms")
+    parser.add_argument("--dry-run", action="store_true", help="only print the grouped failures")
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    failures = load_failures(manifest=manifest)
+    items = [it for it in failures.values()
+             if (not args.poet or it.poet == args.poet)
+             and (not args.reason or it.reason in args.reason)]
+    groups = group_by_reason(items)
+
+    print(f"[REDRIVE] {len(items)} unresolved poems")
+    for reason, group in groups.items():
+        print(f"  {reason}: {len(group)}")
+    if args.dry_run or not items:
+        return
+
+    totals = {"resolved": 0, "failed": 0, "gave_up": 0}
+    for reason, group in groups.items():
+        print(f"\n[REDRIVE] {reason} ({len(group)})")
+        stats = redrive(group, retries=args.retries, rate_ms=args.delay_ms,
+                        max_attempts=args.max_attempts, manifest=manifest)
+        for k, v in stats.items():
+            totals[k] += v
+    print(f"\n[DONE] resolved={totals['resolved']} still_failing={totals['failed']} gave_up={totals['gave_up']}")
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -14,7 +14,10 @@ if SRC not in sys.path:
 
 from parser_excel import read_excel_tasks
 from url_builder import build_poem_url, build_section_url
-from extractor import fetch_html, parse_poem_page, store_pair, load_modes
+from extractor import fetch_html, parse_poem_page
+from manifest import load_manifest
+from pipeline import Pipeline, section_tasks
+from profiling import profiled_main
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
 
@@ -90,45 +93,9 @@ def to_int_safe(token: str) -> int:
         raise ValueError(f"Invalid int token: {token!r}")
     return int(m.group(1))
 
-def extract_range(poet: str, section: str, start_sh: int, end_sh: int, failed_csv: str) -> tuple[int, int]:
-    base_dir = "data"
-    os.makedirs(base_dir, exist_ok=True)
-    os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-    if not os.path.exists(failed_csv):
-        with open(failed_csv, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(["poet", "section", "sh", "reason", "url"])
-
-    saved = 0
-    skipped = 0
-    for sh in range(start_sh, end_sh + 1):
-        url = build_poem_url(poet, sh, section)
-        html = fetch_html(url)
-        if not html:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "html_not_200", url])
-            print(f"[skip] {poet}/{section}/sh{sh} -> no HTML")
-            skipped += 1
-            time.sleep(0.25)
-            continue
-        text, audio = parse_poem_page(html)
-        if not text or not audio:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "missing_text_or_audio", url])
-            print(f"[skip] {poet}/{section}/sh{sh} -> missing text/audio")
-            skipped += 1
-            time.sleep(0.25)
-            continue
-        ok = store_pair(base_dir, poet, section, sh, text, audio)
-        if ok:
-            print(f"[saved] {poet}/{section}/sh{sh}")
-            saved += 1
-        else:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "audio_download_failed", url])
-            print(f"[skip] {poet}/{section}/sh{sh} -> audio download failed")
-            skipped += 1
-        time.sleep(0.35)
-    return saved, skipped
+def extract_range(poet: str, section: str, start_sh: int, end_sh: int, manifest=None) -> tuple[int, int]:
+    stats = Pipeline(rate_ms=300, manifest=manifest).run(section_tasks(poet, section, start_sh, end_sh))
+    return Pipeline.saved_skipped(stats)
 
 def main():
     """
@@ -157,7 +124,7 @@ def main():
             w = csv.writer(f)
             w.writerow(["poet", "section", "range", "saved", "skipped", "mapping_changed"])
 
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
+    manifest = load_manifest()
 
     for xlsx in files:
         poet = normalize_poet_from_filename(xlsx)
@@ -186,16 +153,16 @@ def main():
 
         # Extract sample range
         print(f"[RUN] extracting {poet}/{section} sh{start_sh}-{end_sh}")
-        saved, skipped = extract_range(poet, section, start_sh, end_sh, failed_csv)
+        saved, skipped = extract_range(poet, section, start_sh, end_sh, manifest=manifest)
 
         with open(summary_csv, "a", newline="", encoding="utf-8") as f:
             csv.writer(f).writerow([poet, section, f"sh{start_sh}-{end_sh}", saved, skipped, changed])
 
     print("\n[DONE] Batch finished. See:")
     print(" - data/metadata/summary.csv (per-poet results)")
-    print(" - data/metadata/failed.csv (skipped reasons)")
+    print(" - data/metadata/events.jsonl (saved/skipped poems with reasons)")
     print(" - inputs/config/url_modes.json (final mapping)")
     print("="*70)
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
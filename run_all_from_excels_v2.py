@@ -15,7 +15,11 @@ if SRC not in sys.path:
 
 from parser_excel import read_excel_tasks
 from url_builder import build_poem_url, build_section_url
-from extractor import fetch_html, parse_poem_page, store_pair
+from extractor import fetch_html, parse_poem_page
+from manifest import load_manifest
+from pipeline import Pipeline, section_tasks
+from profiling import profiled_main
+from verdict_cache import get_verdicts, probe_method, strip_verdict_args
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
 
@@ -47,7 +51,13 @@ def to_int_safe(token: str) -> int:
 def probe_section_mode(poet: str, section: str, sh_samples=(1, 2, 5, 10)) -> Tuple[str, dict]:
     """
     Return (mode, status_by_url). mode in {"sh_pages","no_sh","unknown"}.
+    Verdicts younger than the verdict TTL are reused instead of probing again.
     """
+    v = get_verdicts().cached(poet, section, probe_method("text", sh_samples, landing=True),
+                              lambda: _probe_section_mode(poet, section, sh_samples))
+    return v.mode, v.evidence
+
+def _probe_section_mode(poet: str, section: str, sh_samples) -> Tuple[str, dict]:
     status = {}
 
     # 1) Probe section landing
@@ -83,55 +93,20 @@ def probe_section_mode(poet: str, section: str, sh_samples=(1, 2, 5, 10)) -> Tup
         return "no_sh", status
     return "unknown", status
 
-def extract_sample(poet: str, section: str, start_sh: int, end_sh: int, failed_csv: str) -> Tuple[int, int]:
-    base_dir = "data"
-    os.makedirs(base_dir, exist_ok=True)
-    os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-    if not os.path.exists(failed_csv):
-        with open(failed_csv, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(["poet", "section", "sh", "reason", "url"])
-
-    saved = 0
-    skipped = 0
-    for sh in range(start_sh, end_sh + 1):
-        url = build_poem_url(poet, sh, section)
-        html = fetch_html(url)
-        if not html:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "html_not_200", url])
-            print(f"[skip] {poet}/{section}/sh{sh} -> no HTML")
-            skipped += 1
-            time.sleep(0.25)
-            continue
-        text, audio = parse_poem_page(html)
-        if not text or not audio:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "missing_text_or_audio", url])
-            print(f"[skip] {poet}/{section}/sh{sh} -> missing text/audio")
-            skipped += 1
-            time.sleep(0.25)
-            continue
-        ok = store_pair(base_dir, poet, section, sh, text, audio)
-        if ok:
-            print(f"[saved] {poet}/{section}/sh{sh}")
-            saved += 1
-        else:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "audio_download_failed", url])
-            print(f"[skip] {poet}/{section}/sh{sh} -> audio download failed")
-            skipped += 1
-        time.sleep(0.35)
-    return saved, skipped
+def extract_sample(poet: str, section: str, start_sh: int, end_sh: int, manifest=None) -> Tuple[int, int]:
+    stats = Pipeline(rate_ms=300, manifest=manifest).run(section_tasks(poet, section, start_sh, end_sh))
+    return Pipeline.saved_skipped(stats)
 
 def main():
     """
     Usage:
-      python run_all_from_excels_v2.py [start_sh end_sh]
+      python run_all_from_excels_v2.py [start_sh end_sh] [--verdict-ttl=12h] [--refresh-verdicts[=hafez,...]]
     Reads each Excel to get its section names (first row headers),
     determines mode per section (sh_pages / no_sh / unknown),
     updates inputs/config/url_modes.json, and extracts sample range
     only for sections marked sh_pages.
     """
+    strip_verdict_args(sys.argv)
     start_sh = to_int_safe(sys.argv[1]) if len(sys.argv) > 1 else 1
     end_sh = to_int_safe(sys.argv[2]) if len(sys.argv) > 2 else 5
 
@@ -149,7 +124,7 @@ def main():
         with open(summary_csv, "w", newline="", encoding="utf-8") as f:
             csv.writer(f).writerow(["poet", "section", "mode", "range", "saved", "skipped"])
 
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
+    manifest = load_manifest()
 
     for xlsx in files:
         poet = normalize_poet_from_filename(xlsx)
@@ -192,13 +167,13 @@ def main():
             if cfg.get("mode") != "sh_pages":
                 continue
             print(f"[RUN] extracting {poet}/{sec} sh{start_sh}-{end_sh}")
-            saved, skipped = extract_sample(poet, sec, start_sh, end_sh, failed_csv)
+            saved, skipped = extract_sample(poet, sec, start_sh, end_sh, manifest=manifest)
             with open(summary_csv, "a", newline="", encoding="utf-8") as f:
                 csv.writer(f).writerow([poet, sec, "sh_pages", f"sh{start_sh}-{end_sh}", saved, skipped])
 
     print("\n[DONE] See updated mapping at:", MODES_PATH)
     print(" - data/metadata/summary.csv (per-poet-section results)")
-    print(" - data/metadata/failed.csv (skipped reasons)")
+    print(" - data/metadata/events.jsonl (saved/skipped poems with reasons)")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
@@ -2,7 +2,6 @@ import os
 import sys
 import json
 import time
-import csv
 import glob
 import re
 
@@ -12,9 +11,12 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from parser_excel import read_excel_tasks
-from url_builder import build_section_url, build_poem_url
-from extractor import fetch_html, parse_poem_page, store_pair
+from url_builder import BASE_URL, build_section_url, build_poem_url
+from extractor import fetch_html, parse_poem_page
+from manifest import load_manifest
+from pipeline import Pipeline, PoemTask
 from subsection_finder import find_subsection_links
+from profiling import profiled_main
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
 
@@ -74,27 +76,13 @@ def probe_mode_sh(poet: str, section_path: str, sh_sample: int = 1) -> str:
     print("[RESULT] treat as no_sh")
     return "no_sh"
 
-def extract_one(poet: str, section_path: str, sh_num: int, failed_csv: str) -> tuple[bool, str]:
-    url = build_poem_url(poet, sh_num, section_path)
-    print("[RUN] GET:", url)
-    html = fetch_html(url)
-    if not html:
-        reason = "html_not_200"
-        print("[skip]", reason)
-        return False, reason
-    text, audio = parse_poem_page(html)
-    print(f"[PARSE] text={'YES' if text else 'NO'}, audio={'YES' if audio else 'NO'}")
-    if not text or not audio:
-        reason = "missing_text_or_audio"
-        print("[skip]", reason)
-        return False, reason
-    ok = store_pair("data", poet, section_path, sh_num, text, audio)
-    if not ok:
-        reason = "audio_download_failed"
-        print("[skip]", reason)
-        return False, reason
-    print("[saved]")
-    return True, "saved"
+def extract_one(poet: str, section_path: str, sh_num: int, manifest=None) -> tuple[bool, str]:
+    results = []
+    Pipeline(fetch_workers=1, manifest=manifest, on_result=results.append).run([PoemTask(poet, section_path, sh_num)])
+    res = results[0]
+    if res.reason == "already_done":
+        print(f"[done] {poet}/{section_path}/sh{sh_num} (manifest)")
+    return res.ok, res.reason
 
 def main():
     """
@@ -128,12 +116,8 @@ def main():
     if poet not in modes:
         modes[poet] = {}
 
-    # Summary files
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
-    os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-    if not os.path.exists(failed_csv):
-        with open(failed_csv, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(["poet", "section_path", "sh", "reason", "url"])
+    # Completed poems are skipped
+    manifest = load_manifest()
 
     tasks = read_excel_tasks(poet, excel_path)
     # Unique level-1 sections
@@ -155,7 +139,7 @@ def main():
 
         if mode_l1 == "sh_pages":
             print(f"[L1] extracting one poem {poet}/{l1}/sh{sh_sample}")
-            ok, reason = extract_one(poet, l1, sh_sample, failed_csv)
+            ok, reason = extract_one(poet, l1, sh_sample, manifest=manifest)
             # if saved or skipped, continue to next L1
             continue
 
@@ -171,7 +155,7 @@ def main():
 
             # Probe a few nested subsections
             for sub in subs[:10]:
-                rel = sub.replace("https://ganjoor.net", "").strip("/")
+                rel = sub.replace(BASE_URL, "").strip("/")
                 # rel looks like "attar/divana/ghazal-attar"
                 parts = rel.split("/")
                 if len(parts) < 3:
@@ -183,7 +167,7 @@ def main():
                 modes[poet][nested_path] = {"mode": mode_l2}
                 if mode_l2 == "sh_pages":
                     print(f"[L2] extracting one poem {poet}/{nested_path}/sh{sh_sample}")
-                    ok, reason = extract_one(poet, nested_path, sh_sample, failed_csv)
+                    ok, reason = extract_one(poet, nested_path, sh_sample, manifest=manifest)
                     # Stop after first success attempt at L2 to keep it short
                     break
 
@@ -196,4 +180,4 @@ def main():
     print("[DONE] run completed.")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
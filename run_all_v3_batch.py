@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import argparse
 import time
 import glob
 import csv
@@ -12,9 +13,14 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from parser_excel import read_excel_tasks
-from url_builder import build_section_url, build_poem_url
-from extractor import fetch_html, parse_poem_page, store_pair
+from url_builder import BASE_URL, build_section_url, build_poem_url
+from extractor import fetch_html, parse_poem_page
+from manifest import load_manifest
+from pipeline import Pipeline, PoemTask
+from budget import add_budget_args, budget_from_args
+from verdict_cache import add_verdict_args, get_verdicts, probe_method, verdicts_from_args
 from subsection_finder import find_subsection_links  # create src/subsection_finder.py as provided earlier
+from profiling import profiled_main
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
 
@@ -44,17 +50,28 @@ def normalize_poet_from_filename(fname: str) -> str:
     return name.strip().lower()
 
 def probe_mode_for_path(poet: str, section_path: str, sh_sample: int = 1) -> str:
+    cache = get_verdicts()
+    hits = cache.hits
+    v = cache.cached(poet, section_path, probe_method("text", [sh_sample], landing=True),
+                     lambda: _probe_mode(poet, section_path, sh_sample))
+    if cache.hits > hits:
+        print(f"[CACHED] {poet}/{section_path} -> {v.mode} (checked {time.strftime('%Y-%m-%d %H:%M', time.localtime(v.checked_at))})")
+    return v.mode
+
+def _probe_mode(poet: str, section_path: str, sh_sample: int):
+    evidence = {}
     # landing
     try:
         landing = build_section_url(poet, section_path)
     except Exception:
         print(f"[ERR] build_section_url failed for {poet}/{section_path}")
-        return "unknown"
+        return "unknown", evidence
     print("[CHECK] landing:", landing)
     html = fetch_html(landing)
+    evidence[landing] = 200 if html else 0
     if not html:
         print("[RESULT] landing HTML=NO -> unknown")
-        return "unknown"
+        return "unknown", evidence
     # sh sample
     try:
         p_url = build_poem_url(poet, sh_sample, section_path)
@@ -63,43 +80,31 @@ def probe_mode_for_path(poet: str, section_path: str, sh_sample: int = 1) -> str
     if p_url:
         print("[CHECK] sample poem:", p_url)
         html2 = fetch_html(p_url)
+        evidence[p_url] = 200 if html2 else 0
         if html2:
             text, _audio = parse_poem_page(html2)
             print("[RESULT] sh text? ->", "YES" if text else "NO")
             if text:
-                return "sh_pages"
+                return "sh_pages", evidence
     print("[RESULT] treat as no_sh")
-    return "no_sh"
-
-def extract_one(poet: str, section_path: str, sh_num: int, failed_csv: str):
-    url = build_poem_url(poet, sh_num, section_path)
-    print("[RUN] GET:", url)
-    html = fetch_html(url)
-    if not html:
-        with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([poet, section_path, sh_num, "html_not_200", url])
-        print("[skip] no HTML")
-        return False
-    text, audio = parse_poem_page(html)
-    print(f"[PARSE] text={'YES' if text else 'NO'}, audio={'YES' if audio else 'NO'}")
-    if not text or not audio:
-        with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([poet, section_path, sh_num, "missing_text_or_audio", url])
-        print("[skip] missing text/audio")
+    return "no_sh", evidence
+
+def extract_one(poet: str, section_path: str, sh_num: int, manifest=None, budget=None):
+    results = []
+    Pipeline(fetch_workers=1, manifest=manifest, on_result=results.append,
+             budget=budget).run([PoemTask(poet, section_path, sh_num)])
+    if not results:
+        print(f"[BUDGET] {poet}/{section_path}/sh{sh_num} not fetched")
         return False
-    ok = store_pair("data", poet, section_path, sh_num, text, audio)
-    if not ok:
-        with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([poet, section_path, sh_num, "audio_download_failed", url])
-        print("[skip] audio download failed")
-        return False
-    print("[saved]")
-    return True
+    res = results[0]
+    if res.reason == "already_done":
+        print(f"[done] {poet}/{section_path}/sh{sh_num} (manifest)")
+    return res.ok
 
 def main():
     """
     Usage:
-      python run_all_v3_batch.py [sh_sample]
+      python run_all_v3_batch.py [sh_sample] [--max-requests N] [--max-bytes 200MB] [--deadline 90m|06:30] [--poet-quota N]
     Behavior:
       - Scans inputs/excels/*.xlsx and processes every poet automatically.
       - Level-1 sections from Excel header are probed:
@@ -108,9 +113,18 @@ def main():
               - decide mode; if sh_pages -> extract one poem and move on.
           * unknown: record only.
       - All probed URLs are printed; modes are written to inputs/config/url_modes.json cumulatively.
-      - Results go to data/text, data/audio, and data/metadata/{summary.csv,failed.csv}.
+      - Results go to data/text, data/audio, and data/metadata/summary.csv and data/metadata/events.jsonl.
+      - With a budget, sections not yet in url_modes.json are probed first; the run stops cleanly
+        (mapping saved) when the budget is spent. --poet-quota caps sample poems per poet.
     """
-    sh_sample = to_int_safe(sys.argv[1]) if len(sys.argv) > 1 else 1
+    parser = argparse.ArgumentParser(description="Probe all Excel sections and extract one sample poem each")
+    parser.add_argument("sh_sample", nargs="?", default="1")
+    add_budget_args(parser)
+    add_verdict_args(parser)
+    args = parser.parse_args()
+    verdicts_from_args(args)
+    sh_sample = to_int_safe(args.sh_sample)
+    budget = budget_from_args(args).install()
 
     excels = sorted(glob.glob(os.path.join("inputs", "excels", "*.xlsx")))
     if not excels:
@@ -119,16 +133,12 @@ def main():
 
     modes = load_json_safe(MODES_PATH)
     summary_csv = os.path.join("data", "metadata", "summary.csv")
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
     os.makedirs(os.path.dirname(summary_csv), exist_ok=True)
     if not os.path.exists(summary_csv):
         with open(summary_csv, "w", newline="", encoding="utf-8") as f:
             csv.writer(f).writerow(["poet", "section_path", "mode", "saved_one", "note"])
 
-    if not os.path.exists(failed_csv):
-        os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-        with open(failed_csv, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(["poet", "section_path", "sh", "reason", "url"])
+    manifest = load_manifest()
 
     for xlsx in excels:
         poet = normalize_poet_from_filename(xlsx)
@@ -154,8 +164,12 @@ def main():
                 lvl1_sections.append(sec)
 
         print(f"[INFO] L1 sections:", lvl1_sections)
+        # unprobed sections are the most valuable work
+        lvl1_sections.sort(key=lambda sec: sec in modes[poet])
 
         for l1 in lvl1_sections:
+            if budget.exhausted():
+                break
             print("-"*60)
             print(f"[L1] {poet}/{l1}")
             mode_l1 = probe_mode_for_path(poet, l1, sh_sample=sh_sample)
@@ -163,7 +177,7 @@ def main():
             saved_flag = False
 
             if mode_l1 == "sh_pages":
-                saved_flag = extract_one(poet, l1, sh_sample, failed_csv)
+                saved_flag = extract_one(poet, l1, sh_sample, manifest=manifest, budget=budget)
 
             elif mode_l1 == "no_sh":
                 # Explore nested subsections
@@ -176,7 +190,9 @@ def main():
                     print("   *", u)
                 # Probe nested
                 for sub in subs:
-                    rel = sub.replace("https://ganjoor.net", "").strip("/")
+                    if budget.exhausted():
+                        break
+                    rel = sub.replace(BASE_URL, "").strip("/")
                     parts = rel.split("/")
                     if len(parts) < 3:
                         continue
@@ -185,7 +201,7 @@ def main():
                     mode_l2 = probe_mode_for_path(poet, nested_path, sh_sample=sh_sample)
                     modes[poet][nested_path] = {"mode": mode_l2}
                     if mode_l2 == "sh_pages" and not saved_flag:
-                        saved_flag = extract_one(poet, nested_path, sh_sample, failed_csv)
+                        saved_flag = extract_one(poet, nested_path, sh_sample, manifest=manifest, budget=budget)
                         # Keep scanning others for mapping, but only save one sample per L1
 
             # unknown -> nothing to extract, just record
@@ -196,9 +212,13 @@ def main():
             # Persist after each L1 to keep progress
             save_json(MODES_PATH, modes)
 
+        if budget.exhausted():
+            print(f"\n[BUDGET] {budget.exhausted()} reached: {budget.summary()}; rerun to continue")
+            break
+
     print("\n[FINAL] url_modes.json updated at:", MODES_PATH)
-    print("See data/metadata/summary.csv and failed.csv for results.")
+    print("See data/metadata/summary.csv and events.jsonl for results.")
     print("="*80)
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
@@ -3,7 +3,6 @@ import sys
 import json
 import time
 import re
-import csv
 
 # Import path
 ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -13,7 +12,10 @@ if SRC not in sys.path:
 
 from parser_excel import read_excel_tasks
 from url_builder import build_section_url, build_poem_url
-from extractor import fetch_html, parse_poem_page, store_pair
+from extractor import fetch_html, parse_poem_page
+from manifest import load_manifest
+from pipeline import Pipeline, PoemTask
+from profiling import profiled_main
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
 EXCEL_PATH = os.path.join("inputs", "excels", "attar.xlsx")
@@ -73,41 +75,16 @@ def probe_section_mode(poet: str, section: str, sh_sample: int = 1):
         return "no_sh"
     return "unknown"
 
-def extract_one(poet: str, section: str, sh_num: int):
+def extract_one(poet: str, section: str, sh_num: int, manifest=None):
     """
     Extract exactly one poem; save only if both text and audio exist.
     """
-    base_dir = "data"
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
-    os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-    if not os.path.exists(failed_csv):
-        with open(failed_csv, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(["poet", "section", "sh", "reason", "url"])
-
-    url = build_poem_url(poet, sh_num, section)
-    html = fetch_html(url)
-    if not html:
-        with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([poet, section, sh_num, "html_not_200", url])
-        print(f"[skip] {url} -> no HTML")
-        return False
-
-    text, audio = parse_poem_page(html)
-    if not text or not audio:
-        with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([poet, section, sh_num, "missing_text_or_audio", url])
-        print(f"[skip] {url} -> missing text/audio")
-        return False
-
-    ok = store_pair(base_dir, poet, section, sh_num, text, audio)
-    if ok:
-        print(f"[saved] {poet}/{section}/sh{sh_num}")
-        return True
-    else:
-        with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([poet, section, sh_num, "audio_download_failed", url])
-        print(f"[skip] {url} -> audio download failed")
-        return False
+    results = []
+    Pipeline(fetch_workers=1, manifest=manifest, on_result=results.append).run([PoemTask(poet, section, sh_num)])
+    res = results[0]
+    if res.reason == "already_done":
+        print(f"[done] {poet}/{section}/sh{sh_num} (manifest)")
+    return res.ok
 
 def main():
     """
@@ -152,10 +129,10 @@ def main():
     # If we found a sh_pages section, extract exactly one poem (sh1)
     if first_ok_section:
         print(f"[RUN] extracting one poem: {poet}/{first_ok_section}/sh{sh_sample}")
-        ok = extract_one(poet, first_ok_section, sh_sample)
+        ok = extract_one(poet, first_ok_section, sh_sample, manifest=load_manifest())
         print("[DONE] result:", "saved" if ok else "skipped")
     else:
         print("[DONE] No section detected as sh_pages. Consider validator for attar or manual mapping.")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
@@ -1,8 +1,6 @@
 import sys
 import os
 import json
-import time
-import csv
 
 # import path
 ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -11,7 +9,11 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from url_builder import build_poem_url, build_section_url
-from extractor import fetch_html, parse_poem_page, store_pair, load_modes
+from extractor import fetch_html, parse_poem_page, load_modes
+from manifest import load_manifest
+from pipeline import Pipeline, section_tasks
+from profiling import profiled_main
+from verdict_cache import get_verdicts, probe_method, strip_verdict_args
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
 
@@ -38,18 +40,24 @@ def pick_sh_section(modes: dict, poet: str):
 
 def probe_section(poet: str, section: str, sh_samples=(1,2,5,10)):
     # Return True if any poem URL in samples returns HTML 200 and parseable text
-    ok_any = False
+    v = get_verdicts().cached(poet, section, probe_method("text", sh_samples),
+                              lambda: _probe_section(poet, section, sh_samples))
+    return v.mode == "sh_pages"
+
+def _probe_section(poet: str, section: str, sh_samples):
+    status = {}
     for sh in sh_samples:
         url = build_poem_url(poet, sh, section)
         html = fetch_html(url)
+        status[url] = 200 if html else 0
         if not html:
             continue
         text, audio = parse_poem_page(html)
         # موفقیت برای شناسایی الگو: وجود متن کافی است؛ الزام همزمان متن+خوانش را در ذخیره‌سازی رعایت می‌کنیم
         if text:
-            ok_any = True
-            break
-    return ok_any
+            return "sh_pages", status
+    # no sample page answered at all: nothing to remember
+    return ("no_sh" if any(status.values()) else "unknown"), status
 
 def ensure_sh_section(modes: dict, poet: str):
     # If poet not present, create empty
@@ -80,46 +88,9 @@ def ensure_sh_section(modes: dict, poet: str):
     # 3) fallback: no sh_pages found
     return None, False
 
-def extract_range(poet: str, section: str, start_sh: int, end_sh: int):
-    base_dir = "data"
-    os.makedirs(base_dir, exist_ok=True)
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
-    os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-    if not os.path.exists(failed_csv):
-        with open(failed_csv, "w", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(["poet", "section", "sh", "reason", "url"])
-
-    saved = 0
-    skipped = 0
-    for sh in range(start_sh, end_sh + 1):
-        url = build_poem_url(poet, sh, section)
-        html = fetch_html(url)
-        if not html:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "html_not_200", url])
-            print(f"[skip] {url} -> no HTML")
-            skipped += 1
-            time.sleep(0.3)
-            continue
-        text, audio = parse_poem_page(html)
-        if not text or not audio:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "missing_text_or_audio", url])
-            print(f"[skip] {url} -> missing text/audio")
-            skipped += 1
-            time.sleep(0.3)
-            continue
-        ok = store_pair(base_dir, poet, section, sh, text, audio)
-        if ok:
-            print(f"[saved] {poet}/{section}/sh{sh}")
-            saved += 1
-        else:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "audio_download_failed", url])
-            print(f"[skip] {url} -> audio download failed")
-            skipped += 1
-        time.sleep(0.4)
-    return saved, skipped
+def extract_range(poet: str, section: str, start_sh: int, end_sh: int, manifest=None):
+    stats = Pipeline(rate_ms=400, manifest=manifest).run(section_tasks(poet, section, start_sh, end_sh))
+    return Pipeline.saved_skipped(stats)
 
 def main():
     """
@@ -127,7 +98,9 @@ def main():
       python run_autofix_and_extract.py <poet_slug> [start_sh end_sh]
     Example:
       python run_autofix_and_extract.py hafez 1 5
+    --verdict-ttl=T and --refresh-verdicts[=POET,...] control reuse of earlier section probes.
     """
+    strip_verdict_args(sys.argv)
     if len(sys.argv) < 2:
         print("Usage: python run_autofix_and_extract.py <poet_slug> [start_sh end_sh]")
         sys.exit(1)
@@ -150,5 +123,8 @@ def main():
             print(f"Updated mapping: {poet}/{section} -> sh_pages written to {MODES_PATH}")
 
     print(f"Extracting poet={poet} section={section} sh{start_sh}-{end_sh}")
-    saved, skipped = extract_range(poet, section, start_sh, end_sh)
-    print
+    saved, skipped = extract_range(poet, section, start_sh, end_sh, manifest=load_manifest())
+    print(f"Done. saved={saved}, skipped={skipped}")
+
+if __name__ == "__main__":
+    profiled_main(main)
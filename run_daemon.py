@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import argparse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from daemon import Daemon, SOCKET_PATH, send
+from profiling import profiled_main
+
+def show(reply: dict):
+    if not reply.get("ok"):
+        print(f"[ERROR] {reply.get('error')}")
+        sys.exit(1)
+    if "jobs" in reply:
+        print(f"[DAEMON] up {reply['uptime_s']}s, queued={reply['queued']}, running={reply['current']}, "
+              f"rate={reply['rate_ms']}ms, page cache={reply['page_cache']}")
+        for j in reply["jobs"]:
+            print(f"  job {j['job_id']:>3} {j['status']:8} {j['poet']}/{j['section'] or '*'} {j['stats']}"
+                  + (f" error={j['error']}" if j["error"] else ""))
+    else:
+        print(json.dumps(reply, ensure_ascii=False, indent=2))
+
+def main():
+    """
+    Usage:
+      python run_daemon.py serve [--rate-ms 300] [--fetch-workers 4] [--parse-processes 0]
+      python run_daemon.py submit <poet> [section] [start end]
+      python run_daemon.py status [job_id]
+      python run_daemon.py catalog <poet>
+      python run_daemon.py stop
+    The daemon keeps HTTP connections, the catalog, the page cache, the manifest and the
+    parse pool warm between jobs; clients only talk to its Unix socket.
+    """
+    parser = argparse.ArgumentParser(description="Long-running downloader daemon and its client")
+    parser.add_argument("--socket", default=SOCKET_PATH, help=f"Unix socket (default {SOCKET_PATH})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve", help="run the daemon in the foreground")
+    p.add_argument("--rate-ms", type=int, default=300, help="spacing between requests, shared by all jobs")
+    p.add_argument("--fetch-workers", type=int, default=4)
+    p.add_argument("--parse-processes", type=int, default=0, help="parse pool kept warm across jobs")
+    p = sub.add_parser("submit", help="queue a download")
+    p.add_argument("poet")
+    p.add_argument("section", nargs="?", help="section path (default: all sh_pages sections)")
+    p.add_argument("start", nargs="?", type=int)
+    p.add_argument("end", nargs="?", type=int)
+    p = sub.add_parser("status", help="daemon and job status")
+    p.add_argument("job", nargs="?")
+    p = sub.add_parser("catalog", help="sections of a poet as the daemon sees them")
+    p.add_argument("poet")
+    sub.add_parser("ping")
+    sub.add_parser("stop", help="finish the running job and exit")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        d = Daemon(args.socket, rate_ms=args.rate_ms, fetch_workers=args.fetch_workers,
+                   parse_processes=args.parse_processes)
+        try:
+            d.serve()
+        except KeyboardInterrupt:
+            print("\n[DAEMON] stopping ...")
+        finally:
+            if d.pool is not None:
+                d.pool.close()  # worker processes would otherwise outlive an interrupted daemon
+        return
+
+    msg = {k: v for k, v in vars(args).items() if k not in ("socket",) and v is not None}
+    try:
+        reply = send(msg, args.socket)
+    except OSError as e:
+        print(f"[ERROR] no daemon on {args.socket} ({e}); start one with: python run_daemon.py serve")
+        sys.exit(2)
+    show(reply)
+
+if __name__ == "__main__":
+    profiled_main(main)
@@ -1,15 +1,15 @@
 import sys
 import os
-import csv
-import time
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
 SRC = os.path.join(ROOT, "src")
 if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
-from url_builder import build_poem_url
-from extractor import fetch_html, parse_poem_page, store_pair, load_modes
+from extractor import load_modes
+from manifest import load_manifest
+from pipeline import Pipeline, section_tasks
+from profiling import profiled_main
 
 def pick_first_sh_pages_section(modes: dict, poet: str) -> str:
     if poet not in modes:
@@ -45,46 +45,12 @@ def main():
     section = pick_first_sh_pages_section(modes, poet)
     print(f"Poet={poet} | Section={section} | Range sh{start_sh}..sh{end_sh}")
 
-    # Prepare failed log
-    failed_csv = os.path.join("data", "metadata", "failed.csv")
-    os.makedirs(os.path.dirname(failed_csv), exist_ok=True)
-    if not os.path.exists(failed_csv):
-        with open(failed_csv, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["poet", "section", "sh", "reason", "url"])
-
-    # Iterate and extract
-    base_dir = os.path.join("data")
-    os.makedirs(base_dir, exist_ok=True)
-
-    for sh in range(start_sh, end_sh + 1):
-        url = build_poem_url(poet, sh, section)
-        html = fetch_html(url)
-        if not html:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "html_not_200", url])
-            print(f"[skip] {url} -> no HTML")
-            time.sleep(0.3)
-            continue
-
-        text, audio = parse_poem_page(html)
-        if not text or not audio:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "missing_text_or_audio", url])
-            print(f"[skip] {url} -> missing text/audio")
-            time.sleep(0.3)
-            continue
-
-        ok = store_pair(base_dir, poet, section, sh, text, audio)
-        if ok:
-            print(f"[saved] sh{sh}")
-        else:
-            with open(failed_csv, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow([poet, section, sh, "audio_download_failed", url])
-            print(f"[skip] {url} -> audio download failed")
-        time.sleep(0.4)
+    # Iterate and extract; completed poems are skipped via the manifest
+    stats = Pipeline(rate_ms=400, manifest=load_manifest()).run(section_tasks(poet, section, start_sh, end_sh))
+    saved, skipped = Pipeline.saved_skipped(stats)
+    print(f"saved={saved} skipped={skipped} already_done={stats.get('already_done', 0)}")
 
     print("Done sample extraction.")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from lease_queue import ChunkSizer, LeaseQueue, LEASES_PATH, LEASE_SECONDS, UNIT_SIZE
+from manifest import load_manifest
+from pipeline import Pipeline, PoemTask
+from profiling import profiled_main
+
+MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
+
+def load_modes():
+    if not os.path.exists(MODES_PATH):
+        return {}
+    with open(MODES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def heartbeat_loop(db_path: str, lease_s: float, unit_id: int, worker_id: str, stop: threading.Event, lost: threading.Event):
+    # own connection: sqlite3 connections are not shared across threads
+    q = LeaseQueue(db_path, lease_seconds=lease_s)
+    try:
+        while not stop.wait(max(lease_s / 3.0, 1.0)):
+            if not q.heartbeat(unit_id, worker_id):
+                print(f"[LEASE] lost lease on unit {unit_id}")
+                lost.set()
+                return
+    finally:
+        q.close()
+
+def unit_tasks(db_path: str, unit, worker_id: str):
+    """
+    Tasks of a unit. Each sh is reported before it is handed out, so a thief only
+    splits off poems this worker has not started, and a range it shrank is seen in time.
+    """
+    q = LeaseQueue(db_path)
+    try:
+        sh, end = unit.sh_start, unit.sh_end
+        while sh <= end:
+            new_end = q.report(unit.id, worker_id, sh)
+            if new_end is None:
+                print(f"[LEASE] lost lease on unit {unit.id}")
+                return
+            if new_end < end:
+                print(f"[STEAL] unit {unit.id}: sh{new_end + 1}..sh{end} taken by another worker")
+            end = new_end
+            if sh > end:
+                break
+            yield PoemTask(unit.poet, unit.section_path, sh)
+            sh += 1
+        unit.sh_end = end
+    finally:
+        q.close()
+
+def print_progress(q: LeaseQueue):
+    for poet, states in sorted(q.progress().items()):
+        total = sum(states.values())
+        print(f"  {poet:<12} done={states.get('done', 0)}/{total} leased={states.get('leased', 0)} "
+              f"pending={states.get('pending', 0)} failed={states.get('failed', 0)}")
+    failed = q.failed_poems()
+    if failed:
+        print(f"  {len(failed)} poems failed in their last attempt (also in events.jsonl for redrive_failed.py)")
+
+def main():
+    """
+    Usage:
+      python run_lease_worker.py --seed [--poet P ...] [--unit-size 50]   # once, to fill the lease table
+      python run_lease_worker.py [--worker-id ID] [--rate-ms 300]          # on every process / host
+      python run_lease_worker.py --status
+    Behavior:
+      - Work units are (poet, section_path, sh range) rows in a SQLite lease table
+        (default data/metadata/leases.sqlite; point --db at a shared volume for several hosts).
+      - Each worker claims a unit with an expiring lease, heartbeats while running it through
+        the pipeline, and completes it; on error, or if some of its poems failed, the unit is
+        released for another attempt (the manifest skips poems already saved) with the failed
+        sh numbers recorded on it.
+      - Units whose worker died become claimable again when the lease expires.
+      - Chunk size adapts to observed per-poem time (--chunk-s seconds per claim); when
+        nothing is pending, an idle worker steals the untouched half of a busy worker's unit.
+    """
+    parser = argparse.ArgumentParser(description="Lease-based distributed corpus runner")
+    parser.add_argument("--db", default=LEASES_PATH, help="lease table path (shared by all workers)")
+    parser.add_argument("--seed", action="store_true", help="create units from url_modes.json counts")
+    parser.add_argument("--poet", action="append", help="limit seeding to these poets")
+    parser.add_argument("--unit-size", type=int, default=UNIT_SIZE, help="poems per unit when seeding")
+    parser.add_argument("--status", action="store_true", help="print progress and exit")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--lease-s", type=float, default=LEASE_SECONDS, help="lease length in seconds")
+    parser.add_argument("--rate-ms", type=int, default=300, help="delay between requests of this worker")
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--chunk-s", type=float, default=120.0, help="target seconds of work per claimed chunk")
+    parser.add_argument("--no-steal", action="store_true", help="do not take work from other workers' units")
+    parser.add_argument("--wait", action="store_true", help="keep polling when no unit is available")
+    args = parser.parse_args()
+
+    q = LeaseQueue(args.db, lease_seconds=args.lease_s)
+    if args.seed:
+        added = q.seed_from_modes(load_modes(), poets=args.poet, unit_size=args.unit_size)
+        print(f"[SEED] {added} new units in {args.db}")
+    if args.status or args.seed:
+        print_progress(q)
+        return
+
+    manifest = load_manifest()
+    sizer = ChunkSizer(target_s=args.chunk_s)
+    print(f"[WORKER] {args.worker_id} using {args.db}")
+    while True:
+        unit = q.claim(args.worker_id, max_poems=sizer.size)
+        if unit is None and not args.no_steal:
+            unit = q.steal(args.worker_id)
+        if unit is None:
+            if args.wait:
+                time.sleep(10)
+                continue
+            print("[WORKER] no claimable units left")
+            break
+        print(f"[CLAIM] unit {unit.id}: {unit}")
+        stop, lost = threading.Event(), threading.Event()
+        hb = threading.Thread(target=heartbeat_loop, args=(args.db, args.lease_s, unit.id, args.worker_id, stop, lost),
+                              daemon=True)
+        hb.start()
+        t0 = time.monotonic()
+        failed_sh = []
+        try:
+            pipe = Pipeline(rate_ms=args.rate_ms, fetch_workers=args.fetch_workers, manifest=manifest,
+                            on_result=lambda res: res.ok or failed_sh.append(res.task.sh))
+            stats = pipe.run(unit_tasks(args.db, unit, args.worker_id))
+        except KeyboardInterrupt:
+            stop.set()
+            q.release(unit.id, args.worker_id, failed=False)
+            print(f"\n[WORKER] interrupted; unit {unit.id} released")
+            return
+        except Exception as e:
+            stop.set()
+            q.release(unit.id, args.worker_id, failed=True)
+            print(f"[ERROR] unit {unit.id}: {e}; released")
+            continue
+        stop.set()
+        hb.join()
+        if lost.is_set():
+            continue
+        saved, skipped = Pipeline.saved_skipped(stats)
+        sizer.observe(saved + skipped, time.monotonic() - t0)
+        if failed_sh:
+            q.release(unit.id, args.worker_id, failed=True, failed_sh=failed_sh)
+            print(f"[RETRY] unit {unit.id}: {len(failed_sh)} poems failed; released for another attempt")
+            continue
+        q.complete(unit.id, args.worker_id)
+        print(f"[DONE] unit {unit.id}: saved={saved} skipped={skipped} already_done={stats.get('already_done', 0)}")
+    print_progress(q)
+
+if __name__ == "__main__":
+    profiled_main(main)
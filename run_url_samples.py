@@ -8,6 +8,7 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from url_builder import BASE_URL, build_poet_url, build_section_url, build_poem_url
+from profiling import profiled_main
 
 def show(title, value):
     print(f"{title}: {value}")
@@ -38,4 +39,4 @@ def main():
     show("trimmed poem with section", build_poem_url(" /hafez/ ", 30, " /ghazal/ "))
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
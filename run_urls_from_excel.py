@@ -10,6 +10,7 @@ if SRC not in sys.path:
 
 from parser_excel import read_excel_tasks
 from url_builder import build_section_url, build_poem_url
+from profiling import profiled_main
 
 def to_int_safe(token: str) -> int:
     """
@@ -59,4 +60,4 @@ def main():
                 print(f"  Poem URL error for sh{sh}: {e}")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
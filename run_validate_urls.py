@@ -1,6 +1,8 @@
 import sys
 import os
 import json
+import time
+import argparse
 import datetime
 
 # add src to import path
@@ -10,7 +12,12 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from parser_excel import read_excel_tasks
-from validator import probe_task
+from validator import probe_sections, PROBE_WORKERS, PROBE_RATE_MS
+from verdict_cache import add_verdict_args, verdicts_from_args
+from profiling import profiled_main
+
+EXCELS_DIR = os.path.join("inputs", "excels")
+DEFAULT_SH = [1, 2, 5, 10, 30]
 
 def unique_sections(tasks):
     seen = set()
@@ -26,38 +33,63 @@ def main():
     """
     Usage:
       python run_validate_urls.py <poet_slug> <excel_path> [sh_numbers...]
+      python run_validate_urls.py --all [--workers 8] [--rate-ms 200] [sh_numbers...]
     Example:
       python run_validate_urls.py hafez inputs\\excels\\hafez.xlsx 1 2 10 30
+    All sections are probed concurrently under one request rate; a section stops probing
+    at its first sh page that answers 200. Results are appended to the report as they finish.
     """
-    if len(sys.argv) < 3:
-        print("Usage: python run_validate_urls.py <poet_slug> <excel_path> [sh_numbers...]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Probe section/poem URLs listed in Excel workbooks")
+    parser.add_argument("poet", nargs="?")
+    parser.add_argument("excel_path", nargs="?")
+    parser.add_argument("sh_numbers", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true", help=f"every workbook in {EXCELS_DIR}")
+    parser.add_argument("--workers", type=int, default=PROBE_WORKERS, help=f"parallel requests (default {PROBE_WORKERS})")
+    parser.add_argument("--rate-ms", type=int, default=PROBE_RATE_MS,
+                        help=f"spacing between requests across all workers (default {PROBE_RATE_MS})")
+    add_verdict_args(parser)
+    args = parser.parse_args()
+    verdicts = verdicts_from_args(args)
 
-    poet = sys.argv[1]
-    excel_path = sys.argv[2]
-    sh_numbers = [int(x) for x in sys.argv[3:]] if len(sys.argv) > 3 else [1, 2, 5, 10, 30]
+    if args.all:
+        # with --all, positional numbers are sh samples
+        extra = [x for x in (args.poet, args.excel_path) if x is not None]
+        sh_numbers = [int(x) for x in extra] + args.sh_numbers or DEFAULT_SH
+        workbooks = [(os.path.splitext(x)[0], os.path.join(EXCELS_DIR, x))
+                     for x in sorted(os.listdir(EXCELS_DIR)) if x.lower().endswith(".xlsx")]
+        name = "all"
+    elif args.poet and args.excel_path:
+        sh_numbers = args.sh_numbers or DEFAULT_SH
+        workbooks = [(args.poet, args.excel_path)]
+        name = args.poet
+    else:
+        print("Usage: python run_validate_urls.py <poet_slug> <excel_path> [sh_numbers...]  |  --all")
+        sys.exit(1)
 
-    tasks = read_excel_tasks(poet, excel_path)
-    # Collapse to unique sections per book/style
-    sections = unique_sections(tasks)
+    sections = []
+    for poet, excel_path in workbooks:
+        sections += unique_sections(read_excel_tasks(poet, excel_path))
 
     os.makedirs(os.path.join("data", "metadata", "validators"), exist_ok=True)
     ts = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-    out_path = os.path.join("data", "metadata", "validators", f"{poet}-{ts}.jsonl")
+    out_path = os.path.join("data", "metadata", "validators", f"{name}-{ts}.jsonl")
 
-    print(f"Poet={poet} sections={len(sections)} -> report: {out_path}")
+    print(f"Poets={len(workbooks)} sections={len(sections)} workers={args.workers} rate={args.rate_ms}ms -> report: {out_path}")
+    t0 = time.monotonic()
     with open(out_path, "w", encoding="utf-8") as f:
-        for (p, section) in sections:
-            res = probe_task(p, section, sh_numbers)
+        for res in probe_sections(sections, sh_numbers, workers=args.workers, rate_ms=args.rate_ms,
+                                  cache=verdicts):
             line = json.dumps(res.__dict__, ensure_ascii=False)
             f.write(line + "\n")
+            f.flush()
             # Console summary
-            print(f"- {section}: has_sh_pages={res.has_sh_pages}, section_exists={res.section_page_exists}")
+            print(f"- {res.poet}/{res.book_or_style}: has_sh_pages={res.has_sh_pages}, section_exists={res.section_page_exists}")
             for url, code in list(res.status_by_url.items())[:5]:
                 print(f"  {code}  {url}")
 
-    print("Done. Open the JSONL report and mark sections with has_sh_pages=false as no-sh sections.")
+    print(f"[VERDICTS] reused={verdicts.hits} probed={verdicts.misses}")
+    print(f"Done in {time.monotonic() - t0:.1f}s. Open the JSONL report and mark sections with has_sh_pages=false as no-sh sections.")
     print("Later we will create a mapping file to handle these cases automatically.")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+from typing import Dict, Optional
+import datetime
+import re
+import threading
+import time
+
+import extractor
+
+_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3}
+
+def parse_bytes(s: str) -> int:
+    """'500MB', '2G', '1048576' -> bytes."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", str(s).upper())
+    if not m:
+        raise ValueError(f"invalid size: {s!r}")
+    return int(float(m.group(1)) * _UNITS[m.group(2)])
+
+def parse_deadline(s: str, now: Optional[datetime.datetime] = None) -> float:
+    """
+    Wall-clock deadline as a time.time() value. Accepts a duration ('90m', '2h', '45s')
+    or a clock time ('06:30'; the next occurrence of it).
+    """
+    s = str(s).strip().lower()
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([smh])", s)
+    if m:
+        mult = {"s": 1, "m": 60, "h": 3600}[m.group(2)]
+        return time.time() + float(m.group(1)) * mult
+    m = re.fullmatch(r"(\d{1,2}):(\d{2})", s)
+    if m:
+        now = now or datetime.datetime.now()
+        at = now.replace(hour=int(m.group(1)), minute=int(m.group(2)), second=0, microsecond=0)
+        if at <= now:
+            at += datetime.timedelta(days=1)
+        return at.timestamp()
+    raise ValueError(f"invalid deadline: {s!r}")
+
+class Budget:
+    """
+    Run-level limits: total HTTP requests, total bytes, a wall-clock deadline and a
+    per-poet quota of poems. Requests and bytes are counted for every page and audio
+    request made through extractor once install() is called.
+
+    Runners ask exhausted() between units of work and stop cleanly (checkpoint and
+    exit) once it returns a reason; poet_allows() gates single poems per poet.
+    """
+
+    def __init__(self, max_requests: Optional[int] = None, max_bytes: Optional[int] = None,
+                 deadline: Optional[float] = None, poet_quota: Optional[int] = None):
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.poet_quota = poet_quota
+        self.requests = 0
+        self.bytes = 0
+        self.poems: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._installed = False
+
+    @property
+    def limited(self) -> bool:
+        return any(v is not None for v in (self.max_requests, self.max_bytes, self.deadline, self.poet_quota))
+
+    # ---------- accounting ----------
+    def _on_request(self, kind: str, url: str, status: int, nbytes: int, elapsed_s: float = 0.0):
+        with self._lock:
+            self.requests += 1
+            self.bytes += nbytes
+
+    def install(self):
+        if not self._installed:
+            extractor.REQUEST_HOOKS.append(self._on_request)
+            self._installed = True
+        return self
+
+    def uninstall(self):
+        if self._installed:
+            extractor.REQUEST_HOOKS.remove(self._on_request)
+            self._installed = False
+
+    def take(self, poet: str) -> bool:
+        """Reserve one poem of the poet's quota; False when the quota is used up."""
+        with self._lock:
+            n = self.poems.get(poet, 0)
+            if self.poet_quota is not None and n >= self.poet_quota:
+                return False
+            self.poems[poet] = n + 1
+            return True
+
+    def poet_allows(self, poet: str) -> bool:
+        with self._lock:
+            return self.poet_quota is None or self.poems.get(poet, 0) < self.poet_quota
+
+    # ---------- limits ----------
+    def exhausted(self) -> Optional[str]:
+        """Reason the run has to stop ('max_requests', 'max_bytes', 'deadline'), or None."""
+        with self._lock:
+            if self.max_requests is not None and self.requests >= self.max_requests:
+                return "max_requests"
+            if self.max_bytes is not None and self.bytes >= self.max_bytes:
+                return "max_bytes"
+        if self.deadline is not None and time.time() >= self.deadline:
+            return "deadline"
+        return None
+
+    def summary(self) -> str:
+        parts = [f"requests={self.requests}" + (f"/{self.max_requests}" if self.max_requests is not None else ""),
+                 f"bytes={self.bytes}" + (f"/{self.max_bytes}" if self.max_bytes is not None else "")]
+        if self.deadline is not None:
+            left = self.deadline - time.time()
+            parts.append(f"deadline in {int(left)}s" if left > 0 else "deadline passed")
+        return " ".join(parts)
+
+def add_budget_args(parser):
+    g = parser.add_argument_group("budget")
+    g.add_argument("--max-requests", type=int, help="stop after this many HTTP requests")
+    g.add_argument("--max-bytes", type=parse_bytes, help="stop after downloading this much (e.g. 500MB, 2G)")
+    g.add_argument("--deadline", type=parse_deadline, help="stop at a clock time (06:30) or after a duration (90m, 2h)")
+    g.add_argument("--poet-quota", type=int, help="at most this many poems per poet in this run")
+
+def budget_from_args(args) -> Budget:
+    return Budget(max_requests=args.max_requests, max_bytes=args.max_bytes,
+                  deadline=args.deadline, poet_quota=args.poet_quota)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+from typing import Dict, Iterator, List, Optional, Tuple
+import gzip
+import hashlib
+import json
+import os
+import threading
+import zlib
+
+from poem import Poem
+
+CORPUS_DIR = os.path.join("data", "corpus")
+INDEX_NAME = "index.jsonl"
+MAX_SHARD_BYTES = 64 * 1024 * 1024
+BLOCK_BYTES = 256 * 1024
+
+def poem_key(poet: str, section_path: str, sh: int) -> str:
+    return f"{poet}/{section_path}/sh{sh}"
+
+def text_to_couplets(text: str) -> List[List[str]]:
+    """Split the 'right | left' lines produced by parse_poem_page into hemistich lists."""
+    out = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            out.append([p.strip() for p in line.split(" | ")])
+    return out
+
+class ShardWriter:
+    """
+    Append poems to size-rotated gzip shards (data/corpus/shard-NNNNN.jsonl.gz).
+    Records are buffered into blocks of ~BLOCK_BYTES; each block is written as
+    its own gzip member, so a shard is still a plain .jsonl.gz for sequential
+    readers while index.jsonl gives (shard, block offset, block length, line)
+    per key for random access.
+    Poems only count as stored once their block is on disk: manifest entries
+    passed to append() are recorded at flush time.
+    Safe to share between threads (e.g. the pipeline's store workers).
+    """
+
+    def __init__(self, out_dir: str = CORPUS_DIR, max_shard_bytes: int = MAX_SHARD_BYTES,
+                 block_bytes: int = BLOCK_BYTES):
+        self.out_dir = out_dir
+        self.max_shard_bytes = max_shard_bytes
+        self.block_bytes = block_bytes
+        os.makedirs(out_dir, exist_ok=True)
+        self._shard_no = self._last_shard_no()
+        self._fh = None
+        self._index = open(os.path.join(out_dir, INDEX_NAME), "a", encoding="utf-8")
+        self._lines: List[bytes] = []
+        self._keys: List[str] = []
+        self._pending_manifest: List[tuple] = []
+        self._buffered = 0
+        self.records_written = 0
+        self._lock = threading.RLock()
+
+    def _last_shard_no(self) -> int:
+        nums = [int(n[6:11]) for n in os.listdir(self.out_dir)
+                if n.startswith("shard-") and n.endswith(".jsonl.gz")]
+        return max(nums) if nums else 0
+
+    def _shard_name(self) -> str:
+        return f"shard-{self._shard_no:05d}.jsonl.gz"
+
+    def _open_shard(self):
+        path = os.path.join(self.out_dir, self._shard_name())
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_shard_bytes:
+            self._shard_no += 1
+            path = os.path.join(self.out_dir, self._shard_name())
+        self._fh = open(path, "ab")
+
+    def append(self, poet: str, section_path: str, sh: int, text,
+               audio_ref: Optional[str] = None, audio_bytes: int = 0, manifest=None):
+        """text is the flat 'right | left' form or a Poem (serialized from its couplets directly)."""
+        key = poem_key(poet, section_path, sh)
+        if isinstance(text, Poem):
+            couplets, digest = text.couplet_lists(), text.digest()
+        else:
+            couplets, digest = text_to_couplets(text), hashlib.sha1(text.encode("utf-8")).hexdigest()
+        rec = {
+            "key": key,
+            "poet": poet,
+            "section_path": section_path,
+            "sh": int(sh),
+            "couplets": couplets,
+            "audio": audio_ref,
+            "audio_bytes": int(audio_bytes),
+            "hash": digest,
+        }
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._lock:
+            self._lines.append(line)
+            self._keys.append(key)
+            self._buffered += len(line)
+            if manifest is not None:
+                self._pending_manifest.append((manifest, poet, section_path, sh, text, audio_bytes))
+            if self._buffered >= self.block_bytes:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._lines:
+            return
+        if self._fh is None:
+            self._open_shard()
+        block = gzip.compress(b"".join(self._lines))
+        offset = self._fh.tell()
+        self._fh.write(block)
+        self._fh.flush()
+        shard = self._shard_name()
+        for i, key in enumerate(self._keys):
+            self._index.write(json.dumps(
+                {"k": key, "f": shard, "o": offset, "l": len(block), "i": i},
+                ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._index.flush()
+        for manifest, poet, section_path, sh, text, audio_bytes in self._pending_manifest:
+            manifest.mark_done(poet, section_path, sh, text, audio_bytes)
+        self.records_written += len(self._lines)
+        self._lines, self._keys, self._pending_manifest = [], [], []
+        self._buffered = 0
+        if self._fh.tell() >= self.max_shard_bytes:
+            self._fh.close()
+            self._fh = None
+            self._shard_no += 1
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class CorpusReader:
+    """Read shards sequentially, or fetch single poems by key through index.jsonl."""
+
+    def __init__(self, out_dir: str = CORPUS_DIR):
+        self.out_dir = out_dir
+        self._index: Optional[Dict[str, Tuple[str, int, int, int]]] = None
+
+    def shards(self) -> List[str]:
+        return sorted(n for n in os.listdir(self.out_dir)
+                      if n.startswith("shard-") and n.endswith(".jsonl.gz"))
+
+    def __iter__(self) -> Iterator[dict]:
+        for name in self.shards():
+            with gzip.open(os.path.join(self.out_dir, name), "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def _load_index(self):
+        self._index = {}
+        path = os.path.join(self.out_dir, INDEX_NAME)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue
+                self._index[e["k"]] = (e["f"], e["o"], e["l"], e["i"])
+
+    def __contains__(self, key: str) -> bool:
+        if self._index is None:
+            self._load_index()
+        return key in self._index
+
+    def get(self, key: str) -> Optional[dict]:
+        if self._index is None:
+            self._load_index()
+        loc = self._index.get(key)
+        if loc is None:
+            return None
+        shard, offset, length, line_no = loc
+        with open(os.path.join(self.out_dir, shard), "rb") as f:
+            f.seek(offset)
+            raw = f.read(length)
+        lines = zlib.decompress(raw, wbits=31).split(b"\n")
+        return json.loads(lines[line_no])
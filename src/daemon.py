@@ -0,0 +1,300 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+from manifest import load_manifest
+from page_cache import PageCache, discover_count
+from parse_executor import ParseExecutor
+from parser_excel import read_excel_tasks
+from pipeline import Pipeline, RateLimiter, section_tasks
+
+SOCKET_PATH = os.path.join("data", "metadata", "ganjoord.sock")
+MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
+EXCELS_DIR = os.path.join("inputs", "excels")
+
+# ---------- client ----------
+def send(msg: dict, path: str = SOCKET_PATH, timeout: float = 10.0) -> dict:
+    """One request to a running daemon: a JSON line out, a JSON line back."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(path)
+        s.sendall(json.dumps(msg, ensure_ascii=False).encode("utf-8") + b"\n")
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    return json.loads(buf.decode("utf-8"))
+
+# ---------- catalog ----------
+class Catalog:
+    """url_modes.json and the sections listed in the Excel files, re-read only when a file changes."""
+
+    def __init__(self, modes_path: str = MODES_PATH, excels_dir: str = EXCELS_DIR):
+        self.modes_path = modes_path
+        self.excels_dir = excels_dir
+        self._modes: dict = {}
+        self._modes_mtime: Optional[float] = None
+        self._excel: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def modes(self) -> dict:
+        with self._lock:
+            mtime = os.path.getmtime(self.modes_path) if os.path.exists(self.modes_path) else None
+            if mtime != self._modes_mtime:
+                self._modes = {}
+                if mtime is not None:
+                    with open(self.modes_path, encoding="utf-8") as f:
+                        self._modes = json.load(f)
+                self._modes_mtime = mtime
+            return self._modes
+
+    def set_count(self, poet: str, section_path: str, count: int):
+        modes = self.modes()
+        with self._lock:
+            modes.setdefault(poet, {}).setdefault(section_path, {"mode": "sh_pages"})["count"] = count
+            os.makedirs(os.path.dirname(self.modes_path) or ".", exist_ok=True)
+            with open(self.modes_path, "w", encoding="utf-8") as f:
+                json.dump(modes, f, ensure_ascii=False, indent=2)
+            self._modes_mtime = os.path.getmtime(self.modes_path)
+
+    def excel_sections(self, poet: str) -> List[str]:
+        path = os.path.join(self.excels_dir, f"{poet}.xlsx")
+        if not os.path.exists(path):
+            return []
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._excel.get(poet)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        out = []
+        for t in read_excel_tasks(poet, path):
+            sec = (t.book_or_style or "").strip()
+            if sec and sec not in out:
+                out.append(sec)
+        with self._lock:
+            self._excel[poet] = (mtime, out)
+        return out
+
+    def describe(self, poet: str) -> dict:
+        return {"modes": self.modes().get(poet, {}), "excel_sections": self.excel_sections(poet)}
+
+# ---------- jobs ----------
+@dataclass
+class DaemonJob:
+    job_id: str
+    poet: str
+    section: Optional[str] = None
+    start: Optional[int] = None
+    end: Optional[int] = None
+    status: str = "queued"  # queued | running | done | failed
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    ranges: List[list] = field(default_factory=list)  # [section_path, start, end]
+    stats: Dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+
+class Daemon:
+    """
+    Long-running downloader that keeps its state warm between jobs: the HTTP session
+    (extractor.get_session), the catalog, a page cache (pages read while discovering
+    counts are not fetched again), the manifest and (with parse_processes) the parse
+    process pool.
+
+    Jobs arrive over a Unix socket and run one after another through the same
+    RateLimiter, so every client shares one politeness budget. Requests are JSON lines:
+      {"cmd": "submit", "poet": "hafez", "section": "ghazal", "start": 1, "end": 50}
+      {"cmd": "status"} / {"cmd": "status", "job": "3"}
+      {"cmd": "catalog", "poet": "hafez"}
+      {"cmd": "ping"} / {"cmd": "stop"}
+    """
+
+    def __init__(self, socket_path: str = SOCKET_PATH, rate_ms: int = 300, fetch_workers: int = 4,
+                 parse_processes: int = 0, base_dir: str = "data", catalog: Optional[Catalog] = None,
+                 manifest=None, events=None, verbose: bool = True):
+        self.socket_path = socket_path
+        self.rate_ms = rate_ms
+        self.fetch_workers = fetch_workers
+        self.parse_processes = parse_processes
+        self.base_dir = base_dir
+        self.catalog = catalog or Catalog()
+        self.manifest = manifest if manifest is not None else load_manifest(base_dir=base_dir)
+        self.events = events
+        self.verbose = verbose
+        self.limiter = RateLimiter(max(rate_ms, 0) / 1000.0)
+        self.page_cache = PageCache()
+        self.pool = ParseExecutor(parse_processes) if parse_processes > 0 else None
+        self.jobs: Dict[str, DaemonJob] = {}
+        self.current: Optional[DaemonJob] = None
+        self._ids = itertools.count(1)
+        self._queue: "queue.Queue[Optional[DaemonJob]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._runner = threading.Thread(target=self._run, name="daemon-runner", daemon=True)
+
+    def log(self, msg: str):
+        if self.verbose:
+            print(msg)
+
+    # ---------- requests ----------
+    def handle(self, msg: dict) -> dict:
+        cmd = msg.get("cmd")
+        try:
+            if cmd == "ping":
+                return {"ok": True, "uptime_s": round(time.time() - self._started, 1), "pid": os.getpid()}
+            if cmd == "submit":
+                job = self.submit(msg["poet"], msg.get("section"), msg.get("start"), msg.get("end"))
+                return {"ok": True, "job": asdict(job)}
+            if cmd == "status":
+                return self.status(msg.get("job"))
+            if cmd == "catalog":
+                return {"ok": True, "poet": msg["poet"], **self.catalog.describe(msg["poet"])}
+            if cmd == "stop":
+                threading.Thread(target=self.stop, name="daemon-stop", daemon=True).start()
+                return {"ok": True}
+        except KeyError as e:
+            return {"ok": False, "error": f"missing field {e}"}
+        return {"ok": False, "error": f"unknown command: {cmd}"}
+
+    def submit(self, poet: str, section: Optional[str] = None, start: Optional[int] = None,
+               end: Optional[int] = None) -> DaemonJob:
+        with self._lock:
+            job = DaemonJob(str(next(self._ids)), poet, section, start, end)
+            self.jobs[job.job_id] = job
+        self._queue.put(job)
+        self.log(f"[DAEMON] job {job.job_id} queued: {poet}/{section or '*'}")
+        return job
+
+    def status(self, job_id: Optional[str] = None) -> dict:
+        with self._lock:
+            if job_id is not None:
+                job = self.jobs.get(str(job_id))
+                return {"ok": True, "job": asdict(job)} if job else {"ok": False, "error": f"no job {job_id}"}
+            jobs = [asdict(j) for j in self.jobs.values()]
+        return {
+            "ok": True,
+            "uptime_s": round(time.time() - self._started, 1),
+            "queued": self._queue.qsize(),
+            "current": self.current.job_id if self.current else None,
+            "rate_ms": self.rate_ms,
+            "page_cache": {"entries": len(self.page_cache), "hits": self.page_cache.hits,
+                           "misses": self.page_cache.misses},
+            "jobs": jobs,
+        }
+
+    # ---------- running ----------
+    def discover_count(self, poet: str, section_path: str) -> int:
+        # over the warm page cache, paced by the shared limiter
+        return discover_count(poet, section_path, self.page_cache, self.limiter)
+
+    def resolve(self, job: DaemonJob) -> List[list]:
+        """[section_path, start, end] for every sh_pages section the job covers."""
+        sections = self.catalog.modes().get(job.poet, {})
+        names = [job.section] if job.section else list(sections)
+        out = []
+        for sec in names:
+            cfg = sections.get(sec, {"mode": "sh_pages"})
+            if cfg.get("mode") != "sh_pages":
+                continue
+            end = job.end
+            if end is None:
+                end = cfg.get("count")
+                if not end:
+                    self.log(f"[DAEMON] discovering count for {job.poet}/{sec} ...")
+                    end = self.discover_count(job.poet, sec)
+                    self.catalog.set_count(job.poet, sec, end)
+            start = job.start or 1
+            if end >= start:
+                out.append([sec, start, end])
+        return out
+
+    def _tasks(self, job: DaemonJob):
+        for sec, start, end in job.ranges:
+            yield from section_tasks(job.poet, sec, start, end)
+
+    def run_job(self, job: DaemonJob):
+        job.status, job.started = "running", time.time()
+        try:
+            job.ranges = self.resolve(job)
+            pipe = Pipeline(rate_ms=self.rate_ms, fetch_workers=self.fetch_workers,
+                            base_dir=self.base_dir, manifest=self.manifest, events=self.events,
+                            limiter=self.limiter, page_cache=self.page_cache, parse_executor=self.pool,
+                            verbose=False)
+            job.stats = pipe.run(self._tasks(job))
+            job.status = "done"
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+        job.finished = time.time()
+        saved, skipped = Pipeline.saved_skipped(job.stats)
+        self.log(f"[DAEMON] job {job.job_id} {job.status}: saved={saved} skipped={skipped}"
+                 + (f" error={job.error}" if job.error else ""))
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self.current = job
+            self.run_job(job)
+            self.current = None
+
+    # ---------- socket ----------
+    def serve(self):
+        """Listen on the socket until stop(); jobs run in the background meanwhile."""
+        if os.path.exists(self.socket_path):
+            try:
+                send({"cmd": "ping"}, self.socket_path, timeout=1.0)
+                raise RuntimeError(f"a daemon is already listening on {self.socket_path}")
+            except (OSError, ValueError):
+                os.remove(self.socket_path)  # left over from a daemon that died, or not a daemon at all
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                try:
+                    reply = daemon.handle(json.loads(line.decode("utf-8")))
+                except ValueError as e:
+                    reply = {"ok": False, "error": f"bad request: {e}"}
+                self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        self._runner.start()
+        self.log(f"[DAEMON] listening on {self.socket_path} (rate={self.rate_ms}ms, workers={self.fetch_workers})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def stop(self):
+        """Finish the running job, drop the queued ones and close the socket."""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.status = "failed"
+                job.error = "daemon stopped"
+        self._queue.put(None)
+        if self._runner.is_alive():
+            self._runner.join()
+        if self.pool is not None:
+            self.pool.close()
+        if self._server is not None:
+            self._server.shutdown()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+from typing import Dict, Tuple
+import sys
+import threading
+import time
+
+from metrics import get_metrics
+
+REFRESH_S = 0.5
+LOG_EVERY_S = 10.0
+
+class Dashboard:
+    """
+    Live progress for long runs: one tqdm bar for the whole run and one per poet,
+    with poems/s, MB/s, error rate, active workers and ETA. Redraws happen at most
+    every refresh_s seconds however fast results arrive.
+
+    quiet=True draws nothing and instead writes the same numbers to the event log
+    as "progress" records every LOG_EVERY_S seconds and at close().
+
+    Feed it with advance(), or pass it to Pipeline(progress=...) which calls
+    attach() and update() for every result.
+    """
+
+    def __init__(self, unit: str = "poems", refresh_s: float = REFRESH_S, quiet: bool = False,
+                 events=None, log_every_s: float = LOG_EVERY_S, file=None):
+        self.unit = unit
+        self.refresh_s = refresh_s
+        self.quiet = quiet
+        self.events = events
+        self.log_every_s = log_every_s
+        self.file = file or sys.stderr
+        self.totals: Dict[Tuple[str, str], int] = {}
+        self.done: Dict[Tuple[str, str], int] = {}
+        self.ok = 0
+        self.failed = 0
+        self.pipeline = None
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self._bytes0 = self._bytes()
+        self._last_draw = float("-inf")
+        self._last_log = self._t0
+        self._last_section: Dict[str, Tuple[str, str]] = {}
+        self._bars: Dict[str, object] = {}
+        self._total_bar = None
+        if not quiet:
+            from tqdm import tqdm
+            self._tqdm = tqdm
+
+    # ---------- input ----------
+    def add_total(self, poet: str, section_path: str, n: int):
+        with self._lock:
+            self.totals[(poet, section_path)] = self.totals.get((poet, section_path), 0) + n
+
+    def attach(self, pipeline):
+        self.pipeline = pipeline
+
+    def update(self, res):
+        """PoemResult from the pipeline; poems found in the manifest count as done but not toward the rate."""
+        t = res.task
+        self.advance(t.poet, t.section_path, ok=res.ok, counted=res.reason != "already_done")
+
+    def advance(self, poet: str, section_path: str, ok: bool = True, n: int = 1, counted: bool = True):
+        key = (poet, section_path)
+        with self._lock:
+            self.done[key] = self.done.get(key, 0) + n
+            if counted:
+                if ok:
+                    self.ok += n
+                else:
+                    self.failed += n
+            self._last_section[poet] = key
+            now = time.monotonic()
+            draw = now - self._last_draw >= self.refresh_s
+            if draw:
+                self._last_draw = now
+        if draw:
+            self.refresh()
+
+    # ---------- numbers ----------
+    @staticmethod
+    def _bytes() -> float:
+        m = get_metrics()
+        return m.get("ganjoor_http_bytes_total", kind="page") + m.get("ganjoor_http_bytes_total", kind="audio")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = max(time.monotonic() - self._t0, 1e-6)
+            done = sum(self.done.values())
+            total = sum(self.totals.values())
+            rate = (self.ok + self.failed) / elapsed
+            handled = self.ok + self.failed
+            poets: Dict[str, list] = {}
+            for (poet, sec), n in self.totals.items():
+                poets.setdefault(poet, [0, 0])[1] += n
+            for (poet, sec), n in self.done.items():
+                poets.setdefault(poet, [0, 0])[0] += n
+        remaining = max(total - done, 0)
+        return {
+            "done": done,
+            "total": total,
+            "rate": round(rate, 3),
+            "mb_per_s": round((self._bytes() - self._bytes0) / elapsed / 1e6, 3),
+            "error_rate": round(self.failed / handled, 4) if handled else 0.0,
+            "active": self.pipeline.in_flight() if self.pipeline is not None else None,
+            "eta_s": round(remaining / rate) if rate > 0 and total else None,
+            "poets": poets,
+        }
+
+    # ---------- output ----------
+    def refresh(self):
+        snap = self.snapshot()
+        if self.quiet:
+            now = time.monotonic()
+            if now - self._last_log >= self.log_every_s:
+                self._last_log = now
+                self._log(snap)
+            return
+        with self._lock:
+            if self._total_bar is None:
+                self._total_bar = self._tqdm(total=snap["total"] or None, desc="all", unit=self.unit,
+                                             position=0, file=self.file, dynamic_ncols=True,
+                                             mininterval=self.refresh_s)
+            self._total_bar.total = snap["total"] or None
+            self._total_bar.n = snap["done"]
+            post = f"{snap['rate']:.2f}/s {snap['mb_per_s']:.2f}MB/s err={snap['error_rate']:.1%}"
+            if snap["active"] is not None:
+                post += f" active={snap['active']}"
+            self._total_bar.set_postfix_str(post, refresh=False)
+            self._total_bar.refresh()
+            for i, (poet, (done, total)) in enumerate(sorted(snap["poets"].items()), 1):
+                bar = self._bars.get(poet)
+                if bar is None:
+                    bar = self._bars[poet] = self._tqdm(total=total, desc=poet, unit=self.unit, position=i,
+                                                        file=self.file, dynamic_ncols=True, leave=True)
+                bar.total = total
+                bar.n = done
+                key = self._last_section.get(poet)
+                if key is not None:
+                    bar.set_postfix_str(f"{key[1]} {self.done.get(key, 0)}/{self.totals.get(key, '?')}",
+                                        refresh=False)
+                bar.refresh()
+
+    def _log(self, snap: dict):
+        if self.events is None:
+            from event_log import get_event_log
+            self.events = get_event_log()
+        self.events.emit("progress", **snap)
+
+    def close(self):
+        self.refresh()
+        if self.quiet:
+            self._log(self.snapshot())
+            return
+        for bar in [self._total_bar] + list(self._bars.values()):
+            if bar is not None:
+                bar.close()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+from typing import Optional
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+EVENTS_PATH = os.path.join("data", "metadata", "events.jsonl")
+MAX_BYTES = 16 * 1024 * 1024
+BACKUPS = 5
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.5
+
+class EventLog:
+    """
+    Structured JSONL event log with a single writer thread.
+    Callers only enqueue records; the writer batches them, writes each batch
+    with one write() + flush(), and rotates events.jsonl -> events.jsonl.1 ...
+    once the file exceeds max_bytes. Safe to share between threads.
+
+    Record fields: ts, event, status, poet, section_path, sh, reason, url, elapsed_ms
+    plus any extra keyword fields passed to emit().
+    """
+
+    def __init__(self, path: str = EVENTS_PATH, max_bytes: int = MAX_BYTES, backups: int = BACKUPS,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._q: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def emit(self, event: str, **fields):
+        if self._closed:
+            return
+        rec = {"ts": round(time.time(), 3), "event": event}
+        rec.update({k: v for k, v in fields.items() if v is not None})
+        self._q.put(rec)
+
+    def failure(self, poet: str, section_path: str, sh: int, reason: str, url: str,
+                elapsed_ms: Optional[float] = None, **extra):
+        self.emit("poem", status="failed", poet=poet, section_path=section_path, sh=int(sh),
+                  reason=reason, url=url, elapsed_ms=elapsed_ms, **extra)
+
+    def saved(self, poet: str, section_path: str, sh: int, url: Optional[str] = None,
+              elapsed_ms: Optional[float] = None, **extra):
+        self.emit("poem", status="saved", poet=poet, section_path=section_path, sh=int(sh),
+                  url=url, elapsed_ms=elapsed_ms, **extra)
+
+    def _run(self):
+        batch = []
+        last = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last))
+            try:
+                rec = self._q.get(timeout=timeout)
+            except queue.Empty:
+                rec = False
+            if rec is None:
+                self._write(batch)
+                return
+            if rec:
+                batch.append(rec)
+            now = time.monotonic()
+            if len(batch) >= self.batch_size or now - last >= self.flush_interval:
+                self._write(batch)
+                batch = []
+                last = now
+
+    def _write(self, batch):
+        if not batch:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in batch)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            size = f.tell()
+        if size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._q.put(None)
+        self._thread.join()
+
+def ms_since(t0: float) -> float:
+    """Milliseconds elapsed since a time.perf_counter() reading."""
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+def read_events(path: str = EVENTS_PATH, include_rotated: bool = True):
+    """Yield records from the event log, oldest rotated file first."""
+    paths = []
+    if include_rotated:
+        i = 1
+        while os.path.exists(f"{path}.{i}"):
+            paths.append(f"{path}.{i}")
+            i += 1
+        paths.reverse()
+    if os.path.exists(path):
+        paths.append(path)
+    for p in paths:
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+_shared: Optional[EventLog] = None
+_shared_lock = threading.Lock()
+
+def get_event_log(path: str = EVENTS_PATH) -> EventLog:
+    """Process-wide event log shared by all runners; closed (flushed) at exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = EventLog(path)
+            atexit.register(_shared.close)
+        return _shared
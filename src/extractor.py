@@ -1,25 +1,102 @@
+import os
 import re
-import requests
-from bs4 import BeautifulSoup
+import json
+import time
+import threading
+from typing import Optional
+from urllib.parse import urljoin
 
+from metrics import get_metrics
+from negative_index import get_negative_index
+from poem import Poem
+from parse_cache import get_parse_cache
+from profiling import span
+from url_builder import BASE_URL
+
+# requests and bs4 are imported inside the functions that use them, so scripts that
+# only build or print URLs start without loading them
 REQUEST_TIMEOUT = 15
 HEADERS = {"User-Agent": "GanjoorScraper/1.0 (+research; contact@example.com)"}
+BASE = BASE_URL
+AUDIO_TIMEOUT = 60
+# keep-alive connections per host in the shared session (enough for the fetch and store workers)
+POOL_SIZE = 16
+# callables notified after every HTTP request as hook(kind, url, status, nbytes, elapsed_s);
+# kind is "page" or "audio", status 0 means the request itself failed
+REQUEST_HOOKS = []
+
+def _notify(kind: str, url: str, status: int, nbytes: int, elapsed_s: float = 0.0):
+    m = get_metrics()
+    m.inc("ganjoor_http_requests_total", kind=kind, status=status)
+    m.inc("ganjoor_http_bytes_total", nbytes, kind=kind)
+    m.observe("ganjoor_http_seconds", elapsed_s, kind=kind)
+    if kind == "audio" and nbytes and elapsed_s > 0:
+        m.observe("ganjoor_audio_bytes_per_second", nbytes / elapsed_s)
+    for hook in REQUEST_HOOKS:
+        hook(kind, url, status, nbytes, elapsed_s)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Process-wide requests session; its connections are reused by every fetch (and every job in the daemon)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            s.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session = s
+        return _session
+
+def load_modes(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 def fetch_html(url: str):
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-        if r.status_code == 200:
-            return r.text
+    """Page HTML, or None; URLs that recently answered 404 are not requested again."""
+    import requests
+    negative = get_negative_index()
+    if negative.known_missing(url):
         return None
+    t0 = time.perf_counter()
+    try:
+        r = get_session().get(url, timeout=REQUEST_TIMEOUT)
     except requests.RequestException:
+        _notify("page", url, 0, 0, time.perf_counter() - t0)
         return None
+    _notify("page", url, r.status_code, len(r.content), time.perf_counter() - t0)
+    negative.record(url, r.status_code)
+    if r.status_code == 200:
+        return r.text
+    return None
 
-def parse_poem_page(html: str):
+def parse_poem_page(html: str, cache: bool = True):
     """
-    Extract (poem_text, audio_url) precisely:
+    Extract (poem_text, audio_url) as flat strings ('right | left' per line).
+    Return None for missing pieces. See parse_poem for the structured form.
+    """
+    poem = parse_poem(html, cache=cache)
+    return (poem.text if poem else None), poem.audio_url
+
+def parse_poem(html: str, poet: Optional[str] = None, section_path: Optional[str] = None,
+               sh: Optional[int] = None, url: Optional[str] = None, cache: bool = True) -> Poem:
+    """
+    Extract the poem precisely:
     - Walk couplets/hemistich containers instead of generic page text.
-    - Return None for missing pieces.
+    - Keep every hemistich separately, with all audio URLs found on the page.
+    The Poem is empty (falsy) when no verses were found. Pages with the same
+    content are parsed once (parse_cache); cache=False always parses.
     """
+    poem = get_parse_cache().parse(html, _parse_poem) if cache else _parse_poem(html)
+    return poem.with_source(poet, section_path, sh, url)
+
+def _parse_poem(html: str) -> Poem:
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html, "html.parser")
 
     # Remove global noise
@@ -42,7 +119,7 @@ def parse_poem_page(html: str):
     if not rows:
         rows = poem_root.find_all("p")
 
-    verses = []
+    couplets = []
     for r in rows:
         # remove nested scripts/styles
         for bad in r.find_all(["script", "style", "noscript"]):
@@ -53,36 +130,111 @@ def parse_poem_page(html: str):
         if right or left:
             rt = (right.get_text(" ", strip=True) if right else "").strip()
             lt = (left.get_text(" ", strip=True) if left else "").strip()
-            line = f"{rt} | {lt}".strip(" |")
-            if line.strip():
-                verses.append(line)
+            hemistichs = _split_line(rt, lt)
+            if hemistichs:
+                couplets.append(hemistichs)
                 continue
 
         # fallback: both hemistichs inline
         text_inline = r.get_text(" ", strip=True)
         if " / " in text_inline:
-            parts = [p.strip() for p in text_inline.split(" / ", 1)]
-            line = " | ".join([p for p in parts if p])
-            if line:
-                verses.append(line)
-        else:
-            if text_inline:
-                verses.append(text_inline)
-
-    poem_text = "\n".join(v for v in verses if v.strip()) if verses else None
+            couplets.append([p.strip() for p in text_inline.split(" / ", 1)])
+        elif text_inline:
+            couplets.append((text_inline,))
 
-    # Audio: prefer audio under poem container
-    audio_url = None
+    # Audio: prefer audio under poem container, then links to audio files
+    audio_urls = []
     for src in poem_root.select("audio source[src], audio[src]"):
-        url = src.get("src")
-        if url and re.search(r"\.(mp3|ogg|wav)(\?|$)", url, re.I):
-            audio_url = url
-            break
-    if audio_url is None:
-        for a in poem_root.select("a[href]"):
-            href = a.get("href")
-            if href and re.search(r"\.(mp3|ogg|wav)(\?|$)", href, re.I):
-                audio_url = href
-                break
-
-    return poem_text, audio_url
+        src_url = src.get("src")
+        if src_url and re.search(r"\.(mp3|ogg|wav)(\?|$)", src_url, re.I) and src_url not in audio_urls:
+            audio_urls.append(src_url)
+    for a in poem_root.select("a[href]"):
+        href = a.get("href")
+        if href and re.search(r"\.(mp3|ogg|wav)(\?|$)", href, re.I) and href not in audio_urls:
+            audio_urls.append(href)
+
+    return Poem.from_couplets(couplets, audio_urls)
+
+def _split_line(rt: str, lt: str) -> tuple:
+    """
+    The hemistichs of the flat line f"{rt} | {lt}".strip(" |") the text format has always
+    used: bars and spaces at the ends of the line go, an empty side drops its separator,
+    and a line left empty falls back to the row's inline text.
+    """
+    rt, lt = rt.lstrip(" |"), lt.rstrip(" |")
+    if rt and lt:
+        return rt, lt
+    line = (rt or lt).strip(" |")
+    return (line,) if line else ()
+
+def _audio_ext(audio_url: str) -> str:
+    m = re.search(r"\.(mp3|ogg|wav)(\?|$)", audio_url, re.I)
+    return "." + m.group(1).lower() if m else ".mp3"
+
+def poem_paths(base_dir: str, poet: str, section_path: str, sh: int, audio_url: str = ""):
+    """Return (text_path, audio_path) for a poem under data/text and data/audio."""
+    parts = [p for p in section_path.split("/") if p]
+    text_path = os.path.join(base_dir, "text", poet, *parts, f"sh{sh}.txt")
+    audio_path = os.path.join(base_dir, "audio", poet, *parts, f"sh{sh}{_audio_ext(audio_url)}")
+    return text_path, audio_path
+
+def download_audio(audio_url: str, dest: str) -> int:
+    """Stream audio to dest; return the number of bytes written, 0 on failure."""
+    import requests
+    url = urljoin(BASE, audio_url)
+    negative = get_negative_index()
+    if negative.known_missing(url):
+        return 0
+    tmp = dest + ".part"
+    status, size = 0, 0
+    t0 = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with get_session().get(url, timeout=AUDIO_TIMEOUT, stream=True) as r:
+            status = r.status_code
+            if r.status_code != 200:
+                negative.record(url, status)
+                return 0
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    if chunk:
+                        f.write(chunk)
+                        size += len(chunk)
+        if size == 0:
+            os.remove(tmp)
+            return 0
+        os.replace(tmp, dest)
+        return size
+    except (requests.RequestException, OSError):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return 0
+    finally:
+        _notify("audio", url, status, size, time.perf_counter() - t0)
+
+def store_pair(base_dir: str, poet: str, section_path: str, sh: int, text, audio_url: str,
+               manifest=None, corpus=None) -> bool:
+    """
+    Save poem text (a str or a Poem) and its audio. Nothing is kept unless both succeed.
+    When a manifest is given, the poem is recorded there as completed.
+    When a corpus writer is given, text goes into its packed shards instead of data/text.
+    """
+    text_path, audio_path = poem_paths(base_dir, poet, section_path, sh, audio_url)
+    with span("audio", poet=poet, section=section_path, sh=sh):
+        audio_bytes = download_audio(audio_url, audio_path)
+    if not audio_bytes:
+        return False
+    if corpus is not None:
+        audio_ref = os.path.relpath(audio_path, base_dir).replace(os.sep, "/")
+        corpus.append(poet, section_path, sh, text, audio_ref=audio_ref,
+                      audio_bytes=audio_bytes, manifest=manifest)
+        return True
+    os.makedirs(os.path.dirname(text_path), exist_ok=True)
+    with open(text_path, "w", encoding="utf-8") as f:
+        if isinstance(text, Poem):
+            text.write_text(f)
+        else:
+            f.write(text)
+    if manifest is not None:
+        manifest.mark_done(poet, section_path, sh, text, audio_bytes)
+    return True
@@ -0,0 +1,136 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+import datetime
+import json
+import os
+import time
+
+JOBS_DIR = os.path.join("data", "jobs")
+CHECKPOINT_EVERY = 25
+
+@dataclass
+class Job:
+    """
+    Persistent state of a long download run.
+    - plan: ordered [poet, section_path] pairs the run will cover.
+    - counts: known poem count per "poet/section_path" (filled lazily on discovery).
+    - cursor: next sh to process per "poet/section_path".
+    The job is checkpointed to data/jobs/<job_id>.json every `checkpoint_every` poems
+    and whenever a section or the run ends.
+    """
+    job_id: str
+    poets: List[str]
+    rate_ms: int
+    plan: List[List[str]] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+    cursor: Dict[str, int] = field(default_factory=dict)
+    status: str = "running"
+    created: float = 0.0
+    updated: float = 0.0
+    checkpoint_every: int = CHECKPOINT_EVERY
+    jobs_dir: str = JOBS_DIR
+    _pending: int = field(default=0, repr=False)
+    _ahead: Dict[str, set] = field(default_factory=dict, repr=False)
+
+    @staticmethod
+    def key(poet: str, section_path: str) -> str:
+        return f"{poet}/{section_path}"
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.jobs_dir, f"{self.job_id}.json")
+
+    def add_section(self, poet: str, section_path: str, count: Optional[int] = None):
+        if [poet, section_path] not in self.plan:
+            self.plan.append([poet, section_path])
+        if count:
+            self.counts[self.key(poet, section_path)] = int(count)
+
+    def set_count(self, poet: str, section_path: str, count: int):
+        self.counts[self.key(poet, section_path)] = int(count)
+
+    def next_sh(self, poet: str, section_path: str) -> int:
+        return self.cursor.get(self.key(poet, section_path), 1)
+
+    def section_done(self, poet: str, section_path: str) -> bool:
+        cnt = self.counts.get(self.key(poet, section_path))
+        return cnt is not None and self.next_sh(poet, section_path) > cnt
+
+    def advance(self, poet: str, section_path: str, sh: int):
+        """
+        Record that sh has been handled (saved or skipped) and checkpoint periodically.
+        Results may arrive out of order from concurrent workers; the cursor only
+        moves past sh once every earlier sh of the section has been handled.
+        """
+        k = self.key(poet, section_path)
+        cur = self.cursor.get(k, 1)
+        if sh >= cur:
+            ahead = self._ahead.setdefault(k, set())
+            ahead.add(sh)
+            while cur in ahead:
+                ahead.discard(cur)
+                cur += 1
+            self.cursor[k] = cur
+        self._pending += 1
+        if self._pending >= self.checkpoint_every:
+            self.checkpoint()
+
+    def progress(self) -> tuple[int, int]:
+        done, total = 0, 0
+        for poet, section_path in self.plan:
+            k = self.key(poet, section_path)
+            cnt = self.counts.get(k)
+            if cnt is None:
+                continue
+            total += cnt
+            done += min(self.cursor.get(k, 1) - 1, cnt)
+        return done, total
+
+    def checkpoint(self):
+        self.updated = time.time()
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        data = asdict(self)
+        data.pop("_pending", None)
+        data.pop("_ahead", None)
+        data.pop("jobs_dir", None)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+        self._pending = 0
+
+    def finish(self, status: str = "done"):
+        self.status = status
+        self.checkpoint()
+
+def new_job(poets: List[str], rate_ms: int, jobs_dir: str = JOBS_DIR) -> Job:
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    label = poets[0] if len(poets) == 1 else "all"
+    now = time.time()
+    job = Job(job_id=f"{stamp}-{label}", poets=list(poets), rate_ms=rate_ms,
+              created=now, updated=now, jobs_dir=jobs_dir)
+    job.checkpoint()
+    return job
+
+def load_job(job_id: str, jobs_dir: str = JOBS_DIR) -> Job:
+    path = os.path.join(jobs_dir, f"{job_id}.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Job not found: {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data.pop("_pending", None)
+    data.pop("jobs_dir", None)
+    return Job(jobs_dir=jobs_dir, **data)
+
+def list_jobs(jobs_dir: str = JOBS_DIR) -> List[Job]:
+    if not os.path.isdir(jobs_dir):
+        return []
+    jobs = []
+    for name in sorted(os.listdir(jobs_dir)):
+        if name.endswith(".json"):
+            try:
+                jobs.append(load_job(name[:-5], jobs_dir))
+            except (ValueError, TypeError):
+                continue
+    return jobs
@@ -0,0 +1,271 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+import os
+import sqlite3
+import time
+
+LEASES_PATH = os.path.join("data", "metadata", "leases.sqlite")
+LEASE_SECONDS = 300
+UNIT_SIZE = 50
+MAX_ATTEMPTS = 3
+MIN_STEAL = 4
+
+@dataclass
+class WorkUnit:
+    id: int
+    poet: str
+    section_path: str
+    sh_start: int
+    sh_end: int
+    attempts: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.poet}/{self.section_path} sh{self.sh_start}..sh{self.sh_end}"
+
+def split_range(count: int, unit_size: int = UNIT_SIZE) -> List[tuple]:
+    return [(s, min(s + unit_size - 1, count)) for s in range(1, count + 1, unit_size)]
+
+def _split_failed(failed_sh: str, split_at: int) -> tuple:
+    """Divide a failed_sh list between the ranges [.., split_at - 1] and [split_at, ..]."""
+    shs = [int(x) for x in failed_sh.split(",") if x]
+    return (",".join(str(sh) for sh in shs if sh < split_at),
+            ",".join(str(sh) for sh in shs if sh >= split_at))
+
+class ChunkSizer:
+    """
+    Chooses how many poems a worker claims at once so that a chunk takes about
+    target_s seconds, from an exponential moving average of observed per-poem time.
+    """
+
+    def __init__(self, target_s: float = 120.0, min_size: int = 5, max_size: int = 400,
+                 initial: int = UNIT_SIZE, alpha: float = 0.3):
+        self.target_s = target_s
+        self.min_size = min_size
+        self.max_size = max_size
+        self.alpha = alpha
+        self.per_poem_s: Optional[float] = None
+        self._initial = initial
+
+    def observe(self, poems: int, seconds: float):
+        if poems <= 0:
+            return
+        sample = seconds / poems
+        if self.per_poem_s is None:
+            self.per_poem_s = sample
+        else:
+            self.per_poem_s = self.alpha * sample + (1 - self.alpha) * self.per_poem_s
+
+    @property
+    def size(self) -> int:
+        if not self.per_poem_s:
+            return max(self.min_size, min(self._initial, self.max_size))
+        return int(max(self.min_size, min(self.target_s / self.per_poem_s, self.max_size)))
+
+class LeaseQueue:
+    """
+    Shared table of work units (poet, section_path, sh range) in SQLite.
+    Workers in any process or host that can open the same file claim units with
+    an expiring lease, extend it with heartbeat(), and complete() or release()
+    it. A unit whose lease expires (worker died) becomes claimable again.
+    Units are split on demand: claim() takes at most max_poems off the front of a
+    unit, and steal() gives an idle worker the upper half of the range another
+    worker has not reached yet (owners see their shrunk end through report()).
+    A unit released with failed poems keeps their sh numbers (failed_sh) until it
+    completes, so a unit that runs out of attempts still says what is missing.
+    The file uses SQLite's default rollback journal rather than WAL so it also
+    works on a shared network volume.
+    """
+
+    def __init__(self, path: str = LEASES_PATH, lease_seconds: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS units (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                poet TEXT NOT NULL,
+                section_path TEXT NOT NULL,
+                sh_start INTEGER NOT NULL,
+                sh_end INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_until REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated REAL NOT NULL DEFAULT 0,
+                cursor INTEGER NOT NULL DEFAULT 0,
+                failed_sh TEXT NOT NULL DEFAULT '',
+                UNIQUE (poet, section_path, sh_start)
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS units_state ON units (state, lease_until)")
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- seeding ----------
+    def seed(self, units: Iterable[tuple]) -> int:
+        """Insert (poet, section_path, sh_start, sh_end) units; existing ones are kept as they are."""
+        now = time.time()
+        added = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for poet, section_path, start, end in units:
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO units (poet, section_path, sh_start, sh_end, updated) VALUES (?, ?, ?, ?, ?)",
+                    (poet, section_path, int(start), int(end), now))
+                added += cur.rowcount
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def seed_from_modes(self, modes: dict, poets: Optional[List[str]] = None, unit_size: int = UNIT_SIZE) -> int:
+        units = []
+        for poet in sorted(poets or modes.keys()):
+            for section_path, cfg in modes.get(poet, {}).items():
+                if cfg.get("mode") != "sh_pages" or not cfg.get("count"):
+                    continue
+                for start, end in split_range(int(cfg["count"]), unit_size):
+                    units.append((poet, section_path, start, end))
+        return self.seed(units)
+
+    # ---------- leases ----------
+    def claim(self, worker_id: str, max_poems: Optional[int] = None) -> Optional[WorkUnit]:
+        """Lease the next pending (or expired) unit; with max_poems, split off and lease only its front."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT id, poet, section_path, sh_start, sh_end, attempts, failed_sh FROM units "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+                "ORDER BY attempts, id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            unit = WorkUnit(*row[:6])
+            failed_sh = row[6]
+            # an expired unit may already be partly done by its dead owner;
+            # the manifest skips those poems, so start from the unit's own start
+            if max_poems and unit.sh_end - unit.sh_start + 1 > max_poems:
+                split_at = unit.sh_start + max_poems
+                failed_sh, rest_failed = _split_failed(failed_sh, split_at)
+                self.conn.execute(
+                    "INSERT INTO units (poet, section_path, sh_start, sh_end, attempts, updated, failed_sh) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (unit.poet, unit.section_path, split_at, unit.sh_end, unit.attempts, now, rest_failed))
+                unit.sh_end = split_at - 1
+            self.conn.execute(
+                "UPDATE units SET state = 'leased', owner = ?, lease_until = ?, updated = ?, "
+                "sh_end = ?, cursor = sh_start, failed_sh = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, unit.sh_end, failed_sh, unit.id))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return unit
+
+    def steal(self, worker_id: str, min_poems: int = MIN_STEAL) -> Optional[WorkUnit]:
+        """
+        Take the upper half of the largest range other workers still have ahead of them.
+        The victim keeps [.., mid - 1] and notices the new end on its next report().
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT id, poet, section_path, MAX(cursor, sh_start) AS pos, sh_end, failed_sh FROM units "
+                "WHERE state = 'leased' AND lease_until >= ? AND owner != ? "
+                "AND sh_end - MAX(cursor, sh_start) + 1 >= ? "
+                "ORDER BY sh_end - MAX(cursor, sh_start) DESC, id LIMIT 1",
+                (now, worker_id, 2 * min_poems)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            victim_id, poet, section_path, pos, end, failed_sh = row
+            mid = pos + (end - pos + 1) // 2
+            kept_failed, stolen_failed = _split_failed(failed_sh, mid)
+            self.conn.execute("UPDATE units SET sh_end = ?, failed_sh = ?, updated = ? WHERE id = ?",
+                              (mid - 1, kept_failed, now, victim_id))
+            cur = self.conn.execute(
+                "INSERT INTO units (poet, section_path, sh_start, sh_end, state, owner, lease_until, updated, cursor, "
+                "failed_sh) VALUES (?, ?, ?, ?, 'leased', ?, ?, ?, ?, ?)",
+                (poet, section_path, mid, end, worker_id, now + self.lease_seconds, now, mid, stolen_failed))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return WorkUnit(cur.lastrowid, poet, section_path, mid, end)
+
+    def report(self, unit_id: int, worker_id: str, cursor: int) -> Optional[int]:
+        """Record the next sh the owner will start; returns the unit's current end, or None if the lease is lost."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self.conn.execute(
+                "UPDATE units SET cursor = ?, lease_until = ?, updated = ? "
+                "WHERE id = ? AND owner = ? AND state = 'leased'",
+                (cursor, now + self.lease_seconds, now, unit_id, worker_id))
+            row = self.conn.execute("SELECT sh_end FROM units WHERE id = ?", (unit_id,)).fetchone()
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        if cur.rowcount != 1 or row is None:
+            return None
+        return row[0]
+
+    def heartbeat(self, unit_id: int, worker_id: str) -> bool:
+        """Extend the lease; False means it was lost (expired and claimed by someone else)."""
+        now = time.time()
+        cur = self.conn.execute(
+            "UPDATE units SET lease_until = ?, updated = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+            (now + self.lease_seconds, now, unit_id, worker_id))
+        return cur.rowcount == 1
+
+    def complete(self, unit_id: int, worker_id: str) -> bool:
+        cur = self.conn.execute(
+            "UPDATE units SET state = 'done', lease_until = 0, failed_sh = '', updated = ? WHERE id = ? AND owner = ?",
+            (time.time(), unit_id, worker_id))
+        return cur.rowcount == 1
+
+    def release(self, unit_id: int, worker_id: str, failed: bool = True, failed_sh: Iterable[int] = ()) -> bool:
+        """
+        Give a unit back. A failed release counts an attempt; too many marks it failed.
+        failed_sh (poems that did not make it in this attempt) replaces what was recorded before.
+        """
+        sh_list = ",".join(str(sh) for sh in sorted(set(failed_sh)))
+        cur = self.conn.execute(
+            "UPDATE units SET "
+            "attempts = attempts + ?, "
+            "state = CASE WHEN attempts + ? >= ? THEN 'failed' ELSE 'pending' END, "
+            "owner = NULL, lease_until = 0, updated = ?, "
+            "failed_sh = CASE WHEN ? != '' THEN ? ELSE failed_sh END "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (int(failed), int(failed), self.max_attempts, time.time(), sh_list, sh_list, unit_id, worker_id))
+        return cur.rowcount == 1
+
+    # ---------- progress ----------
+    def progress(self) -> Dict[str, Dict[str, int]]:
+        """Poem counts per poet and state: {poet: {"pending": n, "leased": n, "done": n, "failed": n}}."""
+        out: Dict[str, Dict[str, int]] = {}
+        now = time.time()
+        rows = self.conn.execute(
+            "SELECT poet, CASE WHEN state = 'leased' AND lease_until < ? THEN 'pending' ELSE state END, "
+            "SUM(sh_end - sh_start + 1) FROM units GROUP BY 1, 2", (now,))
+        for poet, state, poems in rows:
+            out.setdefault(poet, {}).setdefault(state, 0)
+            out[poet][state] += poems
+        return out
+
+    def failed_poems(self) -> List[tuple]:
+        """(poet, section_path, sh) recorded as failed on units that are not done, e.g. for a re-drive."""
+        out = []
+        rows = self.conn.execute(
+            "SELECT poet, section_path, failed_sh FROM units WHERE state != 'done' AND failed_sh != '' ORDER BY id")
+        for poet, section_path, sh_list in rows:
+            out.extend((poet, section_path, int(sh)) for sh in sh_list.split(","))
+        return out
@@ -0,0 +1,154 @@
+from __future__ import annotations
+from typing import Dict, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_PATH = os.path.join("data", "metadata", "manifest.jsonl")
+
+Key = Tuple[str, str, int]
+
+def text_hash(text) -> str:
+    """sha1 of a poem's flat text; a poem.Poem is hashed without joining it into one string."""
+    if not isinstance(text, str):
+        return text.digest()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class Manifest:
+    """
+    Persistent record of completed poems, keyed by (poet, section_path, sh).
+    Stored as append-only JSONL with short keys:
+      {"p": poet, "s": section_path, "n": sh, "h": sha1(text), "a": audio_bytes}
+    Later lines for the same key win, so re-marking a poem simply appends.
+    Runners check is_done() before issuing any request for a poem. mark_done() is
+    safe to call from several store workers at once.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self.entries: Dict[Key, Tuple[str, int]] = {}
+        self._counts: Dict[Tuple[str, str], int] = {}  # (poet, section_path) -> poems done
+        self._fh = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                    key = (rec["p"], rec["s"], int(rec["n"]))
+                except (ValueError, KeyError):
+                    # tolerate a torn last line after a crash
+                    continue
+                self._set(key, (rec.get("h", ""), int(rec.get("a", 0))))
+
+    def _set(self, key: Key, value: Tuple[str, int]):
+        if key not in self.entries:
+            self._counts[key[:2]] = self._counts.get(key[:2], 0) + 1
+        self.entries[key] = value
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self.entries
+
+    def is_done(self, poet: str, section_path: str, sh: int) -> bool:
+        return (poet, section_path, int(sh)) in self.entries
+
+    def get(self, poet: str, section_path: str, sh: int) -> Optional[Tuple[str, int]]:
+        return self.entries.get((poet, section_path, int(sh)))
+
+    def mark_done(self, poet: str, section_path: str, sh: int, text: str, audio_bytes: int):
+        key = (poet, section_path, int(sh))
+        digest = text_hash(text)
+        rec = {"p": poet, "s": section_path, "n": int(sh), "h": digest, "a": int(audio_bytes)}
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._set(key, (digest, int(audio_bytes)))
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8")
+            self._fh.write(line)
+            self._fh.flush()
+
+    def done_count(self, poet: str, section_path: Optional[str] = None) -> int:
+        if section_path is not None:
+            return self._counts.get((poet, section_path), 0)
+        return sum(n for (p, _s), n in self._counts.items() if p == poet)
+
+    def compact(self):
+        """Rewrite the file with one line per key (drops superseded lines)."""
+        with self._lock:
+            self._close_locked()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for (p, s, n), (h, a) in sorted(self.entries.items()):
+                    rec = {"p": p, "s": s, "n": n, "h": h, "a": a}
+                    f.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(tmp, self.path)
+
+    def backfill_from_disk(self, base_dir: str = "data") -> int:
+        """
+        Register poems already saved as data/text/<poet>/<section>/shN.txt with a
+        matching file under data/audio/. Used once when no manifest exists yet.
+        """
+        text_root = os.path.join(base_dir, "text")
+        audio_root = os.path.join(base_dir, "audio")
+        added = 0
+        if not os.path.isdir(text_root):
+            return 0
+        for dirpath, _dirs, files in os.walk(text_root):
+            rel = os.path.relpath(dirpath, text_root).replace(os.sep, "/")
+            parts = rel.split("/", 1)
+            if len(parts) < 2:
+                continue
+            poet, section_path = parts
+            # audio file per stem, listed once per section
+            audio_dir = os.path.join(audio_root, poet, *section_path.split("/"))
+            audio_files = {}
+            if os.path.isdir(audio_dir):
+                for cand in sorted(os.listdir(audio_dir)):
+                    audio_files.setdefault(os.path.splitext(cand)[0], os.path.join(audio_dir, cand))
+            for name in files:
+                stem, ext = os.path.splitext(name)
+                if ext != ".txt" or not stem.startswith("sh") or not stem[2:].isdigit():
+                    continue
+                sh = int(stem[2:])
+                if self.is_done(poet, section_path, sh):
+                    continue
+                audio_file = audio_files.get(stem)
+                if audio_file is None:
+                    continue
+                with open(os.path.join(dirpath, name), "r", encoding="utf-8") as f:
+                    text = f.read()
+                self.mark_done(poet, section_path, sh, text, os.path.getsize(audio_file))
+                added += 1
+        return added
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+def load_manifest(path: str = MANIFEST_PATH, base_dir: str = "data") -> Manifest:
+    """Open the manifest, seeding it from files on disk the first time."""
+    fresh = not os.path.exists(path)
+    manifest = Manifest(path)
+    if fresh:
+        added = manifest.backfill_from_disk(base_dir)
+        if added:
+            print(f"[MANIFEST] registered {added} poems already on disk")
+    return manifest
@@ -0,0 +1,172 @@
+from __future__ import annotations
+from typing import Dict, Optional, Tuple
+import atexit
+import bisect
+import os
+import threading
+import time
+
+# exposition is switched on by environment, so every runner gets it the same way:
+#   GANJOOR_METRICS_FILE=data/metadata/metrics.prom  -> Prometheus text file, rewritten every few seconds
+#   GANJOOR_METRICS_PORT=9109                        -> http://127.0.0.1:9109/metrics
+ENV_FILE = "GANJOOR_METRICS_FILE"
+ENV_PORT = "GANJOOR_METRICS_PORT"
+WRITE_INTERVAL = 5.0
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+THROUGHPUT_BUCKETS = tuple(float(2 ** k * 1024) for k in range(4, 15, 2))  # 16KB/s .. 16MB/s
+
+# name -> (type, help, buckets)
+DEFINITIONS = {
+    "ganjoor_http_requests_total": ("counter", "HTTP requests by kind (page/audio) and status (0 = failed)", None),
+    "ganjoor_http_bytes_total": ("counter", "Bytes received by kind", None),
+    "ganjoor_http_seconds": ("histogram", "HTTP request time by kind", LATENCY_BUCKETS),
+    "ganjoor_audio_bytes_per_second": ("histogram", "Audio download throughput", THROUGHPUT_BUCKETS),
+    "ganjoor_fetch_seconds": ("histogram", "Poem page fetch time in the pipeline", LATENCY_BUCKETS),
+    "ganjoor_parse_seconds": ("histogram", "Poem page parse time", LATENCY_BUCKETS),
+    "ganjoor_store_seconds": ("histogram", "Audio download + store time per poem", LATENCY_BUCKETS),
+    "ganjoor_page_bytes_total": ("counter", "Poem page bytes fetched by the pipeline", None),
+    "ganjoor_poems_total": ("counter", "Pipeline outcomes by result (saved, already_done, html_not_200, ...)", None),
+    "ganjoor_queue_depth": ("gauge", "Items waiting in front of a pipeline stage", None),
+    "ganjoor_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)", None),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+class Metrics:
+    """
+    In-process counters, gauges and histograms keyed by name and labels
+    (poet, section, stage, ...), rendered in the Prometheus text format.
+    All methods are thread-safe and cheap enough to call per request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        self._hists: Dict[str, Dict[Labels, list]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = DEFINITIONS[name][2]
+        key = _labels(labels)
+        with self._lock:
+            h = self._hists.setdefault(name, {}).get(key)
+            if h is None:
+                # per-bucket counts (+Inf last), sum, count
+                h = self._hists[name][key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            h[0][bisect.bisect_left(buckets, value)] += 1
+            h[1] += value
+            h[2] += 1
+
+    def get(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._values.get(name, {}).get(_labels(labels), 0)
+
+    def count(self, name: str, **labels) -> int:
+        """Number of observations of a histogram series."""
+        with self._lock:
+            h = self._hists.get(name, {}).get(_labels(labels))
+            return h[2] if h else 0
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._values) | set(self._hists)):
+                kind, help_text, buckets = DEFINITIONS.get(name, ("untyped", "", None))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, v in sorted(self._values.get(name, {}).items()):
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(v)}")
+                for labels, (counts, total, n) in sorted(self._hists.get(name, {}).items()):
+                    acc = 0
+                    for bound, c in zip(list(buckets) + ["+Inf"], counts):
+                        acc += c
+                        le = bound if bound == "+Inf" else _fmt_value(bound)
+                        lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', le))} {acc}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(round(total, 6))}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {n}")
+        return "\n".join(lines) + "\n"
+
+    # ---------- exposition ----------
+    def write_textfile(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def start_textfile(self, path: str, interval: float = WRITE_INTERVAL):
+        """Rewrite `path` every `interval` seconds (and once more at exit) for node_exporter's textfile collector."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.write_textfile(path)
+        threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+        atexit.register(self.write_textfile, path)
+
+    def start_http(self, port: int, host: str = "127.0.0.1"):
+        """Serve GET /metrics on a local port from a daemon thread; returns the server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+_shared: Optional[Metrics] = None
+_shared_lock = threading.Lock()
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics; exposition starts on first use when GANJOOR_METRICS_FILE/PORT is set."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Metrics()
+            path = os.environ.get(ENV_FILE)
+            if path:
+                _shared.start_textfile(path)
+            port = os.environ.get(ENV_PORT)
+            if port:
+                try:
+                    _shared.start_http(int(port))
+                    print(f"[METRICS] serving http://127.0.0.1:{port}/metrics")
+                except (OSError, ValueError) as e:
+                    print(f"[METRICS] cannot serve on port {port}: {e}")
+        return _shared
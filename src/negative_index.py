@@ -0,0 +1,205 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import List, Optional
+import atexit
+import base64
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+
+from metrics import get_metrics
+
+INDEX_PATH = os.path.join("data", "metadata", "negative_index.json")
+TTL_S = 3 * 24 * 3600.0
+CAPACITY = 50000        # URLs per Bloom generation before a new one is started
+FP_RATE = 1e-6          # false positive rate of a full generation (a false positive skips a real page)
+RECENT_MAX = 5000       # URLs also kept exactly, with the time they were seen missing
+SAVE_EVERY = 50         # new URLs between saves (and once more at exit)
+MISSING_STATUSES = (404, 410)
+ENV_PATH = "GANJOOR_NEGATIVE_INDEX"  # file path, or "off"
+ENV_TTL = "GANJOOR_NEGATIVE_TTL"     # e.g. 12h, 3d
+
+class _Bloom:
+    def __init__(self, capacity: int, fp_rate: float, created: Optional[float] = None):
+        self.nbits = max(64, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.nhashes = max(1, round(self.nbits / capacity * math.log(2)))
+        self.bits = bytearray((self.nbits + 7) // 8)
+        self.count = 0
+        self.created = time.time() if created is None else created
+
+    def _positions(self, url: str):
+        d = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+        return ((h1 + i * h2) % self.nbits for i in range(self.nhashes))
+
+    def add(self, url: str):
+        for p in self._positions(url):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, url: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(url))
+
+    def to_json(self) -> dict:
+        return {"created": self.created, "count": self.count, "nbits": self.nbits,
+                "nhashes": self.nhashes, "bits": base64.b64encode(bytes(self.bits)).decode("ascii")}
+
+    @classmethod
+    def from_json(cls, d: dict) -> "_Bloom":
+        b = cls.__new__(cls)
+        b.nbits, b.nhashes, b.count, b.created = d["nbits"], d["nhashes"], d["count"], d["created"]
+        b.bits = bytearray(base64.b64decode(d["bits"]))
+        return b
+
+class NegativeIndex:
+    """
+    URLs known to answer 404/410, so later runs skip them without a request.
+    The most recent RECENT_MAX are kept exactly with their time; older ones only in
+    Bloom generations. A generation takes new URLs for ttl_s/2 (or until it holds
+    capacity) and is dropped once it is ttl_s old, so a URL is forgotten between
+    ttl_s/2 and ttl_s after it was last seen missing, and then probed again.
+    discard() makes a URL fetchable again right away (e.g. for a re-drive); since a
+    Bloom filter cannot delete, it is kept in a cleared set that overrides the filters.
+    """
+
+    def __init__(self, path: Optional[str] = INDEX_PATH, ttl_s: float = TTL_S, capacity: int = CAPACITY,
+                 fp_rate: float = FP_RATE, recent_max: int = RECENT_MAX, save_every: int = SAVE_EVERY):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.recent_max = recent_max
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self._generations: List[_Bloom] = []
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._cleared: dict = {}  # url -> when it was discarded
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self._generations = [_Bloom.from_json(g) for g in data.get("generations", [])]
+                self._recent = OrderedDict(data.get("recent", []))
+                self._cleared = dict(data.get("cleared", {}))
+            except (OSError, ValueError, KeyError):
+                self._generations, self._recent, self._cleared = [], OrderedDict(), {}  # a damaged index only costs requests
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def _expire_locked(self, now: float):
+        self._generations = [g for g in self._generations if now - g.created < self.ttl_s]
+        # once every generation older than a discard is gone, the discard has nothing left to hide
+        for url in [u for u, t in self._cleared.items() if now - t >= self.ttl_s]:
+            del self._cleared[url]
+
+    def known_missing(self, url: str) -> bool:
+        """True when url answered 404/410 recently enough that asking again is pointless."""
+        now = time.time()
+        with self._lock:
+            seen = self._recent.get(url)
+            if seen is not None:
+                # the exact time wins over the Bloom generations it also sits in
+                missing = now - seen < self.ttl_s
+                if not missing:
+                    del self._recent[url]
+            else:
+                self._expire_locked(now)
+                missing = url not in self._cleared and any(url in g for g in self._generations)
+            if missing:
+                self.hits += 1
+            else:
+                self.misses += 1
+        get_metrics().inc("ganjoor_cache_requests_total", cache="negative", result="hit" if missing else "miss")
+        return missing
+
+    def add(self, url: str):
+        now = time.time()
+        with self._lock:
+            self._expire_locked(now)
+            cur = self._generations[-1] if self._generations else None
+            if cur is None or cur.count >= self.capacity or now - cur.created >= self.ttl_s / 2:
+                cur = _Bloom(self.capacity, self.fp_rate, now)
+                self._generations.append(cur)
+            cur.add(url)
+            self._cleared.pop(url, None)
+            self._recent[url] = now
+            self._recent.move_to_end(url)
+            while len(self._recent) > self.recent_max:
+                self._recent.popitem(last=False)
+            self._unsaved += 1
+            if self.path and self._unsaved >= self.save_every:
+                self._save_locked()
+
+    def record(self, url: str, status: int):
+        """Remember url when status says it does not exist (other failures may be transient)."""
+        if status in MISSING_STATUSES:
+            self.add(url)
+
+    def discard(self, url: str):
+        """Forget that url was missing, so the next fetch asks the site again."""
+        with self._lock:
+            self._recent.pop(url, None)
+            if any(url in g for g in self._generations):
+                self._cleared[url] = time.time()
+            self._unsaved += 1
+
+    def save(self):
+        with self._lock:
+            if self.path and self._unsaved:
+                self._save_locked()
+
+    def _save_locked(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"generations": [g.to_json() for g in self._generations],
+                       "recent": list(self._recent.items()), "cleared": self._cleared}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._unsaved = 0
+
+class _Disabled:
+    """Stand-in when GANJOOR_NEGATIVE_INDEX=off: nothing is known, nothing is kept."""
+    hits = misses = 0
+
+    def __len__(self) -> int:
+        return 0
+
+    def known_missing(self, url: str) -> bool:
+        return False
+
+    def add(self, url: str):
+        pass
+
+    def record(self, url: str, status: int):
+        pass
+
+    def discard(self, url: str):
+        pass
+
+    def save(self):
+        pass
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_negative_index():
+    """Process-wide index, configured from GANJOOR_NEGATIVE_INDEX / GANJOOR_NEGATIVE_TTL; saved at exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            path = os.environ.get(ENV_PATH, INDEX_PATH)
+            if path.lower() in ("off", "0", "none", ""):
+                _shared = _Disabled()
+            else:
+                from verdict_cache import parse_ttl
+                ttl = os.environ.get(ENV_TTL)
+                _shared = NegativeIndex(path, ttl_s=parse_ttl(ttl) if ttl else TTL_S)
+                atexit.register(_shared.save)
+        return _shared
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+import queue
+import threading
+import time
+
+from extractor import fetch_html, parse_poem_page
+from metrics import get_metrics
+from url_builder import build_poem_url
+
+MAX_ENTRIES = 128
+TTL_S = 600.0
+WAIT_S = 30.0
+
+class PageCache:
+    """
+    Small in-memory LRU of fetched HTML pages (url -> html) with a TTL.
+    fetch() returns a cached page, waits for a fetch of the same URL already in
+    progress (e.g. by the prefetcher), or fetches it itself. Failed fetches are
+    not cached.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl_s: float = TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._fresh(url) is not None
+
+    def _fresh(self, url: str) -> Optional[str]:
+        item = self._entries.get(url)
+        if item is None:
+            return None
+        html, stored = item
+        if time.monotonic() - stored > self.ttl_s:
+            del self._entries[url]
+            return None
+        self._entries.move_to_end(url)
+        return html
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            return self._fresh(url)
+
+    def put(self, url: str, html: str):
+        with self._lock:
+            self._entries[url] = (html, time.monotonic())
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pending(self, url: str) -> bool:
+        with self._lock:
+            return url in self._inflight
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        get_metrics().inc("ganjoor_cache_requests_total", cache="page", result="hit" if hit else "miss")
+
+    def fetch(self, url: str, fetch: Callable[[str], Optional[str]] = fetch_html, limiter=None,
+              count: bool = True) -> Optional[str]:
+        """Cached page or a fresh fetch (paced by limiter only when a request is really made)."""
+        with self._lock:
+            html = self._fresh(url)
+            ev = self._inflight.get(url)
+            owner = html is None and ev is None
+            if owner:
+                ev = self._inflight[url] = threading.Event()
+        if html is not None:
+            if count:
+                self._count(True)
+            return html
+        if not owner:
+            ev.wait(WAIT_S)
+            html = self.get(url)
+            if count:
+                self._count(html is not None)
+            if html is not None:
+                return html
+            # the other fetch failed: try once ourselves, without coalescing
+            if limiter is not None:
+                limiter.wait()
+            return fetch(url)
+        try:
+            if count:
+                self._count(False)
+            if limiter is not None:
+                limiter.wait()
+            html = fetch(url)
+            if html:
+                self.put(url, html)
+            return html
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+            ev.set()
+
+class Prefetcher:
+    """
+    Background thread that warms a PageCache with URLs the user or the pipeline will
+    probably ask for next. Requests go through the same limiter as the foreground
+    fetches, so prefetching never exceeds the configured request rate; while
+    max_queued URLs are waiting, further guesses are ignored.
+    """
+
+    def __init__(self, cache: PageCache, limiter=None, fetch: Callable[[str], Optional[str]] = fetch_html,
+                 max_queued: int = 32):
+        self.cache = cache
+        self.limiter = limiter
+        self.fetch = fetch
+        self.max_queued = max_queued
+        self.fetched = 0
+        self._q: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+        self._thread.start()
+
+    def submit(self, urls: Iterable[str]):
+        for url in urls:
+            with self._lock:
+                if url in self._queued or url in self.cache or self.cache.pending(url):
+                    continue
+                if len(self._queued) >= self.max_queued:
+                    continue
+                self._queued.add(url)
+            self._q.put(url)
+
+    def _run(self):
+        while True:
+            url = self._q.get()
+            if url is None:
+                return
+            try:
+                if url not in self.cache:
+                    self.cache.fetch(url, self.fetch, self.limiter, count=False)
+                    self.fetched += 1
+            except Exception:
+                pass  # a failed guess only costs the foreground its own fetch
+            finally:
+                with self._lock:
+                    self._queued.discard(url)
+
+    def idle(self) -> bool:
+        with self._lock:
+            return not self._queued
+
+    def close(self):
+        self._q.put(None)
+
+def discover_count(poet: str, section_path: str, cache: PageCache, limiter=None,
+                   fetch: Callable[[str], Optional[str]] = fetch_html) -> int:
+    """
+    Last sh of a section with parseable text (0 if sh1 has none): exponential then
+    binary search, with pages read through `cache` so warmed or repeated probes are free.
+    """
+    def has_text(sh: int) -> bool:
+        try:
+            url = build_poem_url(poet, sh, section_path)
+        except Exception:
+            return False
+        html = cache.fetch(url, fetch, limiter)
+        return bool(html and parse_poem_page(html)[0])
+
+    if not has_text(1):
+        return 0
+    lo, hi = 1, 64
+    while has_text(hi):
+        lo, hi = hi, hi * 2
+    while lo + 1 < hi:
+        mid = (lo + hi) // 2
+        if has_text(mid): lo = mid
+        else: hi = mid
+    return lo
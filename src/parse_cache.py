@@ -0,0 +1,118 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Callable, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import get_metrics
+from poem import Poem
+
+MAX_ENTRIES = 256
+# bump when parse_poem's output for the same HTML changes, so stored results are not reused
+PARSER_VERSION = 2
+ENV_SIZE = "GANJOOR_PARSE_CACHE_SIZE"  # in-memory entries, 0 = off
+ENV_FILE = "GANJOOR_PARSE_CACHE_FILE"  # e.g. data/metadata/parse_cache.sqlite; unset = memory only
+
+def page_key(html) -> bytes:
+    """128-bit BLAKE2b of the page bytes."""
+    data = html.encode("utf-8") if isinstance(html, str) else html
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+class ParseCache:
+    """
+    Memoizes parse results by page content: identical HTML (whatever URL it came
+    from) is parsed once and afterwards costs one hash. Results live in an LRU of
+    max_entries Poems and, with a path, also in a SQLite table shared by runs and
+    processes, stored compactly as couplet lists plus audio URLs. Source metadata
+    (poet, section, sh, url) is not part of the key; callers attach their own.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, path: Optional[str] = None,
+                 version: int = PARSER_VERSION):
+        self.max_entries = max_entries
+        self.path = path
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Poem]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.conn = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS parses (
+                    key BLOB PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    couplets TEXT NOT NULL,
+                    audio TEXT NOT NULL,
+                    stored REAL NOT NULL
+                )""")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _remember_locked(self, key: bytes, poem: Poem):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = poem
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: bytes) -> Optional[Poem]:
+        with self._lock:
+            poem = self._entries.get(key)
+            if poem is not None:
+                self._entries.move_to_end(key)
+            elif self.conn is not None:
+                row = self.conn.execute("SELECT couplets, audio FROM parses WHERE key = ? AND version = ?",
+                                        (key, self.version)).fetchone()
+                if row is not None:
+                    poem = Poem.from_couplets(json.loads(row[0]), json.loads(row[1]))
+                    self._remember_locked(key, poem)
+            if poem is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        get_metrics().inc("ganjoor_cache_requests_total", cache="parse", result="hit" if poem is not None else "miss")
+        return poem
+
+    def put(self, key: bytes, poem: Poem):
+        with self._lock:
+            self._remember_locked(key, poem)
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO parses (key, version, couplets, audio, stored) VALUES (?, ?, ?, ?, ?)",
+                    (key, self.version, json.dumps(poem.couplet_lists(), ensure_ascii=False, separators=(",", ":")),
+                     json.dumps(poem.audio_urls, ensure_ascii=False), time.time()))
+
+    def parse(self, html, parse: Callable[[str], Poem]) -> Poem:
+        """Cached result for this page content, or parse(html) stored for next time."""
+        key = page_key(html)
+        poem = self.get(key)
+        if poem is None:
+            poem = parse(html)
+            self.put(key, poem)
+        return poem
+
+_shared: Optional[ParseCache] = None
+_shared_lock = threading.Lock()
+
+def get_parse_cache() -> ParseCache:
+    """Process-wide cache, sized by GANJOOR_PARSE_CACHE_SIZE and persisted to GANJOOR_PARSE_CACHE_FILE if set."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            size = os.environ.get(ENV_SIZE)
+            _shared = ParseCache(int(size) if size else MAX_ENTRIES, os.environ.get(ENV_FILE) or None)
+        return _shared
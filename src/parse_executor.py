@@ -0,0 +1,162 @@
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Sequence
+import multiprocessing
+import queue
+import threading
+import time
+
+from extractor import parse_poem
+from parse_cache import ParseCache, get_parse_cache, page_key
+from poem import Poem
+
+BATCH_SIZE = 8          # pages per trip to a worker process
+BATCH_WAIT_S = 0.005    # how long a partial batch waits for more pages
+INLINE_BELOW = 16       # the first pages of a run are parsed inline; the pool starts after them
+
+def _parse_batch(pages: List[bytes]) -> list:
+    """Runs in a worker process: raw page bytes in, compact Poem tuples (or the exception) out."""
+    out = []
+    for page in pages:
+        try:
+            out.append(parse_poem(page.decode("utf-8"), cache=False).compact())
+        except Exception as e:
+            out.append(e)
+    return out
+
+class ParseExecutor:
+    """
+    Parses pages for many threads at once; with processes the BeautifulSoup work runs outside our GIL.
+    With processes > 0, pages are shipped as raw UTF-8 bytes to worker processes in
+    batches of up to batch_size (a batch leaves when full, or batch_wait_s after its
+    first page) and come back as compact tuples, so one pickle round trip is paid
+    per batch instead of per page. With processes=0, and for the first inline_below
+    pages, parsing happens inline in the calling thread, so small jobs never start
+    the pool. Workers are spawned, not forked: a fork would copy locks held by the
+    fetch and store threads. Pages found in the parse cache never leave this process.
+    """
+
+    def __init__(self, processes: int = 0, batch_size: int = BATCH_SIZE, batch_wait_s: float = BATCH_WAIT_S,
+                 inline_below: int = INLINE_BELOW, cache: Optional[ParseCache] = None):
+        self.processes = max(0, processes)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_s = batch_wait_s
+        self.inline_below = inline_below
+        self.cache = cache if cache is not None else get_parse_cache()
+        self.submitted = 0
+        self.batches = 0
+        self.shipped = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._q: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def capacity(self) -> int:
+        """Pages that can usefully be in flight at once (callers size their thread count by it)."""
+        return self.processes * self.batch_size
+
+    def _enqueue(self, item: tuple) -> bool:
+        """Queue item for the pool, or False when this page is to be parsed inline."""
+        with self._lock:
+            self.submitted += 1
+            if self.processes == 0 or self._closed or self.submitted <= self.inline_below:
+                return False
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+                self._dispatcher = threading.Thread(target=self._dispatch, name="parse-dispatch", daemon=True)
+                self._dispatcher.start()
+            self._q.put(item)
+            return True
+
+    def submit(self, page: bytes, poet: Optional[str] = None, section_path: Optional[str] = None,
+               sh: Optional[int] = None, url: Optional[str] = None) -> "Future[Poem]":
+        """Future Poem for the page's UTF-8 bytes."""
+        fut: "Future[Poem]" = Future()
+        meta = {"poet": poet, "section_path": section_path, "sh": sh, "url": url}
+        key = page_key(page)
+        cached = self.cache.get(key)
+        if cached is not None:
+            fut.set_result(cached.with_source(**meta))
+        elif not self._enqueue((page, key, meta, fut)):
+            try:
+                poem = parse_poem(page.decode("utf-8"), cache=False)
+            except Exception as e:
+                fut.set_exception(e)
+            else:
+                self.cache.put(key, poem)
+                fut.set_result(poem.with_source(**meta))
+        return fut
+
+    def parse(self, page: bytes, poet: Optional[str] = None, section_path: Optional[str] = None,
+              sh: Optional[int] = None, url: Optional[str] = None) -> Poem:
+        return self.submit(page, poet, section_path, sh, url).result()
+
+    def parse_many(self, pages: Sequence[bytes]) -> List[Poem]:
+        """All pages at once (they fill batches right away); results in input order."""
+        return [f.result() for f in [self.submit(p) for p in pages]]
+
+    # ---------- batching ----------
+    def _dispatch(self):
+        stop = False
+        while not stop:
+            item = self._q.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait_s
+            while len(batch) < self.batch_size:
+                left = deadline - time.monotonic()
+                try:
+                    item = self._q.get(timeout=left) if left > 0 else self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._send(batch)
+
+    def _send(self, batch: list):
+        self.batches += 1
+        self.shipped += len(batch)
+        try:
+            pf = self._pool.submit(_parse_batch, [page for page, _, _, _ in batch])
+        except RuntimeError as e:  # pool already shut down
+            for _, _, _, fut in batch:
+                fut.set_exception(e)
+            return
+        pf.add_done_callback(lambda pf: self._resolve(batch, pf))
+
+    def _resolve(self, batch: list, pf):
+        if pf.cancelled() or pf.exception() is not None:
+            err = pf.exception() if not pf.cancelled() else RuntimeError("parse pool shut down")
+            for _, _, _, fut in batch:
+                fut.set_exception(err)
+            return
+        for (_, key, meta, fut), res in zip(batch, pf.result()):
+            if isinstance(res, Exception):
+                fut.set_exception(res)
+                continue
+            poem = Poem.from_compact(res)
+            self.cache.put(key, poem)
+            fut.set_result(poem.with_source(**meta))
+
+    def close(self):
+        """Send what is queued, then stop the pool (pages submitted afterwards parse inline)."""
+        with self._lock:
+            self._closed = True
+            dispatcher, pool = self._dispatcher, self._pool
+            if dispatcher is not None:
+                self._q.put(None)
+        if dispatcher is not None:
+            dispatcher.join()
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,7 +2,6 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Optional
 import os
-import pandas as pd  # requires: pip install pandas openpyxl
 
 @dataclass
 class ExcelTask:
@@ -21,6 +20,7 @@ def read_excel_tasks(poet: str, excel_path: str) -> List[ExcelTask]:
     if not os.path.exists(excel_path):
         raise FileNotFoundError(f"Excel file not found: {excel_path}")
 
+    import pandas as pd  # requires: pip install pandas openpyxl; loaded only when an Excel file is read
     df = pd.read_excel(excel_path, header=None, dtype=str)
     if df.empty:
         return []
@@ -0,0 +1,309 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional
+import queue
+import threading
+import time
+
+from url_builder import build_poem_url
+from extractor import fetch_html, parse_poem, store_pair
+from event_log import get_event_log, ms_since
+from metrics import get_metrics
+from negative_index import get_negative_index
+from profiling import span
+from parse_executor import BATCH_SIZE, ParseExecutor
+
+_DONE = object()
+
+@dataclass
+class PoemTask:
+    poet: str
+    section_path: str
+    sh: int
+
+    @property
+    def url(self) -> str:
+        return build_poem_url(self.poet, self.sh, self.section_path)
+
+@dataclass
+class PoemResult:
+    task: PoemTask
+    ok: bool
+    reason: str  # saved | already_done | known_missing | html_not_200 | missing_text_or_audio | audio_download_failed | error | budget_exhausted
+    url: str = ""
+    elapsed_ms: float = 0.0
+    page_bytes: int = 0
+
+class RateLimiter:
+    """Spaces request starts at least interval_s apart across all threads."""
+
+    def __init__(self, interval_s: float):
+        self.interval_s = max(interval_s, 0.0)
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if self.interval_s <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval_s
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+class Pipeline:
+    """
+    Fetch -> parse -> store pipeline shared by all runners.
+
+    - fetch stage: `fetch_workers` threads, network bound, paced by a shared RateLimiter.
+    - parse stage: `parse_threads` threads; with parse_processes > 0 each thread hands
+      the page bytes to a ParseExecutor, which batches them to worker processes so
+      BeautifulSoup work runs outside the GIL (or to parse_executor, one owned by the
+      caller and kept across runs). Enough threads are started to fill its batches.
+    - store stage: `store_workers` threads downloading audio and writing files/shards.
+    Stages are joined by bounded queues (queue_size), so a slow stage blocks the one
+    before it and memory stays flat however many tasks are fed in.
+
+    Poems already in the manifest, and pages the negative index knows answered 404, are
+    skipped before any request (and before the budget or the limiter). Every outcome is
+    written to the shared event log, advanced on the job (if any) and passed to on_result;
+    known_missing skips are only counted, since the 404 that put them in the index was logged.
+    With a page_cache, pages already there (e.g. warmed by a Prefetcher) are used
+    without a request. A progress object (e.g. dashboard.Dashboard) is attached to the
+    run and updated with every result. With a budget, feeding stops once it is exhausted (the reason is kept in .stopped)
+    and poems over a poet's quota are left out without a result, so a job resumes them. Fetch and store
+    workers check the budget again before each request: poems already queued then finish as
+    budget_exhausted, without an event or job progress, so they are picked up again on resume.
+    """
+
+    def __init__(self, rate_ms: int = 300, fetch_workers: int = 4, parse_threads: int = 1,
+                 parse_processes: int = 0, store_workers: int = 2, queue_size: int = 32,
+                 base_dir: str = "data", manifest=None, corpus=None, job=None,
+                 on_result: Optional[Callable[[PoemResult], None]] = None, verbose: bool = True,
+                 events=None, budget=None, page_cache=None, limiter=None, progress=None, parse_executor=None,
+                 negative=None):
+        # a limiter passed in is shared with other fetchers (e.g. a Prefetcher)
+        self.limiter = limiter if limiter is not None else RateLimiter(max(rate_ms, 0) / 1000.0)
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_processes = parse_processes
+        self.parse_executor = parse_executor
+        capacity = parse_executor.capacity if parse_executor is not None else parse_processes * BATCH_SIZE
+        self.parse_threads = max(1, parse_threads, capacity)
+        self.store_workers = max(1, store_workers)
+        self.queue_size = max(1, queue_size)
+        self.base_dir = base_dir
+        self.manifest = manifest
+        self.corpus = corpus
+        self.job = job
+        self.on_result = on_result
+        self.verbose = verbose
+        self.events = events if events is not None else get_event_log()
+        self.negative = negative if negative is not None else get_negative_index()
+        self.budget = budget
+        self.page_cache = page_cache
+        self.metrics = get_metrics()
+        self.progress = progress
+        self._fed = 0
+        self._fed_done = 0
+        self.stopped: Optional[str] = None
+        self.stats: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ---------- stages ----------
+    def _feed(self, tasks: Iterable[PoemTask], out_q: queue.Queue):
+        try:
+            for t in tasks:
+                if self.manifest is not None and self.manifest.is_done(t.poet, t.section_path, t.sh):
+                    self._finish(PoemResult(t, True, "already_done"))
+                    continue
+                if self.negative.known_missing(t.url):
+                    self._finish(PoemResult(t, False, "known_missing", t.url))
+                    continue
+                if self.budget is not None:
+                    if self._over_budget():
+                        break
+                    if not self.budget.take(t.poet):
+                        continue
+                with self._lock:
+                    self._fed += 1
+                out_q.put(t)
+        finally:
+            for _ in range(self.fetch_workers):
+                out_q.put(_DONE)
+
+    def _fetch(self, in_q: queue.Queue, out_q: queue.Queue, remaining: list):
+        while True:
+            t = in_q.get()
+            if t is _DONE:
+                break
+            t0 = time.perf_counter()
+            url = t.url
+            if (self.page_cache is None or url not in self.page_cache) and self._over_budget():
+                self._finish(PoemResult(t, False, "budget_exhausted", url))
+                continue
+            try:
+                if self.page_cache is not None:
+                    with span("fetch", poet=t.poet, section=t.section_path, sh=t.sh):
+                        html = self.page_cache.fetch(url, fetch_html, self.limiter)
+                else:
+                    self.limiter.wait()
+                    t0 = time.perf_counter()
+                    with span("fetch", poet=t.poet, section=t.section_path, sh=t.sh):
+                        html = fetch_html(url)
+            except Exception as e:
+                self._finish(PoemResult(t, False, "error", "", ms_since(t0)), detail=str(e))
+                continue
+            self.metrics.observe("ganjoor_fetch_seconds", time.perf_counter() - t0,
+                                 poet=t.poet, section=t.section_path)
+            if not html:
+                self._finish(PoemResult(t, False, "html_not_200", url, ms_since(t0)))
+                continue
+            out_q.put((t, url, html, t0))
+        self._stage_done(remaining, out_q, self.parse_threads)
+
+    def _parse(self, in_q: queue.Queue, out_q: queue.Queue, remaining: list, executor):
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                break
+            t, url, html, t0 = item
+            data = html.encode("utf-8")
+            page_bytes = len(data)
+            self.metrics.inc("ganjoor_page_bytes_total", page_bytes, poet=t.poet, section=t.section_path)
+            tp = time.perf_counter()
+            try:
+                with span("parse", poet=t.poet, section=t.section_path, sh=t.sh):
+                    if executor is not None:
+                        poem = executor.parse(data, t.poet, t.section_path, t.sh, url)
+                    else:
+                        poem = parse_poem(html, t.poet, t.section_path, t.sh, url)
+                self.metrics.observe("ganjoor_parse_seconds", time.perf_counter() - tp,
+                                     poet=t.poet, section=t.section_path)
+            except Exception as e:
+                self._finish(PoemResult(t, False, "error", url, ms_since(t0), page_bytes), detail=str(e))
+                continue
+            if not poem or not poem.audio_url:
+                self._finish(PoemResult(t, False, "missing_text_or_audio", url, ms_since(t0), page_bytes))
+                continue
+            out_q.put((t, url, poem, t0, page_bytes))
+        self._stage_done(remaining, out_q, self.store_workers)
+
+    def _store(self, in_q: queue.Queue):
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                break
+            t, url, poem, t0, page_bytes = item
+            if self._over_budget():
+                self._finish(PoemResult(t, False, "budget_exhausted", url, ms_since(t0), page_bytes))
+                continue
+            ts = time.perf_counter()
+            try:
+                with span("store", poet=t.poet, section=t.section_path, sh=t.sh):
+                    ok = store_pair(self.base_dir, t.poet, t.section_path, t.sh, poem, poem.audio_url,
+                                    manifest=self.manifest, corpus=self.corpus)
+                self.metrics.observe("ganjoor_store_seconds", time.perf_counter() - ts,
+                                     poet=t.poet, section=t.section_path)
+            except Exception as e:
+                self._finish(PoemResult(t, False, "error", url, ms_since(t0), page_bytes), detail=str(e))
+                continue
+            reason = "saved" if ok else "audio_download_failed"
+            self._finish(PoemResult(t, ok, reason, url, ms_since(t0), page_bytes))
+
+    def _over_budget(self) -> bool:
+        if self.budget is None:
+            return False
+        reason = self.budget.exhausted()
+        if reason:
+            self.stopped = reason
+        return reason is not None
+
+    def _stage_done(self, remaining: list, out_q: queue.Queue, downstream: int):
+        # the last worker of a stage tells every worker of the next stage to stop
+        with self._lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(downstream):
+                out_q.put(_DONE)
+
+    # ---------- results ----------
+    def _finish(self, res: PoemResult, detail: Optional[str] = None):
+        t = res.task
+        self.metrics.inc("ganjoor_poems_total", poet=t.poet, section=t.section_path, result=res.reason)
+        with self._lock:
+            self.stats[res.reason] = self.stats.get(res.reason, 0) + 1
+            # a poem stopped by the budget was not handled: nothing is logged and a job will redo it
+            handled = res.reason != "budget_exhausted"
+            if res.reason not in ("already_done", "known_missing") and handled:
+                page_bytes = res.page_bytes or None
+                if res.ok:
+                    self.events.saved(t.poet, t.section_path, t.sh, res.url, elapsed_ms=res.elapsed_ms,
+                                      page_bytes=page_bytes)
+                else:
+                    self.events.failure(t.poet, t.section_path, t.sh, res.reason, res.url,
+                                        elapsed_ms=res.elapsed_ms, detail=detail, page_bytes=page_bytes)
+            if self.job is not None and handled:
+                self.job.advance(t.poet, t.section_path, t.sh)
+            if self.verbose and res.reason != "already_done" and handled:
+                if res.ok:
+                    print(f"[saved] {t.poet}/{t.section_path}/sh{t.sh}")
+                else:
+                    print(f"[skip] {res.url or t.poet + '/' + t.section_path + '/sh' + str(t.sh)} -> {res.reason}")
+            if res.reason != "already_done":
+                self._fed_done += 1
+            if self.on_result is not None:
+                self.on_result(res)
+        if self.progress is not None:
+            self.progress.update(res)
+
+    def in_flight(self) -> int:
+        """Poems handed to the fetch stage and not finished yet."""
+        with self._lock:
+            return self._fed - self._fed_done
+
+    # ---------- driver ----------
+    def run(self, tasks: Iterable[PoemTask]) -> Dict[str, int]:
+        """Process all tasks and return counts per outcome (saved, already_done, html_not_200, ...)."""
+        self.stats = {}
+        self.stopped = None
+        if self.progress is not None:
+            self.progress.attach(self)
+        fetch_q: queue.Queue = queue.Queue(self.queue_size)
+        parse_q: queue.Queue = queue.Queue(self.queue_size)
+        store_q: queue.Queue = queue.Queue(self.queue_size)
+        own_executor = self.parse_executor is None and self.parse_processes > 0
+        executor = ParseExecutor(self.parse_processes) if own_executor else self.parse_executor
+        fetch_left, parse_left = [self.fetch_workers], [self.parse_threads]
+        threads = [threading.Thread(target=self._feed, args=(tasks, fetch_q), name="feed")]
+        threads += [threading.Thread(target=self._fetch, args=(fetch_q, parse_q, fetch_left), name=f"fetch-{i}")
+                    for i in range(self.fetch_workers)]
+        threads += [threading.Thread(target=self._parse, args=(parse_q, store_q, parse_left, executor), name=f"parse-{i}")
+                    for i in range(self.parse_threads)]
+        threads += [threading.Thread(target=self._store, args=(store_q,), name=f"store-{i}")
+                    for i in range(self.store_workers)]
+        for th in threads:
+            th.daemon = True
+            th.start()
+        try:
+            for th in threads:
+                while th.is_alive():
+                    th.join(0.2)  # short joins keep Ctrl-C responsive
+                    for stage, q in (("fetch", fetch_q), ("parse", parse_q), ("store", store_q)):
+                        self.metrics.set("ganjoor_queue_depth", q.qsize(), stage=stage)
+        finally:
+            if own_executor:
+                executor.close()
+        return dict(self.stats)
+
+    @staticmethod
+    def saved_skipped(stats: Dict[str, int]) -> tuple[int, int]:
+        saved = stats.get("saved", 0)
+        skipped = sum(v for k, v in stats.items() if k not in ("saved", "already_done", "budget_exhausted"))
+        return saved, skipped
+
+def section_tasks(poet: str, section_path: str, start_sh: int, end_sh: int):
+    for sh in range(start_sh, end_sh + 1):
+        yield PoemTask(poet, section_path, sh)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from event_log import EVENTS_PATH, read_events
+
+# used until the event log / manifest have enough history
+DEFAULT_PAGE_BYTES = 60 * 1024
+DEFAULT_AUDIO_BYTES = 1500 * 1024
+DEFAULT_POEM_MS = 1500.0
+MIN_SAMPLES = 20
+REQUESTS_PER_POEM = 2  # poem page + audio file
+
+@dataclass
+class History:
+    """Averages observed in earlier runs; defaults stand in where there is too little data."""
+    page_bytes: float = DEFAULT_PAGE_BYTES
+    audio_bytes: float = DEFAULT_AUDIO_BYTES
+    poem_ms: float = DEFAULT_POEM_MS
+    success_rate: float = 1.0
+    samples: int = 0
+
+def load_history(events_path: str = EVENTS_PATH, manifest=None, min_samples: int = MIN_SAMPLES) -> History:
+    h = History()
+    pages, times = [], []
+    saved = failed = 0
+    for rec in read_events(events_path):
+        if rec.get("event") != "poem":
+            continue
+        if rec.get("status") == "saved":
+            saved += 1
+            if rec.get("elapsed_ms"):
+                times.append(float(rec["elapsed_ms"]))
+        elif rec.get("status") == "failed":
+            failed += 1
+        if rec.get("page_bytes"):
+            pages.append(int(rec["page_bytes"]))
+    if len(pages) >= min_samples:
+        h.page_bytes = sum(pages) / len(pages)
+    if len(times) >= min_samples:
+        h.poem_ms = sum(times) / len(times)
+    if saved + failed >= min_samples:
+        h.success_rate = saved / (saved + failed)
+    if manifest is not None:
+        audio = [a for (_h, a) in manifest.entries.values() if a > 0]
+        if len(audio) >= min_samples:
+            h.audio_bytes = sum(audio) / len(audio)
+    h.samples = saved + failed
+    return h
+
+@dataclass
+class SectionPlan:
+    poet: str
+    section_path: str
+    total: Optional[int]  # None: count not discovered yet
+    done: int
+    todo: int
+    requests: int
+    bytes: int
+    seconds: float
+
+def plan_sections(modes: dict, poets: List[str], manifest=None, history: Optional[History] = None,
+                  rate_ms: int = 300, fetch_workers: int = 4) -> List[SectionPlan]:
+    """
+    Estimate the cost of downloading every sh_pages section of `poets`.
+    Poems in the manifest count as done. Each remaining poem costs one page request
+    plus, for the expected share that has audio, one audio request. Time per poem is
+    bounded by the request spacing (rate_ms) and by average poem time / fetch_workers.
+    """
+    h = history or History()
+    per_poem_s = max(rate_ms / 1000.0, h.poem_ms / 1000.0 / max(1, fetch_workers))
+    out = []
+    for poet in poets:
+        for section_path, cfg in modes.get(poet, {}).items():
+            if cfg.get("mode") != "sh_pages":
+                continue
+            total = cfg.get("count") or None
+            done = manifest.done_count(poet, section_path) if manifest is not None else 0
+            todo = max(0, total - done) if total else 0
+            audio_n = todo * h.success_rate
+            requests = int(round(todo + audio_n))
+            nbytes = int(todo * h.page_bytes + audio_n * h.audio_bytes)
+            out.append(SectionPlan(poet, section_path, total, done, todo, requests, nbytes, todo * per_poem_s))
+    return out
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}TB"
+
+def fmt_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}h{m:02d}m" if h else f"{m}m{s:02d}s"
+
+def format_plan(plans: List[SectionPlan], show_sections: bool = True) -> List[str]:
+    """Table lines: one per section (optional), a subtotal per poet and a grand total."""
+    lines = [f"{'poet/section':<40} {'done':>11} {'requests':>9} {'bytes':>9} {'time':>9}"]
+    by_poet: Dict[str, List[SectionPlan]] = {}
+    for p in plans:
+        by_poet.setdefault(p.poet, []).append(p)
+
+    def row(label, items):
+        known = [i for i in items if i.total]
+        done = sum(i.done for i in items)
+        total = sum(i.total for i in known)
+        unknown = len(items) - len(known)
+        done_s = f"{done}/{total}" + ("+?" if unknown else "")
+        return (f"{label:<40} {done_s:>11} {sum(i.requests for i in items):>9} "
+                f"{fmt_bytes(sum(i.bytes for i in items)):>9} {fmt_duration(sum(i.seconds for i in items)):>9}")
+
+    for poet, items in by_poet.items():
+        if show_sections:
+            for i in items:
+                lines.append(row(f"  {poet}/{i.section_path}", [i]))
+        lines.append(row(f"{poet} (total)", items))
+    lines.append(row("ALL", plans))
+    unknown = sum(1 for p in plans if not p.total)
+    if unknown:
+        lines.append(f"[NOTE] {unknown} sections have no count yet; they are discovered at run time and not included.")
+    return lines
@@ -0,0 +1,151 @@
+from __future__ import annotations
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+import hashlib
+
+SEP = " | "  # between hemistichs in the flat text form ("right | left" per line)
+
+class Couplet:
+    """One verse of a Poem: a view into the poem's text buffer, nothing is copied."""
+    __slots__ = ("poem", "index")
+
+    def __init__(self, poem: "Poem", index: int):
+        self.poem = poem
+        self.index = index
+
+    @property
+    def number(self) -> int:
+        """1-based verse number within the poem."""
+        return self.index + 1
+
+    @property
+    def hemistichs(self) -> Tuple[str, ...]:
+        return self.poem.hemistichs(self.index)
+
+    def __str__(self) -> str:
+        return SEP.join(self.hemistichs)
+
+    def __repr__(self) -> str:
+        return f"Couplet({self.number}, {self.hemistichs!r})"
+
+class Poem:
+    """
+    Parsed poem page. All hemistichs are stored back to back in one string;
+    _ends holds the end offset of every hemistich and _firsts the index of the
+    first hemistich of every couplet (plus one past the last), both as arrays.
+    Carries the audio URLs found on the page and where the page came from.
+    An empty Poem (no couplets) is falsy.
+    """
+    __slots__ = ("_buf", "_ends", "_firsts", "audio_urls", "poet", "section_path", "sh", "url")
+
+    def __init__(self, buf: str = "", ends: Optional[array] = None, firsts: Optional[array] = None,
+                 audio_urls: Sequence[str] = (), poet: Optional[str] = None,
+                 section_path: Optional[str] = None, sh: Optional[int] = None, url: Optional[str] = None):
+        self._buf = buf
+        self._ends = ends if ends is not None else array("I")
+        self._firsts = firsts if firsts is not None else array("I", [0])
+        self.audio_urls = list(audio_urls)
+        self.poet = poet
+        self.section_path = section_path
+        self.sh = sh
+        self.url = url
+
+    @classmethod
+    def from_couplets(cls, couplets: Iterable[Sequence[str]], audio_urls: Sequence[str] = (), **meta) -> "Poem":
+        """Build from hemistich lists; empty hemistichs and empty couplets are dropped."""
+        parts: List[str] = []
+        ends, firsts = array("I"), array("I", [0])
+        pos = 0
+        for hems in couplets:
+            n = len(ends)
+            for h in hems:
+                if h:
+                    parts.append(h)
+                    pos += len(h)
+                    ends.append(pos)
+            if len(ends) > n:
+                firsts.append(len(ends))
+        return cls("".join(parts), ends, firsts, audio_urls, **meta)
+
+    @classmethod
+    def from_text(cls, text: str, audio_urls: Sequence[str] = (), **meta) -> "Poem":
+        """From the flat 'right | left' per line form."""
+        return cls.from_couplets(([p.strip() for p in line.split(SEP)] for line in text.splitlines()),
+                                 audio_urls, **meta)
+
+    # ---------- access ----------
+    def __len__(self) -> int:
+        return len(self._firsts) - 1
+
+    def __bool__(self) -> bool:
+        return len(self._firsts) > 1
+
+    def __getitem__(self, i: int) -> Couplet:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return Couplet(self, i)
+
+    def __iter__(self) -> Iterator[Couplet]:
+        return (Couplet(self, i) for i in range(len(self)))
+
+    def __repr__(self) -> str:
+        return f"Poem({self.poet}/{self.section_path}/sh{self.sh}, {len(self)} couplets)"
+
+    def with_source(self, poet: Optional[str] = None, section_path: Optional[str] = None,
+                    sh: Optional[int] = None, url: Optional[str] = None) -> "Poem":
+        """The same couplets (buffer and offsets shared, not copied) under other source metadata."""
+        return Poem(self._buf, self._ends, self._firsts, self.audio_urls, poet, section_path, sh, url)
+
+    def hemistichs(self, i: int) -> Tuple[str, ...]:
+        ends, buf = self._ends, self._buf
+        out = []
+        for h in range(self._firsts[i], self._firsts[i + 1]):
+            out.append(buf[ends[h - 1] if h else 0:ends[h]])
+        return tuple(out)
+
+    @property
+    def audio_url(self) -> Optional[str]:
+        return self.audio_urls[0] if self.audio_urls else None
+
+    # ---------- serialization ----------
+    def lines(self) -> Iterator[str]:
+        return (SEP.join(self.hemistichs(i)) for i in range(len(self)))
+
+    @property
+    def text(self) -> str:
+        """The flat form parse_poem_page returns: one 'right | left' line per couplet."""
+        return "\n".join(self.lines())
+
+    def compact(self) -> tuple:
+        """(buffer, hemistich ends, couplet starts, audio URLs) with the offsets as raw bytes; cheap to pickle."""
+        return self._buf, self._ends.tobytes(), self._firsts.tobytes(), tuple(self.audio_urls)
+
+    @classmethod
+    def from_compact(cls, c: tuple, **meta) -> "Poem":
+        buf, ends, firsts, audio_urls = c
+        e, f = array("I"), array("I")
+        e.frombytes(ends)
+        f.frombytes(firsts)
+        return cls(buf, e, f, audio_urls, **meta)
+
+    def couplet_lists(self) -> List[List[str]]:
+        return [list(self.hemistichs(i)) for i in range(len(self))]
+
+    def write_text(self, f):
+        """Write the flat form to a text file line by line."""
+        for i, line in enumerate(self.lines()):
+            if i:
+                f.write("\n")
+            f.write(line)
+
+    def digest(self) -> str:
+        """sha1 of the flat form, equal to manifest.text_hash(poem.text)."""
+        h = hashlib.sha1()
+        for i, line in enumerate(self.lines()):
+            if i:
+                h.update(b"\n")
+            h.update(line.encode("utf-8"))
+        return h.hexdigest()
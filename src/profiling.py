@@ -0,0 +1,217 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+PROFILE_DIR = os.path.join("data", "metadata", "profiles")
+SAMPLE_INTERVAL = 0.01
+TOP_N = 25
+
+# ---------- tracing ----------
+class Tracer:
+    """
+    Collects spans as Chrome trace events ("X" complete events, microseconds).
+    The written JSON opens in chrome://tracing, Perfetto and speedscope.
+    """
+
+    def __init__(self):
+        self.events: List[dict] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._t0 = time.perf_counter()
+        self._threads: Dict[int, str] = {}
+
+    def add(self, name: str, start: float, end: float, cat: str = "poem", **args):
+        tid = threading.get_ident()
+        ev = {"name": name, "cat": cat, "ph": "X", "pid": self._pid, "tid": tid,
+              "ts": round((start - self._t0) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+        if args:
+            ev["args"] = {k: v for k, v in args.items() if v is not None}
+        with self._lock:
+            self.events.append(ev)
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+
+    def write(self, path: str):
+        meta = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self._threads.items()]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": meta + self.events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+_tracer: Optional[Tracer] = None
+
+def get_tracer() -> Optional[Tracer]:
+    """The active tracer, or None when --trace is off."""
+    return _tracer
+
+def start_tracing() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+@contextmanager
+def span(name: str, **args):
+    """Record a span around a block when tracing is on; a no-op otherwise."""
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.add(name, t0, time.perf_counter(), **args)
+
+# ---------- wall-clock sampling ----------
+class WallSampler:
+    """
+    Samples the stacks of all threads every `interval` seconds, including threads
+    blocked on the network or disk (which cProfile attributes poorly), and writes
+    them as folded stacks ("a;b;c count") for speedscope or flamegraph.pl.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wall-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for th in threading.enumerate():
+                names[th.ident] = th.name
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join([names.get(tid, str(tid))] + parts[::-1])
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for key, n in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+                f.write(f"{key} {n}\n")
+
+# ---------- cProfile for every thread ----------
+class ThreadProfiles:
+    """
+    cProfile only sees the thread that enabled it, and the pipeline does its work in
+    fetch, parse and store threads. While enabled, every thread started gets its own
+    profiler (through threading.setprofile); stats() merges them with the main thread's.
+    Threads still running at that point (daemons) are left out and counted.
+    """
+
+    def __init__(self):
+        import cProfile
+        self._new = cProfile.Profile
+        self.main = cProfile.Profile()
+        self.threads: List[Tuple[threading.Thread, object]] = []
+        self._lock = threading.Lock()
+
+    def _start_thread(self, frame, event, arg):
+        sys.setprofile(None)
+        prof = self._new()
+        with self._lock:
+            self.threads.append((threading.current_thread(), prof))
+        prof.enable()
+
+    def enable(self):
+        threading.setprofile(self._start_thread)
+        self.main.enable()
+
+    def disable(self):
+        self.main.disable()
+        threading.setprofile(None)
+
+    def stats(self):
+        """(pstats.Stats of the main thread and all finished threads, threads left out)."""
+        import pstats
+        merged = pstats.Stats(self.main)
+        running = 0
+        with self._lock:
+            threads = list(self.threads)
+        for th, prof in threads:
+            if th.is_alive():
+                running += 1
+            else:
+                merged.add(prof)
+        return merged, running
+
+# ---------- entry point wrapper ----------
+def _pop_flag(argv: List[str], flag: str) -> Optional[str]:
+    """Remove --flag or --flag=PATH from argv; return "" / PATH, or None when absent."""
+    for i, a in enumerate(argv):
+        if a == flag:
+            del argv[i]
+            return ""
+        if a.startswith(flag + "="):
+            del argv[i]
+            return a.split("=", 1)[1]
+    return None
+
+def _default_path(kind: str, ext: str) -> str:
+    script = os.path.splitext(os.path.basename(sys.argv[0] or "run"))[0]
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(PROFILE_DIR, f"{script}-{stamp}.{kind}.{ext}")
+
+def profiled_main(main: Callable[[], object]):
+    """
+    Run a script's main() with the common profiling options, which are taken out of
+    sys.argv before the script parses its own arguments:
+      --profile[=PATH]  cProfile of the main thread and every thread it starts, merged (PATH,
+                        default data/metadata/profiles/<script>-<time>.prof; top functions
+                        printed at exit) plus wall-clock stack samples of all threads
+                        (<PATH>.folded)
+      --trace[=PATH]    per-poem spans (fetch, parse, store, audio) as Chrome trace JSON
+    """
+    profile_path = _pop_flag(sys.argv, "--profile")
+    trace_path = _pop_flag(sys.argv, "--trace")
+    if profile_path is None and trace_path is None:
+        return main()
+
+    if trace_path is not None:
+        trace_path = trace_path or _default_path("trace", "json")
+        tracer = start_tracing()
+        atexit.register(lambda: (tracer.write(trace_path), print(f"[TRACE] {len(tracer.events)} spans -> {trace_path}")))
+    if profile_path is None:
+        return main()
+
+    profile_path = profile_path or _default_path("cprofile", "prof")
+    sampler = WallSampler().start()
+    profiles = ThreadProfiles()
+    profiles.enable()
+    try:
+        return main()
+    finally:
+        profiles.disable()
+        sampler.stop()
+        stats, running = profiles.stats()
+        os.makedirs(os.path.dirname(profile_path) or ".", exist_ok=True)
+        stats.dump_stats(profile_path)
+        sampler.write(profile_path + ".folded")
+        threads = len(profiles.threads) - running + 1
+        left_out = f" ({running} still running left out)" if running else ""
+        print(f"\n[PROFILE] cProfile of {threads} threads{left_out} -> {profile_path}; "
+              f"wall-clock samples -> {profile_path}.folded")
+        stats.sort_stats("cumulative").print_stats(TOP_N)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+import csv
+import itertools
+import os
+
+from event_log import EVENTS_PATH, get_event_log, read_events
+from negative_index import get_negative_index
+from pipeline import Pipeline, PoemResult, PoemTask
+
+LEGACY_FAILED_CSV = os.path.join("data", "metadata", "failed.csv")
+MAX_ATTEMPTS = 5
+
+Key = Tuple[str, str, int]
+
+@dataclass
+class FailedItem:
+    poet: str
+    section_path: str
+    sh: int
+    reason: str
+    url: str
+    failures: int = 1
+
+    @property
+    def key(self) -> Key:
+        return (self.poet, self.section_path, self.sh)
+
+def _legacy_rows(path: str) -> Iterable[dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 5 or row[0] == "poet":
+                continue
+            try:
+                sh = int(row[2])
+            except ValueError:
+                continue
+            yield {"event": "poem", "status": "failed", "poet": row[0], "section_path": row[1],
+                   "sh": sh, "reason": row[3], "url": row[4]}
+
+def load_failures(events_path: str = EVENTS_PATH, legacy_csv: Optional[str] = LEGACY_FAILED_CSV,
+                  manifest=None) -> Dict[Key, FailedItem]:
+    """
+    Collapse the failure log into one FailedItem per (poet, section_path, sh).
+    Legacy failed.csv rows are read first, then events.jsonl in order; a later
+    saved/resolved record removes the key, so resolved work drops out. Both are
+    streamed; only the unresolved keys are held in memory.
+    """
+    legacy = _legacy_rows(legacy_csv) if legacy_csv else ()
+    out: Dict[Key, FailedItem] = {}
+    for rec in itertools.chain(legacy, read_events(events_path)):
+        if rec.get("event") not in ("poem", "redrive") or "poet" not in rec:
+            continue
+        key = (rec["poet"], rec.get("section_path", ""), int(rec.get("sh", 0)))
+        status = rec.get("status")
+        if status in ("saved", "resolved"):
+            out.pop(key, None)
+        elif status == "failed":
+            item = out.get(key)
+            if item is None:
+                out[key] = FailedItem(key[0], key[1], key[2], rec.get("reason", "unknown"), rec.get("url", ""))
+            else:
+                item.failures += 1
+                item.reason = rec.get("reason", item.reason)
+    if manifest is not None:
+        for key in [k for k in out if manifest.is_done(*k)]:
+            del out[key]
+    return out
+
+def group_by_reason(items: Iterable[FailedItem]) -> Dict[str, List[FailedItem]]:
+    groups: Dict[str, List[FailedItem]] = {}
+    for it in sorted(items, key=lambda i: i.key):
+        groups.setdefault(it.reason, []).append(it)
+    return groups
+
+def redrive(items: Iterable[FailedItem], retries: int = 2, rate_ms: int = 300,
+            max_attempts: int = MAX_ATTEMPTS, manifest=None, corpus=None, base_dir: str = "data",
+            fetch_workers: int = 2) -> Dict[str, int]:
+    """
+    Re-run failed items through the normal pipeline, up to `retries` rounds now;
+    each round only re-runs what is still failing. Items that already failed
+    `max_attempts` times are left alone. Successes are logged as status=resolved.
+    Re-driven URLs are taken out of the negative index first, so a page that
+    answered 404 before is really requested again instead of skipped as known_missing.
+    """
+    events = get_event_log()
+    negative = get_negative_index()
+    stats = {"resolved": 0, "failed": 0, "gave_up": 0}
+    pending: Dict[Key, FailedItem] = {}
+    for it in items:
+        if it.failures >= max_attempts:
+            stats["gave_up"] += 1
+        else:
+            pending[it.key] = it
+
+    for attempt in range(1, retries + 1):
+        if not pending:
+            break
+        results: List[PoemResult] = []
+        tasks = [PoemTask(*key) for key in sorted(pending)]
+        for t in tasks:
+            negative.discard(t.url)
+        pipe = Pipeline(rate_ms=rate_ms, fetch_workers=fetch_workers, base_dir=base_dir, manifest=manifest,
+                        corpus=corpus, on_result=results.append, verbose=False)
+        pipe.run(tasks)
+        for res in results:
+            key = (res.task.poet, res.task.section_path, res.task.sh)
+            it = pending[key]
+            if res.ok:
+                events.emit("redrive", status="resolved", poet=it.poet, section_path=it.section_path,
+                            sh=it.sh, url=res.url, previous_reason=it.reason, attempt=attempt)
+                print(f"[resolved] {it.poet}/{it.section_path}/sh{it.sh} (was {it.reason})")
+                stats["resolved"] += 1
+                del pending[key]
+            else:
+                it.reason = res.reason
+
+    for it in pending.values():
+        print(f"[still failing] {it.poet}/{it.section_path}/sh{it.sh} -> {it.reason}")
+    stats["failed"] = len(pending)
+    return stats
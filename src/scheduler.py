@@ -0,0 +1,144 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+import threading
+
+from pipeline import PoemTask
+
+SECTION_CAP = 2
+
+@dataclass
+class _Section:
+    poet: str
+    section_path: str
+    next_sh: int
+    end_sh: int
+    in_flight: int = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.end_sh - self.next_sh + 1)
+
+@dataclass
+class _Flow:
+    poet: str
+    weight: float
+    vtime: float = 0.0
+    sections: List[_Section] = field(default_factory=list)
+    rr: int = 0
+
+class FairScheduler:
+    """
+    Interleaves poems of many poets and sections into one task stream for the pipeline.
+
+    - Poets are served by weighted fair queueing: each poet has a virtual time that
+      grows by 1/weight per dispatched poem, and the poet with the lowest virtual
+      time goes next. With equal weights every poet advances at the same pace, so
+      small poets finish early instead of waiting behind attar.
+    - Inside a poet, sections are taken round-robin.
+    - At most `section_cap` poems of one section are in flight at once; a slow
+      section cannot take over all fetch workers.
+
+    Pass release as the pipeline's on_result (or call it from there) so capped
+    sections open up again as their poems finish. Poems a poet already has
+    (`served` in add_section) count toward its virtual time, so the least covered
+    poets come first; with a budget, poets over their quota are passed over.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, section_cap: int = SECTION_CAP,
+                 budget=None):
+        self.weights = dict(weights or {})
+        self.section_cap = max(1, section_cap)
+        self.budget = budget
+        self._flows: Dict[str, _Flow] = {}
+        self._sections: Dict[tuple, _Section] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._started = False
+
+    def add_section(self, poet: str, section_path: str, start_sh: int, end_sh: int, served: int = 0):
+        if end_sh < start_sh:
+            return
+        with self._cond:
+            flow = self._flows.get(poet)
+            if flow is None:
+                # a poet joining mid-run starts at the current minimum, not at 0
+                vmin = 0.0
+                if self._started:
+                    vmin = min((f.vtime for f in self._flows.values() if self._has_work(f)), default=0.0)
+                flow = self._flows[poet] = _Flow(poet, float(self.weights.get(poet, 1.0)), vmin)
+            flow.vtime += served / max(flow.weight, 1e-6)
+            sec = _Section(poet, section_path, start_sh, end_sh)
+            flow.sections.append(sec)
+            self._sections[(poet, section_path)] = sec
+            self._cond.notify_all()
+
+    @staticmethod
+    def _has_work(flow: _Flow) -> bool:
+        return any(s.remaining for s in flow.sections)
+
+    def _pick(self) -> Optional[_Section]:
+        best: Optional[_Flow] = None
+        best_sec: Optional[_Section] = None
+        for flow in self._flows.values():
+            if best is not None and flow.vtime >= best.vtime:
+                continue
+            if self.budget is not None and not self.budget.poet_allows(flow.poet):
+                continue
+            n = len(flow.sections)
+            for i in range(n):
+                sec = flow.sections[(flow.rr + i) % n]
+                if sec.remaining and sec.in_flight < self.section_cap:
+                    best, best_sec = flow, sec
+                    break
+        if best is not None:
+            self._started = True
+            best.rr = (best.sections.index(best_sec) + 1) % len(best.sections)
+            best.vtime += 1.0 / max(best.weight, 1e-6)
+        return best_sec
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(s.remaining for s in self._sections.values())
+
+    def in_flight(self) -> int:
+        with self._cond:
+            return self._in_flight_locked()
+
+    def _in_flight_locked(self) -> int:
+        return sum(s.in_flight for s in self._sections.values())
+
+    def tasks(self) -> Iterator[PoemTask]:
+        """Yield tasks in fair order; blocks while every section with work is at its cap."""
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    sec = self._pick()
+                    if sec is not None:
+                        break
+                    if not any(s.remaining for s in self._sections.values()):
+                        return
+                    if self.budget is not None and self._in_flight_locked() == 0:
+                        return  # only poets over their quota have work left
+                    self._cond.wait()
+                sh = sec.next_sh
+                sec.next_sh += 1
+                sec.in_flight += 1
+            yield PoemTask(sec.poet, sec.section_path, sh)
+
+    def release(self, result):
+        """Mark a dispatched poem finished; accepts a PoemResult or a PoemTask."""
+        task = getattr(result, "task", result)
+        with self._cond:
+            sec = self._sections.get((task.poet, task.section_path))
+            if sec is not None and sec.in_flight > 0:
+                sec.in_flight -= 1
+            self._cond.notify_all()
+
+    def close(self):
+        """Stop handing out tasks (e.g. on Ctrl-C)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
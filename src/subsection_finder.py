@@ -1,7 +1,9 @@
 import re
 from urllib.parse import urljoin
 
-BASE = "https://ganjoor.net"
+from url_builder import BASE_URL
+
+BASE = BASE_URL
 
 def find_subsection_links(html: str, poet: str, section: str):
     """
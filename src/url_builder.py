@@ -1,6 +1,8 @@
 from typing import Optional
+import os
 
-BASE_URL = "https://ganjoor.net"
+# GANJOOR_BASE_URL points every runner at another host, e.g. the local stand-in server of benchmarks/bench_e2e.py
+BASE_URL = os.environ.get("GANJOOR_BASE_URL", "https://ganjoor.net").rstrip("/")
 
 def _sanitize_slug(value: str) -> str:
     if value is None:
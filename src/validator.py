@@ -1,10 +1,12 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from typing import Callable, Iterable, Iterator, Optional, List, Dict, Tuple
+import queue
+import threading
 import time
 import os
 import sys
-import requests
 
 # Make sure we can import url_builder when running scripts directly
 HERE = os.path.dirname(os.path.abspath(__file__))
@@ -13,8 +15,14 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 from url_builder import build_section_url, build_poem_url  # absolute import
+from extractor import get_session
+from negative_index import get_negative_index
+from pipeline import RateLimiter
+from verdict_cache import probe_method
 
 REQUEST_TIMEOUT = 10
+PROBE_WORKERS = 8
+PROBE_RATE_MS = 200
 HEADERS = {
     "User-Agent": "GanjoorScraper/1.0 (+research; contact@example.com)"
 }
@@ -31,15 +39,55 @@ class ProbeResult:
     notes: Optional[str] = None
 
 def http_status(url: str) -> int:
+    import requests
+    negative = get_negative_index()
+    if negative.known_missing(url):
+        return 404
+    session = get_session()
     try:
-        r = requests.head(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+        r = session.head(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, allow_redirects=True)
         if r.status_code == 405:
-            r = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-        return r.status_code
+            r = session.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, allow_redirects=True)
     except requests.RequestException:
         return 0
+    negative.record(url, r.status_code)
+    return r.status_code
 
-def probe_task(poet: str, section: Optional[str], sh_numbers: List[int]) -> ProbeResult:
+def _forget_missing(cache, poet: str, section: str, urls: Iterable[str]):
+    """A forced refresh has to reach the site: drop the section's URLs from the negative index first."""
+    if cache is not None and cache.refreshing(poet, section):
+        negative = get_negative_index()
+        for url in urls:
+            negative.discard(url)
+
+def _verdict_mode(res: ProbeResult) -> str:
+    if res.has_sh_pages:
+        return "sh_pages"
+    return "no_sh" if res.section_page_exists else "unknown"
+
+def _remember(cache, res: ProbeResult):
+    mode = _verdict_mode(res)
+    if mode != "unknown":
+        cache.put(res.poet, res.book_or_style, probe_method("http", res.checked_sh, landing=True), mode,
+                  res.status_by_url)
+
+def _from_verdict(v, sh_numbers: List[int]) -> ProbeResult:
+    s_url = build_section_url(v.poet, v.section_path)
+    when = time.strftime("%Y-%m-%d %H:%M", time.localtime(v.checked_at))
+    return ProbeResult(poet=v.poet, book_or_style=v.section_path, subsection=None, checked_sh=sh_numbers,
+                       status_by_url=dict(v.evidence), has_sh_pages=v.mode == "sh_pages",
+                       section_page_exists=v.evidence[s_url] == 200 if s_url in v.evidence else None,
+                       notes=f"cached verdict from {when}")
+
+def probe_task(poet: str, section: Optional[str], sh_numbers: List[int], cache=None) -> ProbeResult:
+    """
+    With a verdict_cache.VerdictCache, a fresh stored verdict is returned without any request,
+    and a section it refreshes is probed even where the negative index remembers a 404.
+    """
+    if cache is not None and section is not None:
+        v = cache.get(poet, section, probe_method("http", sh_numbers, landing=True))
+        if v is not None:
+            return _from_verdict(v, sh_numbers)
     status_by_url: Dict[str, int] = {}
 
     has_sh = False
@@ -50,6 +98,7 @@ def probe_task(poet: str, section: Optional[str], sh_numbers: List[int]) -> Prob
             except Exception:
                 status_by_url[f"build_poem_url_error(sh{sh})"] = -1
                 continue
+            _forget_missing(cache, poet, section, [url])
             code = http_status(url)
             status_by_url[url] = code
             if code == 200:
@@ -60,6 +109,7 @@ def probe_task(poet: str, section: Optional[str], sh_numbers: List[int]) -> Prob
         # Test section landing page
         try:
             s_url = build_section_url(poet, section)
+            _forget_missing(cache, poet, section, [s_url])
             code = http_status(s_url)
             status_by_url[s_url] = code
             section_exists = (code == 200)
@@ -73,7 +123,7 @@ def probe_task(poet: str, section: Optional[str], sh_numbers: List[int]) -> Prob
         status_by_url[s_url] = code
         section_exists = (code == 200)
 
-    return ProbeResult(
+    res = ProbeResult(
         poet=poet,
         book_or_style=section or "__root__",
         subsection=None,
@@ -83,3 +133,104 @@ def probe_task(poet: str, section: Optional[str], sh_numbers: List[int]) -> Prob
         section_page_exists=section_exists,
         notes=None
     )
+    if cache is not None and section is not None:
+        _remember(cache, res)
+    return res
+
+class _SectionProbe:
+    """Probes of one section in flight; finishes when every probe has run or been cancelled."""
+
+    def __init__(self, poet: str, section: str, sh_numbers: List[int]):
+        self.poet = poet
+        self.section = section
+        self.sh_numbers = sh_numbers
+        self.found = threading.Event()
+        self.status_by_url: Dict[str, int] = {}
+        self.section_exists: Optional[bool] = None
+        self.futures = []
+        self.left = 0
+        self.lock = threading.Lock()
+
+    def result(self) -> ProbeResult:
+        return ProbeResult(poet=self.poet, book_or_style=self.section, subsection=None,
+                           checked_sh=self.sh_numbers, status_by_url=self.status_by_url,
+                           has_sh_pages=self.found.is_set(), section_page_exists=self.section_exists)
+
+def probe_sections(sections: Iterable[Tuple[str, str]], sh_numbers: List[int], workers: int = PROBE_WORKERS,
+                   rate_ms: int = PROBE_RATE_MS, status: Callable[[str], int] = http_status,
+                   limiter: Optional[RateLimiter] = None, cache=None) -> Iterator[ProbeResult]:
+    """
+    Concurrent probe_task over many (poet, section) pairs: all requests go through one
+    thread pool and one RateLimiter, and a section's remaining sh probes are dropped as
+    soon as one of them returns 200. Results are yielded as sections complete, not in
+    input order. Sections with a fresh verdict in `cache` come first and cost no request;
+    sections the cache is told to refresh are probed past the negative index.
+    """
+    limiter = limiter or RateLimiter(max(rate_ms, 0) / 1000.0)
+    done: "queue.Queue[ProbeResult]" = queue.Queue()
+    probes = []
+    for poet, section in sections:
+        v = cache.get(poet, section, probe_method("http", sh_numbers, landing=True)) if cache is not None else None
+        if v is not None:
+            done.put(_from_verdict(v, list(sh_numbers)))
+        else:
+            probes.append(_SectionProbe(poet, section, list(sh_numbers)))
+    pending = done.qsize() + len(probes)
+
+    def run(probe: _SectionProbe, url: str, is_sh: bool):
+        if is_sh and probe.found.is_set():
+            return
+        limiter.wait()
+        if is_sh and probe.found.is_set():
+            return
+        code = status(url)
+        with probe.lock:
+            probe.status_by_url[url] = code
+            if not is_sh:
+                probe.section_exists = code == 200
+        if is_sh and code == 200:
+            probe.found.set()
+            with probe.lock:
+                futures = list(probe.futures)
+            for f in futures:
+                f.cancel()
+
+    def finished(probe: _SectionProbe):
+        with probe.lock:
+            probe.left -= 1
+            last = probe.left == 0
+        if last:
+            res = probe.result()
+            if cache is not None:
+                _remember(cache, res)
+            done.put(res)
+
+    # sh1 of every section goes first, then sh2, ...: most sections answer on their first sample
+    jobs = []
+    for probe in probes:
+        mine = []
+        try:
+            mine.append((0, probe, build_section_url(probe.poet, probe.section), False))
+        except ValueError:
+            pass
+        for i, sh in enumerate(probe.sh_numbers):
+            try:
+                mine.append((i, probe, build_poem_url(probe.poet, sh, probe.section), True))
+            except ValueError:
+                probe.status_by_url[f"build_poem_url_error(sh{sh})"] = -1
+        _forget_missing(cache, probe.poet, probe.section, [url for _, _, url, _ in mine])
+        jobs += mine
+        probe.left = len(mine)
+        if probe.left == 0:
+            done.put(probe.result())
+    jobs.sort(key=lambda j: j[0])
+
+    with ThreadPoolExecutor(max(1, workers), thread_name_prefix="probe") as pool:
+        for _, probe, url, is_sh in jobs:
+            fut = pool.submit(run, probe, url, is_sh)
+            with probe.lock:
+                probe.futures.append(fut)
+            fut.add_done_callback(lambda _f, p=probe: finished(p))
+        while pending:
+            yield done.get()
+            pending -= 1
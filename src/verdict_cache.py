@@ -0,0 +1,182 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+VERDICTS_PATH = os.path.join("data", "metadata", "verdicts.json")
+TTL_S = 7 * 24 * 3600.0
+SAVE_EVERY = 20
+# defaults for every runner; the command-line flags below override them
+ENV_TTL = "GANJOOR_VERDICT_TTL"            # e.g. 12h, 3d, 0 (never reuse)
+ENV_REFRESH = "GANJOOR_REFRESH_VERDICTS"   # "1" = everything, or "hafez,attar/divana"
+
+# verdicts are kept per probe method (see probe_method): what decided sh_pages ("http" =
+# a sample sh page answered 200, "text" = it also parsed to poem text), whether the
+# landing page was read first, and which sh numbers were sampled. Probes that look at
+# different pages never answer for each other.
+
+def probe_method(check: str, sh_samples: Iterable[int], landing: bool = False) -> str:
+    """e.g. probe_method("text", [1, 2], landing=True) -> "text+landing@1,2"."""
+    return f"{check}{'+landing' if landing else ''}@{','.join(str(sh) for sh in sh_samples)}"
+
+def parse_ttl(s) -> float:
+    """'45s', '90m', '12h', '7d' or plain seconds -> seconds."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", str(s).lower())
+    if not m:
+        raise ValueError(f"invalid TTL: {s!r}")
+    return float(m.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)]
+
+@dataclass
+class Verdict:
+    poet: str
+    section_path: str
+    mode: str  # sh_pages | no_sh | unknown
+    method: str
+    evidence: Dict[str, int] = field(default_factory=dict)  # url -> HTTP status (0 = failed)
+    checked_at: float = field(default_factory=time.time)
+
+class VerdictCache:
+    """
+    Section classifications (mode plus the URLs and status codes that decided it) per
+    (poet, section_path), reused until they are ttl_s old. refresh=True ignores every
+    stored verdict; a list of "poet" or "poet/section" prefixes ignores only those.
+    New verdicts always replace the stored ones; the file is rewritten every
+    save_every new verdicts and by save() (at exit for the shared instance).
+    """
+
+    def __init__(self, path: str = VERDICTS_PATH, ttl_s: float = TTL_S, refresh=None, save_every: int = SAVE_EVERY):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.refresh = refresh
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self._unsaved = 0
+        self._opened = time.time()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}  # a damaged cache only costs a re-probe
+
+    @staticmethod
+    def _key(method: str, poet: str, section_path: str) -> str:
+        return f"{method}|{poet}|{section_path.strip('/')}"
+
+    def refreshing(self, poet: str, section_path: str) -> bool:
+        if not self.refresh:
+            return False
+        if self.refresh is True:
+            return True
+        path = f"{poet}/{section_path.strip('/')}"
+        return any(path == p or path.startswith(p.rstrip("/") + "/") for p in self.refresh)
+
+    def get(self, poet: str, section_path: str, method: str) -> Optional[Verdict]:
+        """A fresh stored verdict, or None when the section has to be probed."""
+        with self._lock:
+            item = self._entries.get(self._key(method, poet, section_path))
+            # a refresh applies to verdicts from before this run, not to the ones it just made
+            fresh = (item is not None and time.time() - item["checked_at"] < self.ttl_s
+                     and (item["checked_at"] >= self._opened or not self.refreshing(poet, section_path)))
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return Verdict(**item) if fresh else None
+
+    def put(self, poet: str, section_path: str, method: str, mode: str, evidence: Dict[str, int]) -> Verdict:
+        v = Verdict(poet, section_path.strip("/"), mode, method, dict(evidence))
+        with self._lock:
+            self._entries[self._key(method, poet, section_path)] = asdict(v)
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self._save_locked()
+        return v
+
+    def cached(self, poet: str, section_path: str, method: str,
+               probe: Callable[[], Tuple[str, Dict[str, int]]]) -> Verdict:
+        """
+        Stored verdict, or run probe() -> (mode, evidence) and store its answer.
+        "unknown" (landing page unreachable, ...) is often transient and is not stored.
+        """
+        v = self.get(poet, section_path, method)
+        if v is not None:
+            return v
+        mode, evidence = probe()
+        if mode == "unknown":
+            return Verdict(poet, section_path.strip("/"), mode, method, dict(evidence))
+        return self.put(poet, section_path, method, mode, evidence)
+
+    def save(self):
+        with self._lock:
+            if self._unsaved:
+                self._save_locked()
+
+    def _save_locked(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+        self._unsaved = 0
+
+# ---------- shared instance and flags ----------
+_shared: Optional[VerdictCache] = None
+
+def _env_refresh():
+    v = os.environ.get(ENV_REFRESH, "").strip()
+    if not v:
+        return None
+    return True if v == "1" else [p.strip() for p in v.split(",") if p.strip()]
+
+def get_verdicts() -> VerdictCache:
+    """Process-wide cache, configured from GANJOOR_VERDICT_TTL / GANJOOR_REFRESH_VERDICTS; saved at exit."""
+    global _shared
+    if _shared is None:
+        ttl = os.environ.get(ENV_TTL)
+        _shared = VerdictCache(ttl_s=parse_ttl(ttl) if ttl else TTL_S, refresh=_env_refresh())
+        atexit.register(_shared.save)
+    return _shared
+
+def configure(ttl_s: Optional[float] = None, refresh=None) -> VerdictCache:
+    cache = get_verdicts()
+    if ttl_s is not None:
+        cache.ttl_s = ttl_s
+    if refresh is not None:
+        cache.refresh = True if refresh == [] else refresh
+    return cache
+
+def add_verdict_args(parser):
+    g = parser.add_argument_group("probe verdict cache")
+    g.add_argument("--verdict-ttl", type=parse_ttl, help="reuse section verdicts this long (default 7d; e.g. 12h, 0)")
+    g.add_argument("--refresh-verdicts", nargs="*", metavar="POET[/SECTION]",
+                   help="probe again instead of using stored verdicts (all, or only these poets/sections)")
+
+def verdicts_from_args(args) -> VerdictCache:
+    return configure(args.verdict_ttl, args.refresh_verdicts)
+
+def strip_verdict_args(argv: List[str]) -> VerdictCache:
+    """
+    For scripts that read sys.argv by position: take out --verdict-ttl=T and
+    --refresh-verdicts[=POET[/SECTION],...] and apply them.
+    """
+    ttl, refresh = None, None
+    for a in list(argv[1:]):
+        if a.startswith("--verdict-ttl="):
+            ttl = parse_ttl(a.split("=", 1)[1])
+        elif a == "--refresh-verdicts":
+            refresh = []
+        elif a.startswith("--refresh-verdicts="):
+            refresh = [p for p in a.split("=", 1)[1].split(",") if p]
+        else:
+            continue
+        argv.remove(a)
+    return configure(ttl, refresh)
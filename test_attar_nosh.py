@@ -10,6 +10,7 @@ if SRC not in sys.path:
 
 from extractor import fetch_html, load_modes
 from url_builder import build_section_url, build_poem_url
+from profiling import profiled_main
 
 MODES_PATH = os.path.join("inputs", "config", "url_modes.json")
 
@@ -93,4 +94,4 @@ def main():
     print("[DONE] no_sh check completed. If needed, we can implement separate extraction logic for no_sh pages later.")
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
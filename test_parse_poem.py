@@ -8,6 +8,7 @@ if SRC not in sys.path:
 
 from extractor import fetch_html, parse_poem_page
 from url_builder import build_poem_url
+from profiling import profiled_main
 
 def check(poet, section_path, sh):
     url = build_poem_url(poet, sh, section_path)
@@ -36,4 +37,4 @@ def main():
         check(*s)
 
 if __name__ == "__main__":
-    main()
+    profiled_main(main)
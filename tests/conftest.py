@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+
+# src modules import each other by bare name (as the scripts do via sys.path)
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+# tests that talk to a fake server must not remember its 404s in data/metadata
+os.environ.setdefault("GANJOOR_NEGATIVE_INDEX", "off")
+
+@pytest.fixture
+def fake_site(monkeypatch):
+    """
+    Replace the pipeline's network and disk calls with an in-memory site:
+    fake_site(missing={3}, no_audio={5}, fetched=[]) answers sh3 with no page,
+    sh5 with a page without audio, and appends every fetched sh to fetched.
+    Tests that use it import pipeline modules by bare name, as src does.
+    """
+    import pipeline
+    from poem import Poem
+
+    def install(missing=(), no_audio=(), fetched=None):
+        def fetch_html(url):
+            sh = int(url.rsplit("sh", 1)[1])
+            if fetched is not None:
+                fetched.append(sh)
+            if sh in missing:
+                return None
+            return f"<div class='poem'>{sh}</div>" + ("" if sh in no_audio else "audio")
+
+        def parse_poem(html, poet=None, section_path=None, sh=None, url=None):
+            return Poem.from_couplets([("a", "b")], ["x.mp3"] if html.endswith("audio") else [],
+                                      poet=poet, section_path=section_path, sh=sh, url=url)
+
+        def store_pair(base_dir, poet, section_path, sh, text, audio, manifest=None, corpus=None):
+            if manifest is not None:
+                manifest.mark_done(poet, section_path, sh, text, 10)
+            return True
+
+        monkeypatch.setattr(pipeline, "fetch_html", fetch_html)
+        monkeypatch.setattr(pipeline, "parse_poem", parse_poem)
+        monkeypatch.setattr(pipeline, "store_pair", store_pair)
+
+    return install
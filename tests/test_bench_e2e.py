@@ -0,0 +1,57 @@
+import os
+import tempfile
+import requests
+import url_builder
+from benchmarks.bench_e2e import compare, percentile, run_setting, setting_key
+from benchmarks.fake_ganjoor import FakeGanjoor
+from src.event_log import EventLog
+from src.extractor import parse_poem_page
+from src.pipeline import Pipeline, section_tasks
+
+def test_fake_server_pages_audio_and_errors():
+    server = FakeGanjoor(poems=3, audio_kb=100).start()
+    try:
+        page = requests.get(server.base_url + "/hafez/ghazal/sh2", timeout=5)
+        text, audio = parse_poem_page(page.text)
+        assert page.status_code == 200 and len(text.splitlines()) == 7
+        assert audio == server.base_url + "/audio/hafez/ghazal/sh2.mp3"
+        assert len(requests.get(audio, timeout=5).content) == 100 * 1024
+        assert requests.get(server.base_url + "/hafez/ghazal/sh4", timeout=5).status_code == 404
+    finally:
+        server.stop()
+    failing = FakeGanjoor(error_rate=1.0).start()
+    try:
+        assert requests.get(failing.base_url + "/hafez/ghazal/sh1", timeout=5).status_code == 503
+    finally:
+        failing.stop()
+
+def test_real_pipeline_against_fake_server(monkeypatch):
+    server = FakeGanjoor(poems=5, audio_kb=8).start()
+    monkeypatch.setattr(url_builder, "BASE_URL", server.base_url)
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            log = EventLog(os.path.join(d, "e.jsonl"))
+            stats = Pipeline(rate_ms=0, base_dir=d, events=log, verbose=False).run(
+                section_tasks("hafez", "ghazal", 1, 6))
+            log.close()
+            assert os.path.getsize(os.path.join(d, "audio", "hafez", "ghazal", "sh5.mp3")) == 8 * 1024
+    finally:
+        server.stop()
+    assert stats == {"saved": 5, "html_not_200": 1}
+    assert server.requests == {"page": 6, "audio": 5}
+
+def test_percentile_and_baseline_compare():
+    assert percentile(list(range(1, 101)), 50) == 50 and percentile(list(range(1, 101)), 99) == 99
+    base = {"w4_r0": {"poems_per_s": 10.0, "p99_ms": 100.0}}
+    assert compare({"w4_r0": {"poems_per_s": 9.5, "p99_ms": 105.0}}, base, 0.1) == []
+    assert compare({"w4_r0": {"poems_per_s": 8.0, "p99_ms": 100.0}}, base, 0.1) == ["w4_r0"]
+
+def test_settings_cover_store_workers_and_parse_processes():
+    assert setting_key(4, 2, 0, 0) == "w4_r0"  # same key as before the sweep had these
+    assert setting_key(8, 4, 2, 100) == "w8_s4_p2_r100"
+    server = FakeGanjoor(poems=20, audio_kb=1).start()
+    try:
+        r = run_setting(server, {"workers": 2, "store_workers": 3, "parse_procs": 1, "rate_ms": 0, "poems": 20})
+    finally:
+        server.stop()
+    assert (r["saved"], r["store_workers"], r["parse_procs"]) == (20, 3, 1)
@@ -0,0 +1,13 @@
+from benchmarks.bench_parsers import cases, check, fingerprint, load_expected, measure
+
+def test_parser_outputs_match_recorded_fixtures():
+    assert check(cases(), load_expected()) == []
+
+def test_fingerprint_detects_changed_output():
+    a = fingerprint(["a | b\nc | d", "x.mp3"])
+    assert a["summary"] == {"lines": 2, "audio": "x.mp3"}
+    assert fingerprint(["a | b\nc | e", "x.mp3"])["sha256"] != a["sha256"]
+
+def test_measure_reports_per_item_numbers():
+    r = measure(lambda: [str(i) for i in range(100)], items=100, nbytes=0, repeat=3)
+    assert r["calls"] == 3 and r["median_ms"] >= 0 and r["per_s"] > 0 and r["peak_kb"] > 0
@@ -0,0 +1,112 @@
+import datetime
+import os
+import tempfile
+import time
+import pytest
+import pipeline
+import extractor  # the module budget.py hooks into
+from budget import Budget, parse_bytes, parse_deadline
+from event_log import EventLog, read_events
+from pipeline import Pipeline, section_tasks
+from scheduler import FairScheduler
+
+def test_parse_bytes_and_deadline():
+    assert parse_bytes("500MB") == 500 * 1024 ** 2
+    assert parse_bytes("2g") == 2 * 1024 ** 3
+    assert parse_bytes("1024") == 1024
+    with pytest.raises(ValueError):
+        parse_bytes("lots")
+    assert abs(parse_deadline("90m") - (time.time() + 5400)) < 5
+    now = datetime.datetime(2024, 1, 1, 23, 0)
+    at = datetime.datetime.fromtimestamp(parse_deadline("06:30", now=now))
+    assert (at.day, at.hour, at.minute) == (2, 6, 30)
+
+def test_requests_and_bytes_counted_through_extractor_hooks():
+    b = Budget(max_requests=3, max_bytes=1000).install()
+    try:
+        extractor._notify("page", "u", 200, 400)
+        extractor._notify("audio", "u", 200, 500)
+        assert b.exhausted() is None
+        extractor._notify("page", "u", 404, 200)
+        assert b.exhausted() == "max_requests"
+        assert b.bytes == 1100
+    finally:
+        b.uninstall()
+    assert b._on_request not in extractor.REQUEST_HOOKS
+    assert Budget(deadline=time.time() - 1).exhausted() == "deadline"
+    assert not Budget().limited
+
+def test_pipeline_stops_feeding_when_budget_is_spent(monkeypatch, fake_site):
+    fake_site()
+    fake_fetch = pipeline.fetch_html
+
+    def fetch_html(url):
+        extractor._notify("page", url, 200, 100)
+        return fake_fetch(url)
+
+    monkeypatch.setattr(pipeline, "fetch_html", fetch_html)
+    b = Budget(max_requests=5).install()
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            pipe = Pipeline(rate_ms=0, fetch_workers=1, queue_size=1, budget=b,
+                            events=EventLog(os.path.join(d, "e.jsonl")), verbose=False)
+            stats = pipe.run(section_tasks("hafez", "ghazal", 1, 50))
+    finally:
+        b.uninstall()
+    assert pipe.stopped == "max_requests"
+    assert b.requests <= 6 and 1 <= stats["saved"] <= 5
+
+def test_queued_poems_stop_at_the_budget_with_default_queues(monkeypatch, fake_site):
+    fake_site()
+    fake_fetch, fake_store = pipeline.fetch_html, pipeline.store_pair
+
+    def fetch_html(url):
+        extractor._notify("page", url, 200, 100)
+        return fake_fetch(url)
+
+    def store_pair(*args, **kw):
+        extractor._notify("audio", "a", 200, 100)
+        return fake_store(*args, **kw)
+
+    monkeypatch.setattr(pipeline, "fetch_html", fetch_html)
+    monkeypatch.setattr(pipeline, "store_pair", store_pair)
+    b = Budget(max_requests=5).install()
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            log = EventLog(os.path.join(d, "e.jsonl"))
+            pipe = Pipeline(rate_ms=0, budget=b, events=log, verbose=False)
+            stats = pipe.run(section_tasks("hafez", "ghazal", 1, 100))
+            log.close()
+            events = [e["reason"] for e in read_events(os.path.join(d, "e.jsonl")) if "reason" in e]
+    finally:
+        b.uninstall()
+    assert pipe.stopped == "max_requests"
+    # at most one request per worker can pass the check together with the last allowed one
+    assert b.requests < 5 + pipe.fetch_workers + pipe.store_workers
+    assert stats.get("saved", 0) <= 5 and stats["budget_exhausted"] > 0 and "budget_exhausted" not in events
+
+def test_poet_quota_in_pipeline_and_scheduler(fake_site):
+    fake_site()
+    b = Budget(poet_quota=3)
+    sched = FairScheduler(section_cap=1, budget=b)
+    sched.add_section("attar", "a", 1, 10)
+    sched.add_section("iraj", "i", 1, 2)
+    with tempfile.TemporaryDirectory() as d:
+        results = []
+
+        def on_result(res):
+            sched.release(res)
+            results.append(res.task.poet)
+
+        pipe = Pipeline(rate_ms=0, budget=b, on_result=on_result,
+                        events=EventLog(os.path.join(d, "e.jsonl")), verbose=False)
+        pipe.run(sched.tasks())
+    assert sorted(results) == ["attar"] * 3 + ["iraj"] * 2
+    assert sched.pending() == 7
+
+def test_served_poems_move_poet_back_in_line():
+    s = FairScheduler(section_cap=5)
+    s.add_section("saadi", "golestan", 101, 200, served=100)
+    s.add_section("iraj", "ghataat", 1, 5)
+    it = s.tasks()
+    assert [next(it).poet for _ in range(5)] == ["iraj"] * 5
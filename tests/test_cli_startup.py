@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from ganjoor import COMMANDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("pandas", "requests", "bs4", "tqdm")
+# well under a second even on a slow machine; the import itself is ~50ms here
+MAX_IMPORT_S = 0.5
+
+PROBE = """
+import json, sys, time
+sys.argv = ["ganjoor.py"]
+t0 = time.perf_counter()
+import ganjoor, importlib
+importlib.import_module(ganjoor.COMMANDS[{cmd!r}][0])
+print(json.dumps({{"s": time.perf_counter() - t0, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+@pytest.mark.parametrize("cmd", sorted(COMMANDS))
+def test_command_starts_without_heavy_imports(cmd):
+    out = subprocess.run([sys.executable, "-c", PROBE.format(cmd=cmd, heavy=HEAVY)], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    r = json.loads(out.strip().splitlines()[-1])
+    assert r["heavy"] == []
+    assert r["s"] < MAX_IMPORT_S
+
+def test_help_lists_commands_and_unknown_command_fails():
+    ok = subprocess.run([sys.executable, "ganjoor.py"], cwd=ROOT, capture_output=True, text=True)
+    assert ok.returncode == 0 and all(c in ok.stdout for c in COMMANDS)
+    bad = subprocess.run([sys.executable, "ganjoor.py", "nope"], cwd=ROOT, capture_output=True, text=True)
+    assert bad.returncode == 2 and "unknown command" in bad.stdout
+
+def test_arguments_reach_the_command_parser():
+    r = subprocess.run([sys.executable, "ganjoor.py", "redrive", "--help"], cwd=ROOT, capture_output=True, text=True)
+    assert r.returncode == 0 and "ganjoor.py redrive" in r.stdout and "--dry-run" in r.stdout
+
+class _Parsed(Exception):
+    pass
+
+@pytest.mark.parametrize("example", __import__("ganjoor").EXAMPLES)
+def test_documented_examples_parse(example, monkeypatch):
+    import argparse
+    import ganjoor
+    original = argparse.ArgumentParser.parse_args
+
+    def parse_then_stop(self, args=None, namespace=None):
+        original(self, args, namespace)  # exits with status 2 on an unknown option
+        raise _Parsed()
+    monkeypatch.setattr(argparse.ArgumentParser, "parse_args", parse_then_stop)
+    monkeypatch.setattr(sys, "argv", ["ganjoor.py"] + example.split())
+    with pytest.raises(_Parsed):
+        ganjoor.main()
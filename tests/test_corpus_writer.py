@@ -0,0 +1,64 @@
+import os
+import tempfile
+from src.corpus_writer import ShardWriter, CorpusReader, poem_key, text_to_couplets
+from src.manifest import Manifest
+
+def test_text_to_couplets():
+    assert text_to_couplets("a | b\n\nc | d\n") == [["a", "b"], ["c", "d"]]
+
+def test_append_rotate_and_read_back():
+    with tempfile.TemporaryDirectory() as d:
+        out = os.path.join(d, "corpus")
+        with ShardWriter(out, max_shard_bytes=200, block_bytes=150) as w:
+            for sh in range(1, 21):
+                w.append("hafez", "ghazal", sh, f"line {sh} a | line {sh} b", audio_ref=f"audio/hafez/ghazal/sh{sh}.mp3")
+        r = CorpusReader(out)
+        assert len(r.shards()) > 1
+        recs = list(r)
+        assert [x["sh"] for x in recs] == list(range(1, 21))
+        got = r.get(poem_key("hafez", "ghazal", 13))
+        assert got["couplets"] == [["line 13 a", "line 13 b"]]
+        assert got["audio"] == "audio/hafez/ghazal/sh13.mp3"
+        assert r.get(poem_key("hafez", "ghazal", 99)) is None
+
+def test_manifest_marked_only_after_flush():
+    with tempfile.TemporaryDirectory() as d:
+        m = Manifest(os.path.join(d, "manifest.jsonl"))
+        w = ShardWriter(os.path.join(d, "corpus"), block_bytes=1 << 20)
+        w.append("attar", "bolbolname", 1, "x | y", audio_bytes=10, manifest=m)
+        assert not m.is_done("attar", "bolbolname", 1)
+        w.close()
+        assert m.is_done("attar", "bolbolname", 1)
+
+def test_reopen_appends_to_existing_corpus():
+    with tempfile.TemporaryDirectory() as d:
+        out = os.path.join(d, "corpus")
+        with ShardWriter(out) as w:
+            w.append("saadi", "golestan", 1, "a | b")
+        with ShardWriter(out) as w:
+            w.append("saadi", "golestan", 2, "c | d")
+        r = CorpusReader(out)
+        assert [x["sh"] for x in r] == [1, 2]
+        assert r.get(poem_key("saadi", "golestan", 1))["hash"]
+
+def test_concurrent_appends_keep_every_record_once():
+    import threading
+    with tempfile.TemporaryDirectory() as d:
+        out = os.path.join(d, "corpus")
+        w = ShardWriter(out, max_shard_bytes=20000, block_bytes=500)
+
+        def worker(poet):
+            for sh in range(1, 3001):
+                w.append(poet, "ghazal", sh, f"{poet} {sh} a | {poet} {sh} b")
+        threads = [threading.Thread(target=worker, args=(p,)) for p in ("hafez", "saadi")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        w.close()
+        r = CorpusReader(out)
+        keys = [x["key"] for x in r]
+        assert len(keys) == 6000 and len(set(keys)) == 6000
+        for poet in ("hafez", "saadi"):
+            for sh in (1, 1500, 3000):
+                assert r.get(poem_key(poet, "ghazal", sh))["couplets"] == [[f"{poet} {sh} a", f"{poet} {sh} b"]]
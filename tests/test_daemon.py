@@ -0,0 +1,89 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import url_builder
+from benchmarks.fake_ganjoor import FakeGanjoor
+from src.daemon import Catalog, Daemon, send
+from src.event_log import EventLog
+from src.manifest import Manifest
+
+def _wait(cond, timeout=10.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if cond():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_daemon_discovers_count_runs_jobs_and_answers_socket(monkeypatch):
+    server = FakeGanjoor(poems=5, audio_kb=4).start()
+    monkeypatch.setattr(url_builder, "BASE_URL", server.base_url)
+    with tempfile.TemporaryDirectory() as d:
+        modes_path = os.path.join(d, "url_modes.json")
+        with open(modes_path, "w", encoding="utf-8") as f:
+            json.dump({"hafez": {"ghazal": {"mode": "sh_pages"}, "dibache": {"mode": "no_sh"}}}, f)
+        log = EventLog(os.path.join(d, "e.jsonl"))
+        sock = os.path.join(d, "d.sock")
+        daemon = Daemon(sock, rate_ms=0, base_dir=d, catalog=Catalog(modes_path, d),
+                        manifest=Manifest(os.path.join(d, "m.jsonl")), events=log, verbose=False)
+        th = threading.Thread(target=daemon.serve, daemon=True)
+        th.start()
+        try:
+            assert _wait(lambda: os.path.exists(sock))
+            assert send({"cmd": "ping"}, sock)["ok"]
+            job = send({"cmd": "submit", "poet": "hafez"}, sock)["job"]
+            assert _wait(lambda: send({"cmd": "status", "job": job["job_id"]}, sock)["job"]["status"] == "done")
+            done = send({"cmd": "status", "job": job["job_id"]}, sock)["job"]
+            assert done["ranges"] == [["ghazal", 1, 5]] and done["stats"] == {"saved": 5}
+            with open(modes_path, encoding="utf-8") as f:
+                assert json.load(f)["hafez"]["ghazal"]["count"] == 5
+            # pages read during discovery were not fetched again by the download
+            assert server.requests["page"] == daemon.page_cache.misses < 5 + 10
+
+            again = send({"cmd": "submit", "poet": "hafez", "section": "ghazal", "start": 1, "end": 5}, sock)["job"]
+            assert _wait(lambda: send({"cmd": "status", "job": again["job_id"]}, sock)["job"]["status"] == "done")
+            status = send({"cmd": "status"}, sock)
+            assert status["jobs"][1]["stats"] == {"already_done": 5} and status["queued"] == 0
+            assert send({"cmd": "nope"}, sock) == {"ok": False, "error": "unknown command: nope"}
+            assert send({"cmd": "stop"}, sock)["ok"]
+            th.join(10)
+            assert not th.is_alive() and not os.path.exists(sock)
+        finally:
+            server.stop()
+            log.close()
+
+def test_socket_answering_garbage_is_treated_as_stale():
+    with tempfile.TemporaryDirectory() as d:
+        sock = os.path.join(d, "d.sock")
+        other = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        other.bind(sock)
+        other.listen(1)
+
+        def answer():
+            conn = other.accept()[0]
+            conn.recv(1024)
+            conn.sendall(b"220 not a daemon\n")
+            conn.close()
+        threading.Thread(target=answer, daemon=True).start()
+        log = EventLog(os.path.join(d, "e.jsonl"))
+        daemon = Daemon(sock, rate_ms=0, base_dir=d, catalog=Catalog(os.path.join(d, "modes.json"), d),
+                        manifest=Manifest(os.path.join(d, "m.jsonl")), events=log, verbose=False)
+        th = threading.Thread(target=daemon.serve, daemon=True)
+        th.start()
+        try:
+            assert _wait(lambda: _answers(sock))
+            assert send({"cmd": "stop"}, sock)["ok"]
+            th.join(10)
+            assert not th.is_alive()
+        finally:
+            other.close()
+            log.close()
+
+def _answers(sock):
+    try:
+        return send({"cmd": "ping"}, sock, timeout=1.0)["ok"]
+    except (OSError, ValueError):
+        return False
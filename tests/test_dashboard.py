@@ -0,0 +1,47 @@
+import io
+import os
+import tempfile
+from dashboard import Dashboard
+from event_log import EventLog, read_events
+from pipeline import Pipeline, section_tasks
+
+def test_snapshot_rates_and_eta():
+    d = Dashboard(quiet=True, events=None)
+    d.add_total("hafez", "ghazal", 10)
+    d.add_total("iraj", "ghataat", 10)
+    for _ in range(4):
+        d.advance("hafez", "ghazal")
+    d.advance("iraj", "ghataat", ok=False)
+    d.advance("iraj", "ghataat", counted=False)  # already in the manifest
+    snap = d.snapshot()
+    assert (snap["done"], snap["total"]) == (6, 20)
+    assert snap["poets"] == {"hafez": [4, 10], "iraj": [2, 10]}
+    assert snap["error_rate"] == 0.2
+    assert snap["rate"] > 0 and snap["eta_s"] is not None
+
+def test_quiet_mode_logs_progress_events(fake_site):
+    fake_site(missing={3})
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(os.path.join(tmp, "e.jsonl"))
+        dash = Dashboard(quiet=True, events=log, log_every_s=0)
+        dash.add_total("saadi", "golestan", 8)
+        pipe = Pipeline(rate_ms=0, events=log, progress=dash, verbose=False)
+        pipe.run(section_tasks("saadi", "golestan", 1, 8))
+        dash.close()
+        log.close()
+        progress = [r for r in read_events(log.path) if r["event"] == "progress"]
+    assert progress[-1]["done"] == 8 and progress[-1]["poets"] == {"saadi": [8, 8]}
+    assert progress[-1]["error_rate"] == 0.125
+    assert dash.pipeline is pipe and pipe.in_flight() == 0
+
+def test_bars_are_drawn_at_limited_rate():
+    out = io.StringIO()
+    d = Dashboard(file=out, refresh_s=3600)
+    d.add_total("khayyam", "robaee", 100)
+    for _ in range(50):
+        d.advance("khayyam", "robaee")
+    drawn = out.getvalue()
+    assert "1/100" in drawn and "50/100" not in drawn  # only the first result was drawn
+    d.close()
+    text = out.getvalue()
+    assert "khayyam" in text and "50/100" in text and "robaee 50/100" in text
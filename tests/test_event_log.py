@@ -0,0 +1,47 @@
+import os
+import tempfile
+import threading
+from src.event_log import EventLog, read_events
+
+def test_batched_records_are_written_on_close():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "events.jsonl")
+        log = EventLog(path, flush_interval=10)
+        log.failure("hafez", "ghazal", 3, "html_not_200", "https://ganjoor.net/hafez/ghazal/sh3", elapsed_ms=12.5)
+        log.saved("hafez", "ghazal", 4, elapsed_ms=80)
+        log.close()
+        recs = list(read_events(path))
+        assert [r["status"] for r in recs] == ["failed", "saved"]
+        assert recs[0]["reason"] == "html_not_200"
+        assert recs[0]["sh"] == 3
+        assert recs[0]["elapsed_ms"] == 12.5
+        assert "reason" not in recs[1]
+
+def test_concurrent_writers_do_not_interleave():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "events.jsonl")
+        log = EventLog(path, batch_size=16)
+
+        def worker(n):
+            for sh in range(1, 101):
+                log.failure(f"poet{n}", "sec", sh, "missing_text_or_audio", "u")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        log.close()
+        assert len(list(read_events(path))) == 400
+
+def test_rotation_keeps_backups_readable():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "events.jsonl")
+        log = EventLog(path, max_bytes=300, backups=3, batch_size=1)
+        for sh in range(1, 30):
+            log.saved("saadi", "golestan", sh)
+        log.close()
+        assert os.path.exists(path + ".1")
+        assert not os.path.exists(path + ".4")
+        shs = [r["sh"] for r in read_events(path)]
+        assert shs == sorted(shs)
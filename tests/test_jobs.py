@@ -0,0 +1,31 @@
+import tempfile
+from src.jobs import new_job, load_job, list_jobs
+
+def test_job_checkpoint_and_resume_cursor():
+    with tempfile.TemporaryDirectory() as d:
+        job = new_job(["hafez"], 300, jobs_dir=d)
+        job.checkpoint_every = 2
+        job.add_section("hafez", "ghazal", 5)
+        assert job.next_sh("hafez", "ghazal") == 1
+        job.advance("hafez", "ghazal", 1)
+        job.advance("hafez", "ghazal", 2)  # triggers a checkpoint
+        job.advance("hafez", "ghazal", 3)  # not yet persisted
+
+        resumed = load_job(job.job_id, jobs_dir=d)
+        assert resumed.next_sh("hafez", "ghazal") == 3
+        assert resumed.progress() == (2, 5)
+        assert not resumed.section_done("hafez", "ghazal")
+
+def test_finish_marks_status_and_lists():
+    with tempfile.TemporaryDirectory() as d:
+        job = new_job(["hafez", "attar"], 100, jobs_dir=d)
+        job.add_section("attar", "bolbolname", 2)
+        job.advance("attar", "bolbolname", 2)
+        assert not job.section_done("attar", "bolbolname")  # sh1 still outstanding
+        job.advance("attar", "bolbolname", 1)
+        job.finish("interrupted")
+        jobs = list_jobs(d)
+        assert [j.job_id for j in jobs] == [job.job_id]
+        assert jobs[0].status == "interrupted"
+        assert jobs[0].job_id.endswith("-all")
+        assert jobs[0].section_done("attar", "bolbolname")
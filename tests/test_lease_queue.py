@@ -0,0 +1,134 @@
+import os
+import tempfile
+import time
+from src.lease_queue import ChunkSizer, LeaseQueue, split_range
+from run_lease_worker import unit_tasks
+
+def test_split_range():
+    assert split_range(120, 50) == [(1, 50), (51, 100), (101, 120)]
+    assert split_range(0, 50) == []
+
+def test_claims_are_exclusive_and_complete():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "leases.sqlite")
+        modes = {"hafez": {"ghazal": {"mode": "sh_pages", "count": 120}, "masnavi": {"mode": "no_sh"}}}
+        q1 = LeaseQueue(path)
+        assert q1.seed_from_modes(modes, unit_size=50) == 3
+        assert q1.seed_from_modes(modes, unit_size=50) == 0  # idempotent
+        q2 = LeaseQueue(path)
+        a = q1.claim("w1")
+        b = q2.claim("w2")
+        assert a.id != b.id
+        assert q1.complete(a.id, "w1")
+        assert not q1.complete(b.id, "w1")  # not the owner
+        prog = q1.progress()["hafez"]
+        assert prog == {"done": 50, "leased": 50, "pending": 20}
+        q1.close()
+        q2.close()
+
+def test_expired_lease_is_reclaimed_and_old_owner_loses_it():
+    with tempfile.TemporaryDirectory() as d:
+        q = LeaseQueue(os.path.join(d, "leases.sqlite"), lease_seconds=0.05)
+        q.seed([("attar", "bolbolname", 1, 38)])
+        u = q.claim("dead-worker")
+        assert q.claim("w2") is None
+        time.sleep(0.1)
+        u2 = q.claim("w2")
+        assert u2.id == u.id
+        assert not q.heartbeat(u.id, "dead-worker")
+        assert q.heartbeat(u.id, "w2")
+
+def test_release_counts_attempts_until_failed():
+    with tempfile.TemporaryDirectory() as d:
+        q = LeaseQueue(os.path.join(d, "leases.sqlite"), max_attempts=2)
+        q.seed([("saadi", "golestan", 1, 10)])
+        u = q.claim("w")
+        assert q.release(u.id, "w", failed=False)
+        u = q.claim("w")
+        assert u.attempts == 0
+        q.release(u.id, "w")
+        u = q.claim("w")
+        assert u.attempts == 1
+        q.release(u.id, "w")
+        assert q.claim("w") is None
+        assert q.progress()["saadi"] == {"failed": 10}
+
+def test_claim_splits_to_chunk_size():
+    with tempfile.TemporaryDirectory() as d:
+        q = LeaseQueue(os.path.join(d, "leases.sqlite"))
+        q.seed([("attar", "asrarname", 1, 100)])
+        u = q.claim("w1", max_poems=30)
+        assert (u.sh_start, u.sh_end) == (1, 30)
+        u2 = q.claim("w2", max_poems=30)
+        assert (u2.sh_start, u2.sh_end) == (31, 60)
+        assert q.progress()["attar"] == {"leased": 60, "pending": 40}
+
+def test_steal_takes_unvisited_half_and_owner_sees_new_end():
+    with tempfile.TemporaryDirectory() as d:
+        q = LeaseQueue(os.path.join(d, "leases.sqlite"))
+        q.seed([("attar", "asrarname", 1, 100), ("iraj", "ghataat", 1, 10)])
+        big = q.claim("w1")
+        small = q.claim("w2")
+        assert q.report(big.id, "w1", 21) == 100  # w1 is at sh21
+        assert q.complete(small.id, "w2")
+        stolen = q.steal("w2")
+        assert (stolen.poet, stolen.sh_start, stolen.sh_end) == ("attar", 61, 100)
+        assert q.report(big.id, "w1", 26) == 60
+        assert q.steal("w1") is not None  # w1 may steal back from w2 once idle
+        assert q.steal("w3", min_poems=50) is None
+        assert q.progress()["attar"] == {"leased": 100}
+
+def test_owner_never_runs_past_a_steal():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "leases.sqlite")
+        q = LeaseQueue(path)
+        q.seed([("attar", "asrarname", 1, 40)])
+        unit = q.claim("w1")
+        tasks = unit_tasks(path, unit, "w1")
+        ran = [next(tasks).sh for _ in range(3)]  # sh3 is in progress
+        stolen = q.steal("w2")
+        assert stolen.sh_start == 3 + (40 - 3 + 1) // 2
+        ran += [t.sh for t in tasks]
+        assert ran == list(range(1, stolen.sh_start)) and unit.sh_end == stolen.sh_start - 1
+        q.close()
+
+def test_failed_poems_are_recorded_until_the_unit_completes():
+    with tempfile.TemporaryDirectory() as d:
+        q = LeaseQueue(os.path.join(d, "leases.sqlite"), max_attempts=2)
+        q.seed([("saadi", "golestan", 1, 10)])
+        u = q.claim("w")
+        assert q.release(u.id, "w", failed_sh=[7, 3])
+        assert q.failed_poems() == [("saadi", "golestan", 3), ("saadi", "golestan", 7)]
+        u = q.claim("w")
+        q.release(u.id, "w", failed_sh=[7])
+        assert q.progress()["saadi"] == {"failed": 10}
+        assert q.failed_poems() == [("saadi", "golestan", 7)]
+        q.seed([("saadi", "bustan", 1, 5)])
+        u = q.claim("w")
+        q.release(u.id, "w", failed_sh=[2])
+        u = q.claim("w")
+        assert q.complete(u.id, "w")
+        assert q.failed_poems() == [("saadi", "golestan", 7)]
+
+def test_claim_split_keeps_failed_poems_with_their_range():
+    with tempfile.TemporaryDirectory() as d:
+        q = LeaseQueue(os.path.join(d, "leases.sqlite"))
+        q.seed([("saadi", "golestan", 1, 40)])
+        u = q.claim("w")
+        q.release(u.id, "w", failed_sh=[4, 25, 33])
+        front = q.claim("w", max_poems=20)
+        assert (front.sh_start, front.sh_end) == (1, 20)
+        assert q.failed_poems() == [("saadi", "golestan", 4), ("saadi", "golestan", 25), ("saadi", "golestan", 33)]
+        assert q.complete(front.id, "w")
+        assert q.failed_poems() == [("saadi", "golestan", 25), ("saadi", "golestan", 33)]
+
+def test_chunk_sizer_follows_latency():
+    c = ChunkSizer(target_s=60, min_size=5, max_size=200, initial=50)
+    assert c.size == 50
+    c.observe(10, 20.0)  # 2 s per poem
+    assert c.size == 30
+    for _ in range(20):
+        c.observe(100, 10.0)  # 0.1 s per poem
+    assert c.size == 200
+    c.observe(0, 5.0)
+    assert c.size == 200
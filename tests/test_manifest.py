@@ -0,0 +1,79 @@
+import os
+import tempfile
+import threading
+from src.manifest import Manifest, load_manifest, text_hash
+
+def test_mark_done_persists_and_reloads():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "manifest.jsonl")
+        m = Manifest(path)
+        assert not m.is_done("hafez", "ghazal", 1)
+        m.mark_done("hafez", "ghazal", 1, "a | b", 1234)
+        m.close()
+
+        m2 = Manifest(path)
+        assert m2.is_done("hafez", "ghazal", 1)
+        assert m2.get("hafez", "ghazal", 1) == (text_hash("a | b"), 1234)
+        assert m2.done_count("hafez") == 1
+        assert m2.done_count("hafez", "ghete") == 0
+
+def test_torn_last_line_is_ignored():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "manifest.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"p":"hafez","s":"ghazal","n":2,"h":"x","a":5}\n{"p":"haf')
+        m = Manifest(path)
+        assert len(m) == 1
+        assert m.is_done("hafez", "ghazal", 2)
+
+def test_compact_keeps_latest_entry():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "manifest.jsonl")
+        m = Manifest(path)
+        m.mark_done("attar", "divana/ghazal-attar", 3, "old", 10)
+        m.mark_done("attar", "divana/ghazal-attar", 3, "new", 20)
+        m.compact()
+        with open(path, encoding="utf-8") as f:
+            assert len(f.readlines()) == 1
+        assert Manifest(path).get("attar", "divana/ghazal-attar", 3)[1] == 20
+
+def test_load_manifest_backfills_existing_files():
+    with tempfile.TemporaryDirectory() as d:
+        text_dir = os.path.join(d, "text", "attar", "divana", "ghazal-attar")
+        audio_dir = os.path.join(d, "audio", "attar", "divana", "ghazal-attar")
+        os.makedirs(text_dir)
+        os.makedirs(audio_dir)
+        with open(os.path.join(text_dir, "sh7.txt"), "w", encoding="utf-8") as f:
+            f.write("x | y")
+        with open(os.path.join(audio_dir, "sh7.mp3"), "wb") as f:
+            f.write(b"\0" * 42)
+        # text without audio is not considered complete
+        with open(os.path.join(text_dir, "sh8.txt"), "w", encoding="utf-8") as f:
+            f.write("z")
+
+        m = load_manifest(os.path.join(d, "manifest.jsonl"), base_dir=d)
+        assert m.is_done("attar", "divana/ghazal-attar", 7)
+        assert m.get("attar", "divana/ghazal-attar", 7)[1] == 42
+        assert not m.is_done("attar", "divana/ghazal-attar", 8)
+
+def test_concurrent_mark_done_writes_whole_lines():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "manifest.jsonl")
+        m = Manifest(path)
+
+        def worker(k):
+            for n in range(200):
+                m.mark_done("hafez", "ghazal%d" % k, n, "a | b", n)
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        m.close()
+
+        assert m.done_count("hafez") == 800
+        assert m.done_count("hafez", "ghazal2") == 200
+        m2 = Manifest(path)
+        assert len(m2.entries) == 800
+        assert m2.done_count("hafez", "ghazal3") == 200
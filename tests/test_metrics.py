@@ -0,0 +1,49 @@
+import os
+import tempfile
+import urllib.request
+from event_log import EventLog
+from metrics import Metrics
+from pipeline import Pipeline, section_tasks
+
+def test_render_prometheus_text():
+    m = Metrics()
+    m.inc("ganjoor_http_requests_total", kind="page", status=200)
+    m.inc("ganjoor_http_requests_total", kind="page", status=200)
+    m.set("ganjoor_queue_depth", 3, stage="fetch")
+    for v in (0.02, 0.3, 40.0):
+        m.observe("ganjoor_fetch_seconds", v, poet="hafez", section="ghazal")
+    text = m.render()
+    assert "# TYPE ganjoor_http_requests_total counter" in text
+    assert 'ganjoor_http_requests_total{kind="page",status="200"} 2' in text
+    assert 'ganjoor_queue_depth{stage="fetch"} 3' in text
+    assert 'ganjoor_fetch_seconds_bucket{poet="hafez",section="ghazal",le="0.025"} 1' in text
+    assert 'ganjoor_fetch_seconds_bucket{poet="hafez",section="ghazal",le="0.5"} 2' in text
+    assert 'ganjoor_fetch_seconds_bucket{poet="hafez",section="ghazal",le="+Inf"} 3' in text
+    assert 'ganjoor_fetch_seconds_count{poet="hafez",section="ghazal"} 3' in text
+
+def test_textfile_and_http_exposition():
+    m = Metrics()
+    m.inc("ganjoor_poems_total", poet="iraj", section="ghataat", result="saved")
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "metrics.prom")
+        m.write_textfile(path)
+        with open(path, encoding="utf-8") as f:
+            assert 'result="saved"' in f.read()
+    server = m.start_http(0)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert 'ganjoor_poems_total{poet="iraj",result="saved",section="ghataat"} 1' in body
+    finally:
+        server.shutdown()
+
+def test_pipeline_is_instrumented(fake_site):
+    fake_site(missing={2})
+    with tempfile.TemporaryDirectory() as d:
+        pipe = Pipeline(rate_ms=0, events=EventLog(os.path.join(d, "e.jsonl")), verbose=False)
+        m = pipe.metrics  # the process-wide registry
+        before = m.get("ganjoor_poems_total", poet="nezami", section="makhzan", result="saved")
+        pipe.run(section_tasks("nezami", "makhzan", 1, 4))
+    assert m.get("ganjoor_poems_total", poet="nezami", section="makhzan", result="saved") == before + 3
+    assert m.get("ganjoor_poems_total", poet="nezami", section="makhzan", result="html_not_200") >= 1
+    assert m.count("ganjoor_parse_seconds", poet="nezami", section="makhzan") >= 3
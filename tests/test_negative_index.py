@@ -0,0 +1,87 @@
+import os
+import tempfile
+import url_builder
+import extractor
+import negative_index
+from benchmarks.fake_ganjoor import FakeGanjoor
+from event_log import EventLog, read_events
+from negative_index import NegativeIndex
+from pipeline import Pipeline, section_tasks
+
+def test_records_only_missing_statuses_and_persists():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "neg.json")
+        idx = NegativeIndex(path, save_every=1)
+        idx.record("https://x/hafez/rubai", 404)
+        idx.record("https://x/hafez/ghazal/sh3", 503)
+        idx.record("https://x/hafez/ghazal/sh0", 0)
+        again = NegativeIndex(path)
+        assert again.known_missing("https://x/hafez/rubai")
+        assert not again.known_missing("https://x/hafez/ghazal/sh3")
+        assert not again.known_missing("https://x/hafez/ghazal/sh0")
+        assert again.hits == 1 and again.misses == 2
+
+def test_bloom_keeps_urls_beyond_the_exact_set():
+    idx = NegativeIndex(None, capacity=1000, recent_max=10)
+    urls = [f"https://x/attar/divana/sh{i}" for i in range(500)]
+    for u in urls:
+        idx.add(u)
+    assert len(idx) == 10
+    assert all(idx.known_missing(u) for u in urls)
+    assert sum(idx.known_missing(f"https://x/attar/divana/sh{i}") for i in range(500, 5500)) < 5
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(negative_index.time, "time", lambda: now[0])
+    idx = NegativeIndex(None, ttl_s=100, recent_max=1)
+    idx.add("a")
+    now[0] += 10
+    idx.add("b")  # pushes "a" out of the exact set, it stays in the Bloom generation
+    assert idx.known_missing("a") and idx.known_missing("b")
+    now[0] += 60  # past ttl/2: new URLs go to a fresh generation
+    idx.add("c")
+    now[0] += 40  # the first generation is ttl old now
+    assert not idx.known_missing("a")
+    assert not idx.known_missing("b")
+    assert idx.known_missing("c")
+
+def test_discard_overrides_the_bloom_generations_until_seen_again():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "neg.json")
+        idx = NegativeIndex(path, recent_max=1)
+        idx.add("a")
+        idx.add("b")  # "a" is only in the Bloom generation now
+        idx.discard("a")
+        idx.discard("b")
+        idx.save()
+        again = NegativeIndex(path)
+        assert not again.known_missing("a") and not again.known_missing("b")
+        again.add("a")
+        assert again.known_missing("a")
+
+def test_fetch_html_skips_known_404s(monkeypatch):
+    server = FakeGanjoor(poems=2).start()
+    monkeypatch.setattr(url_builder, "BASE_URL", server.base_url)
+    monkeypatch.setattr(negative_index, "_shared", NegativeIndex(None))
+    try:
+        for _ in range(3):
+            assert extractor.fetch_html(server.base_url + "/hafez/ghazal/sh9") is None
+        assert extractor.fetch_html(server.base_url + "/hafez/ghazal/sh1")
+        assert server.requests["page"] == 2
+    finally:
+        server.stop()
+
+def test_pipeline_leaves_known_missing_out_before_fetching(fake_site):
+    fetched = []
+    fake_site(fetched=fetched)
+    idx = NegativeIndex(None)
+    idx.add(url_builder.build_poem_url("hafez", 4, "ghazal"))
+    with tempfile.TemporaryDirectory() as d:
+        log = EventLog(os.path.join(d, "events.jsonl"))
+        stats = Pipeline(rate_ms=0, events=log, negative=idx, verbose=False).run(
+            section_tasks("hafez", "ghazal", 1, 5))
+        log.close()
+        logged = [(r["sh"], r["status"]) for r in read_events(log.path)]
+    assert stats == {"saved": 4, "known_missing": 1}
+    assert sorted(fetched) == [1, 2, 3, 5]
+    assert sorted(logged) == [(1, "saved"), (2, "saved"), (3, "saved"), (5, "saved")]
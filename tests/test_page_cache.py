@@ -0,0 +1,76 @@
+import os
+import tempfile
+import threading
+import time
+import pipeline
+from event_log import EventLog
+from page_cache import PageCache, Prefetcher, discover_count
+from pipeline import Pipeline, PoemTask, section_tasks
+
+def test_lru_ttl_and_counters():
+    c = PageCache(max_entries=2, ttl_s=0.05)
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        return None if url == "bad" else "<html>" + url
+
+    assert c.fetch("a", fetch) == "<html>a"
+    assert c.fetch("a", fetch) == "<html>a"
+    c.fetch("b", fetch)
+    c.fetch("c", fetch)  # evicts a
+    assert "a" not in c and "c" in c
+    assert c.fetch("bad", fetch) is None and "bad" not in c
+    assert (c.hits, c.misses) == (1, 4)
+    time.sleep(0.06)
+    assert c.get("c") is None
+
+def test_foreground_waits_for_prefetch_in_progress():
+    c = PageCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_fetch(url):
+        calls.append(url)
+        started.set()
+        release.wait(2)
+        return "<html>"
+
+    p = Prefetcher(c, fetch=slow_fetch)
+    p.submit(["u1", "u1"])
+    assert started.wait(2)
+    threading.Timer(0.05, release.set).start()
+    assert c.fetch("u1", slow_fetch) == "<html>"
+    assert calls == ["u1"] and c.hits == 1
+    p.close()
+
+def test_pipeline_uses_warmed_pages(fake_site):
+    fetched = []
+    fake_site(fetched=fetched)
+    cache = PageCache()
+    p = Prefetcher(cache, fetch=pipeline.fetch_html)
+    p.submit(PoemTask("hafez", "ghazal", sh).url for sh in (1, 2, 3))
+    deadline = time.time() + 2
+    while not p.idle() and time.time() < deadline:
+        time.sleep(0.01)
+    with tempfile.TemporaryDirectory() as d:
+        pipe = Pipeline(rate_ms=0, page_cache=cache, events=EventLog(os.path.join(d, "e.jsonl")), verbose=False)
+        stats = pipe.run(section_tasks("hafez", "ghazal", 1, 5))
+    assert stats == {"saved": 5}
+    assert sorted(fetched) == [1, 2, 3, 4, 5]
+    assert cache.hits == 3
+    p.close()
+
+def test_discover_count_reads_through_the_cache():
+    c = PageCache()
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        sh = int(url.rsplit("sh", 1)[1])
+        return "<div class='poem'><p>line</p></div>" if sh <= 37 else None
+
+    assert discover_count("hafez", "ghazal", c, fetch=fetch) == 37
+    probed = len(calls)
+    assert discover_count("hafez", "ghazal", c, fetch=fetch) == 37
+    assert len(calls) - probed == len([u for u in calls[:probed] if int(u.rsplit("sh", 1)[1]) > 37])
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from poem import Poem
+from src.parse_cache import PARSER_VERSION, ParseCache, page_key
+from src.extractor import parse_poem
+
+PAGE = "<div class='poem'><div class='beyt'><div class='m1'>یک</div><div class='m2'>دو</div></div>" \
+       "<audio src='/a/1.mp3'></audio></div>"
+
+def _counting_parser(calls):
+    def parse(html):
+        calls.append(html)
+        return Poem.from_couplets([(html[:3], "x")], ["a.mp3"])
+    return parse
+
+def test_identical_pages_are_parsed_once():
+    calls = []
+    cache = ParseCache(max_entries=2)
+    first = cache.parse("<p>one</p>", _counting_parser(calls))
+    again = cache.parse("<p>one</p>".encode("utf-8").decode("utf-8"), _counting_parser(calls))
+    assert again is first and len(calls) == 1
+    assert cache.hits == 1 and cache.misses == 1
+    assert page_key("<p>one</p>") == page_key("<p>one</p>".encode("utf-8")) != page_key("<p>two</p>")
+
+def test_lru_evicts_least_recently_used():
+    calls = []
+    cache = ParseCache(max_entries=2)
+    parse = _counting_parser(calls)
+    for html in ("a1", "b1", "a1", "c1", "a1", "b1"):
+        cache.parse(html, parse)
+    assert calls == ["a1", "b1", "c1", "b1"] and len(cache) == 2
+
+def test_results_persist_across_instances_and_parser_versions():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "parse.sqlite")
+        calls = []
+        one = ParseCache(path=path)
+        one.parse("<p>page</p>", _counting_parser(calls))
+        one.close()
+        two = ParseCache(path=path)
+        poem = two.parse("<p>page</p>", _counting_parser(calls))
+        two.close()
+        assert len(calls) == 1 and poem.couplet_lists() == [["<p>", "x"]] and poem.audio_url == "a.mp3"
+        newer = ParseCache(path=path, version=PARSER_VERSION + 1)
+        newer.parse("<p>page</p>", _counting_parser(calls))
+        newer.close()
+        assert len(calls) == 2
+
+def test_parse_poem_attaches_caller_metadata_to_cached_results():
+    a = parse_poem(PAGE, "hafez", "ghazal", 1, "u1")
+    b = parse_poem(PAGE, "saadi", "golestan", 2, "u2")
+    assert a.couplet_lists() == b.couplet_lists() == [["یک", "دو"]]
+    assert (a.poet, a.sh, a.url) == ("hafez", 1, "u1") and (b.poet, b.sh, b.url) == ("saadi", 2, "u2")
+    assert parse_poem(PAGE, cache=False).text == a.text
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import pytest
+import url_builder
+from benchmarks.fake_ganjoor import FakeGanjoor
+from src.event_log import EventLog
+from src.extractor import parse_poem
+from src.parse_cache import ParseCache
+from src.parse_executor import ParseExecutor
+from src.pipeline import Pipeline, section_tasks
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+NAMES = ["ghazal", "masnavi", "robaee", "qaside", "no_audio", "landing_no_sh", "empty_hemistich"]
+
+def _pages():
+    out = []
+    for name in NAMES:
+        with open(os.path.join(FIXTURES, name + ".html"), encoding="utf-8") as f:
+            out.append(f.read().encode("utf-8"))
+    return out
+
+def _expected(pages):
+    return [(p.couplet_lists(), p.audio_urls) for p in (parse_poem(x.decode("utf-8"), cache=False) for x in pages)]
+
+def test_inline_executor_never_starts_a_pool():
+    pages = _pages()
+    ex = ParseExecutor(0, cache=ParseCache(max_entries=0))
+    poems = ex.parse_many(pages)
+    ex.close()
+    assert [(p.couplet_lists(), p.audio_urls) for p in poems] == _expected(pages)
+    assert ex._pool is None and ex.shipped == 0
+
+def test_pool_batches_pages_and_keeps_order_and_metadata():
+    pages = _pages() * 3
+    with ParseExecutor(2, batch_size=4, inline_below=0, cache=ParseCache(max_entries=0)) as ex:
+        poems = ex.parse_many(pages)
+        one = ex.parse(pages[0], "hafez", "ghazal", 7, "u7")
+    assert [(p.couplet_lists(), p.audio_urls) for p in poems] == _expected(pages)
+    assert ex.shipped == len(pages) + 1 and ex.batches < ex.shipped
+    assert (one.poet, one.section_path, one.sh, one.url) == ("hafez", "ghazal", 7, "u7")
+
+def test_small_jobs_and_cached_pages_stay_inline():
+    pages = _pages()
+    with ParseExecutor(2, inline_below=4, cache=ParseCache()) as ex:
+        ex.parse_many(pages)
+        assert ex.shipped == len(pages) - 4
+        ex.parse_many(pages)  # all cached now
+        assert ex.shipped == len(pages) - 4 and ex.cache.hits == len(pages)
+
+def test_a_bad_page_fails_only_its_own_future():
+    with ParseExecutor(1, batch_size=4, inline_below=0, cache=ParseCache(max_entries=0)) as ex:
+        good = ex.submit(_pages()[0])
+        bad = ex.submit(b"\xff\xfe not utf-8")
+        assert good.result().couplet_lists()
+        with pytest.raises(UnicodeDecodeError):
+            bad.result()
+
+def test_pipeline_parses_in_processes(monkeypatch):
+    server = FakeGanjoor(poems=12, audio_kb=1).start()
+    monkeypatch.setattr(url_builder, "BASE_URL", server.base_url)
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            log = EventLog(os.path.join(d, "e.jsonl"))
+            pipe = Pipeline(rate_ms=0, parse_processes=2, base_dir=d, events=log, verbose=False)
+            assert pipe.parse_threads >= 2 * 8
+            stats = pipe.run(section_tasks("hafez", "ghazal", 1, 20))
+            log.close()
+            with open(os.path.join(d, "text", "hafez", "ghazal", "sh12.txt"), encoding="utf-8") as f:
+                assert len(f.read().splitlines()) == 7
+    finally:
+        server.stop()
+    assert stats == {"saved": 12, "html_not_200": 8}
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import threading
+import time
+from pipeline import Pipeline, PoemTask, RateLimiter, section_tasks
+from event_log import EventLog, read_events
+from jobs import new_job
+from manifest import Manifest
+
+def test_pipeline_outcomes_events_and_job(fake_site):
+    fake_site(missing={3}, no_audio={5})
+    with tempfile.TemporaryDirectory() as d:
+        log = EventLog(os.path.join(d, "events.jsonl"))
+        job = new_job(["hafez"], 0, jobs_dir=d)
+        job.add_section("hafez", "ghazal", 20)
+        pipe = Pipeline(rate_ms=0, fetch_workers=4, store_workers=3, queue_size=2,
+                        job=job, events=log, verbose=False)
+        stats = pipe.run(section_tasks("hafez", "ghazal", 1, 20))
+        log.close()
+        assert stats == {"saved": 18, "html_not_200": 1, "missing_text_or_audio": 1}
+        assert Pipeline.saved_skipped(stats) == (18, 2)
+        assert job.next_sh("hafez", "ghazal") == 21
+        failed = {r["sh"]: r["reason"] for r in read_events(log.path) if r["status"] == "failed"}
+        assert failed == {3: "html_not_200", 5: "missing_text_or_audio"}
+
+def test_manifest_entries_are_not_fetched(fake_site):
+    fetched = []
+    fake_site(fetched=fetched)
+    with tempfile.TemporaryDirectory() as d:
+        m = Manifest(os.path.join(d, "manifest.jsonl"))
+        for sh in (1, 2, 3):
+            m.mark_done("attar", "bolbolname", sh, "t", 1)
+        results = []
+        pipe = Pipeline(rate_ms=0, manifest=m, events=EventLog(os.path.join(d, "e.jsonl")),
+                        on_result=results.append, verbose=False)
+        stats = pipe.run([PoemTask("attar", "bolbolname", sh) for sh in range(1, 6)])
+        assert stats == {"already_done": 3, "saved": 2}
+        assert sorted(fetched) == [4, 5]
+        assert len(results) == 5
+
+def test_rate_limiter_spaces_requests_across_threads():
+    limiter = RateLimiter(0.02)
+    stamps = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(3):
+            limiter.wait()
+            with lock:
+                stamps.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stamps.sort()
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert min(gaps) > 0.015
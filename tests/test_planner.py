@@ -0,0 +1,43 @@
+import os
+import tempfile
+from src.event_log import EventLog
+from src.manifest import Manifest
+from src.planner import History, format_plan, load_history, plan_sections
+
+MODES = {
+    "hafez": {"ghazal": {"mode": "sh_pages", "count": 100}, "ghete": {"mode": "sh_pages"},
+              "masnavi": {"mode": "no_sh"}},
+}
+
+def test_history_from_events_and_manifest():
+    with tempfile.TemporaryDirectory() as d:
+        log = EventLog(os.path.join(d, "events.jsonl"))
+        for sh in range(1, 31):
+            log.saved("hafez", "ghazal", sh, "u", elapsed_ms=400.0, page_bytes=2000)
+        for sh in range(31, 41):
+            log.failure("hafez", "ghazal", sh, "html_not_200", "u")
+        log.close()
+        m = Manifest(os.path.join(d, "manifest.jsonl"))
+        for sh in range(1, 31):
+            m.mark_done("hafez", "ghazal", sh, "t", 1000)
+        h = load_history(log.path, manifest=m)
+        assert (h.page_bytes, h.poem_ms, h.audio_bytes, h.samples) == (2000, 400.0, 1000, 40)
+        assert h.success_rate == 0.75
+        assert load_history(os.path.join(d, "none.jsonl")).page_bytes == History().page_bytes
+
+def test_plan_counts_manifest_and_rate():
+    with tempfile.TemporaryDirectory() as d:
+        m = Manifest(os.path.join(d, "manifest.jsonl"))
+        for sh in range(1, 41):
+            m.mark_done("hafez", "ghazal", sh, "t", 1)
+        h = History(page_bytes=1000, audio_bytes=10000, poem_ms=2000, success_rate=0.5)
+        plans = plan_sections(MODES, ["hafez"], manifest=m, history=h, rate_ms=300, fetch_workers=4)
+        ghazal, ghete = plans
+        assert (ghazal.done, ghazal.todo, ghazal.requests, ghazal.bytes) == (40, 60, 90, 360000)
+        assert ghazal.seconds == 60 * 0.5  # 2s per poem over 4 workers beats the 0.3s spacing
+        assert ghete.total is None and ghete.todo == 0
+        slow = plan_sections(MODES, ["hafez"], manifest=m, history=h, rate_ms=1000, fetch_workers=4)
+        assert slow[0].seconds == 60.0
+        lines = format_plan(plans)
+        assert lines[-2].startswith("ALL") and "40/100+?" in lines[-2]
+        assert lines[-1].startswith("[NOTE] 1 sections")
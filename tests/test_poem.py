@@ -0,0 +1,69 @@
+import io
+import os
+import pickle
+import tempfile
+from poem import Poem
+from src.corpus_writer import ShardWriter, CorpusReader
+from src.extractor import parse_poem, parse_poem_page
+from src.manifest import text_hash
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name + ".html"), encoding="utf-8") as f:
+        return f.read()
+
+def test_couplets_are_views_into_one_buffer():
+    p = Poem.from_couplets([("الا یا ایها الساقی", "ادر کاسا و ناولها"), ("", ""), ("تک",)],
+                           ["a.mp3", "b.ogg"], poet="hafez", section_path="ghazal", sh=1)
+    assert len(p) == 2 and bool(p) and not Poem()
+    assert p[0].hemistichs == ("الا یا ایها الساقی", "ادر کاسا و ناولها")
+    assert [c.number for c in p] == [1, 2] and p[-1].hemistichs == ("تک",)
+    assert p.text == "الا یا ایها الساقی | ادر کاسا و ناولها\nتک"
+    assert p.audio_url == "a.mp3" and p.sh == 1
+    assert Poem.from_text(p.text).couplet_lists() == p.couplet_lists()
+
+def test_serialization_matches_the_flat_text():
+    p = Poem.from_couplets([("a", "b"), ("c", "d")])
+    f = io.StringIO()
+    p.write_text(f)
+    assert f.getvalue() == p.text == "a | b\nc | d"
+    assert p.digest() == text_hash(p.text) == text_hash(p)
+    back = pickle.loads(pickle.dumps(p))
+    assert back.couplet_lists() == [["a", "b"], ["c", "d"]]
+
+def test_parse_poem_agrees_with_parse_poem_page_on_fixtures():
+    for name in ("ghazal", "masnavi", "robaee", "qaside", "no_audio", "landing_no_sh", "empty_hemistich"):
+        html = _fixture(name)
+        poem = parse_poem(html, "hafez", "ghazal", 3, "https://ganjoor.net/hafez/ghazal/sh3")
+        text, audio = parse_poem_page(html)
+        assert (poem.text or None) == text and poem.audio_url == audio
+        assert poem.url.endswith("/sh3")
+    ghazal = parse_poem(_fixture("ghazal"))
+    assert all(len(c.hemistichs) == 2 for c in ghazal)
+
+def test_flat_text_keeps_the_old_line_format():
+    text, _ = parse_poem_page(_fixture("empty_hemistich"), cache=False)
+    lines = text.splitlines()
+    assert lines[1] == "به بوی نافه‌ای کاخر صبا زان طره بگشاید"  # empty m2: no dangling separator
+    assert lines[2] == "جرس فریاد می‌دارد که بربندید محمل‌ها"  # empty m1
+    assert lines[3] == "به می سجاده رنگین کن گرت پیر مغان گوید"  # m2 is only a bar
+    assert lines[4].count(" | ") == 1  # empty m1/m2: the row's inline text
+    row = "<div class='poem'><div class='beyt'><div class='m1'>{}</div><div class='m2'>{}</div></div></div>"
+    assert parse_poem_page(row.format("| a|", "b |"), cache=False)[0] == "a| | b"
+    assert parse_poem_page(row.format("|", "|"), cache=False)[0] == "| |"
+
+def test_inline_fallback_keeps_hemistichs_apart():
+    poem = parse_poem("<div class='poem'><p>یک | دو / سه</p></div>")
+    assert poem[0].hemistichs == ("یک | دو", "سه")
+
+def test_corpus_record_from_poem_equals_record_from_text():
+    p = Poem.from_couplets([("a", "b"), ("c", "d")])
+    with tempfile.TemporaryDirectory() as d:
+        with ShardWriter(d) as w:
+            w.append("hafez", "ghazal", 1, p)
+            w.append("hafez", "ghazal", 2, p.text)
+        r = CorpusReader(d)
+        one, two = r.get("hafez/ghazal/sh1"), r.get("hafez/ghazal/sh2")
+    assert one["couplets"] == two["couplets"] == [["a", "b"], ["c", "d"]]
+    assert one["hash"] == two["hash"]
@@ -0,0 +1,63 @@
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import profiling
+from event_log import EventLog
+from pipeline import Pipeline, section_tasks
+
+def test_pipeline_spans_written_as_chrome_trace(fake_site):
+    fake_site(missing={2})
+    tracer = profiling.start_tracing()
+    with tempfile.TemporaryDirectory() as d:
+        log = EventLog(os.path.join(d, "e.jsonl"))
+        try:
+            Pipeline(rate_ms=0, events=log, verbose=False).run(section_tasks("hafez", "ghazal", 1, 4))
+        finally:
+            profiling._tracer = None
+            log.close()
+        path = os.path.join(d, "t.json")
+        tracer.write(path)
+        with open(path, encoding="utf-8") as f:
+            events = json.load(f)["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    names = sorted(e["name"] for e in spans)
+    assert names.count("fetch") == 4 and names.count("parse") == 3 and names.count("store") == 3
+    assert all(e["dur"] >= 0 and e["args"]["poet"] == "hafez" for e in spans)
+    assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in events)
+
+def test_span_is_noop_without_tracer():
+    assert profiling.get_tracer() is None
+    with profiling.span("fetch", sh=1):
+        pass
+
+def _worker_thread_body():
+    time.sleep(0.02)
+
+def test_profiled_main_strips_flags_and_writes_outputs(monkeypatch, capsys):
+    seen = []
+    def main():
+        seen.append(list(sys.argv))
+        worker = threading.Thread(target=_worker_thread_body)
+        worker.start()
+        worker.join()
+        time.sleep(0.05)
+    with tempfile.TemporaryDirectory() as d:
+        prof = os.path.join(d, "run.prof")
+        monkeypatch.setattr(sys, "argv", ["run.py", "hafez", f"--profile={prof}", "--trace=" + os.path.join(d, "t.json")])
+        monkeypatch.setattr(profiling.atexit, "register", lambda fn: None)
+        try:
+            profiling.profiled_main(main)
+        finally:
+            profiling._tracer = None
+        assert seen == [["run.py", "hafez"]]
+        assert os.path.getsize(prof) > 0
+        profiled = {name for (_file, _line, name) in pstats.Stats(prof).stats}
+        with open(prof + ".folded", encoding="utf-8") as f:
+            folded = f.read()
+    assert "main (test_profiling.py" in folded
+    assert {"main", "_worker_thread_body"} <= profiled
+    assert "[PROFILE]" in capsys.readouterr().out
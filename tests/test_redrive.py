@@ -0,0 +1,71 @@
+import os
+import tempfile
+import event_log
+import negative_index
+import url_builder
+from benchmarks.fake_ganjoor import FakeGanjoor
+from src.event_log import EventLog
+from src.manifest import Manifest
+from src.negative_index import NegativeIndex
+from src.redrive import FailedItem, load_failures, group_by_reason, redrive
+
+def _log(path, records):
+    log = EventLog(path)
+    for kind, poet, sec, sh, reason in records:
+        if kind == "failed":
+            log.failure(poet, sec, sh, reason, f"https://ganjoor.net/{poet}/{sec}/sh{sh}")
+        elif kind == "saved":
+            log.saved(poet, sec, sh)
+        else:
+            log.emit("redrive", status="resolved", poet=poet, section_path=sec, sh=sh)
+    log.close()
+
+def test_dedupe_group_and_resolve():
+    with tempfile.TemporaryDirectory() as d:
+        events = os.path.join(d, "events.jsonl")
+        _log(events, [
+            ("failed", "hafez", "ghazal", 1, "html_not_200"),
+            ("failed", "hafez", "ghazal", 1, "html_not_200"),
+            ("failed", "hafez", "ghazal", 2, "missing_text_or_audio"),
+            ("failed", "hafez", "ghazal", 3, "audio_download_failed"),
+            ("saved", "hafez", "ghazal", 3, None),
+            ("failed", "attar", "bolbolname", 4, "audio_download_failed"),
+            ("resolved", "attar", "bolbolname", 4, None),
+        ])
+        failures = load_failures(events, legacy_csv=None)
+        assert set(failures) == {("hafez", "ghazal", 1), ("hafez", "ghazal", 2)}
+        assert failures[("hafez", "ghazal", 1)].failures == 2
+        groups = group_by_reason(failures.values())
+        assert sorted(groups) == ["html_not_200", "missing_text_or_audio"]
+
+def test_legacy_csv_and_manifest_filter():
+    with tempfile.TemporaryDirectory() as d:
+        legacy = os.path.join(d, "failed.csv")
+        with open(legacy, "w", encoding="utf-8") as f:
+            f.write("poet,section,sh,reason,url\n")
+            f.write("saadi,golestan,5,html_not_200,https://ganjoor.net/saadi/golestan/sh5\n")
+            f.write("saadi,golestan,6,html_not_200,https://ganjoor.net/saadi/golestan/sh6\n")
+        m = Manifest(os.path.join(d, "manifest.jsonl"))
+        m.mark_done("saadi", "golestan", 6, "t", 1)
+        failures = load_failures(os.path.join(d, "missing.jsonl"), legacy_csv=legacy, manifest=m)
+        assert list(failures) == [("saadi", "golestan", 5)]
+
+def test_redrive_requests_urls_held_in_the_negative_index(monkeypatch):
+    server = FakeGanjoor(poems=3, audio_kb=1).start()
+    monkeypatch.setattr(url_builder, "BASE_URL", server.base_url)
+    url = url_builder.build_poem_url("hafez", 2, "ghazal")
+    idx = NegativeIndex(None)
+    idx.add(url)  # the page 404'd once, before it came back
+    monkeypatch.setattr(negative_index, "_shared", idx)
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            log = EventLog(os.path.join(d, "events.jsonl"))
+            monkeypatch.setattr(event_log, "_shared", log)
+            resolved = redrive([FailedItem("hafez", "ghazal", 2, "html_not_200", url)],
+                               retries=1, rate_ms=0, base_dir=d)
+            log.close()
+            assert os.path.exists(os.path.join(d, "text", "hafez", "ghazal", "sh2.txt"))
+    finally:
+        server.stop()
+    assert server.requests["page"] == 1
+    assert resolved["resolved"] == 1 and not idx.known_missing(url)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import threading
+from scheduler import FairScheduler
+from pipeline import Pipeline
+from event_log import EventLog
+
+def _take(sched, n):
+    out = []
+    it = sched.tasks()
+    for _ in range(n):
+        t = next(it)
+        out.append(t)
+        sched.release(t)
+    return out
+
+def test_equal_weights_interleave_poets_and_sections():
+    s = FairScheduler(section_cap=1)
+    s.add_section("attar", "a1", 1, 100)
+    s.add_section("attar", "a2", 1, 100)
+    s.add_section("iraj", "i1", 1, 2)
+    got = [(t.poet, t.section_path, t.sh) for t in _take(s, 6)]
+    assert got[:4] == [("attar", "a1", 1), ("iraj", "i1", 1), ("attar", "a2", 1), ("iraj", "i1", 2)]
+    assert got[4:] == [("attar", "a1", 2), ("attar", "a2", 2)]
+
+def test_weights_set_share():
+    s = FairScheduler(weights={"saadi": 3}, section_cap=100)
+    s.add_section("saadi", "golestan", 1, 1000)
+    s.add_section("hafez", "ghazal", 1, 1000)
+    poets = [t.poet for t in _take(s, 400)]
+    assert poets.count("saadi") == 300
+
+def test_section_cap_blocks_until_release():
+    s = FairScheduler(section_cap=2)
+    s.add_section("hafez", "ghazal", 1, 5)
+    it = s.tasks()
+    first = [next(it), next(it)]
+    got = []
+    th = threading.Thread(target=lambda: got.append(next(it)))
+    th.start()
+    th.join(0.2)
+    assert th.is_alive() and not got
+    s.release(first[0])
+    th.join(2)
+    assert got[0].sh == 3
+
+def test_pipeline_drains_scheduler(fake_site):
+    fake_site(missing={2})
+    s = FairScheduler(section_cap=1)
+    s.add_section("hafez", "ghazal", 1, 10)
+    s.add_section("khayyam", "robaee", 1, 10)
+    with tempfile.TemporaryDirectory() as d:
+        order = []
+
+        def on_result(res):
+            s.release(res)
+            order.append(res.task.poet)
+
+        pipe = Pipeline(rate_ms=0, fetch_workers=4, events=EventLog(os.path.join(d, "e.jsonl")),
+                        on_result=on_result, verbose=False)
+        stats = pipe.run(s.tasks())
+    assert stats == {"saved": 18, "html_not_200": 2}
+    assert set(order[:4]) == {"hafez", "khayyam"}
+    assert s.pending() == 0 and s.in_flight() == 0
@@ -0,0 +1,39 @@
+import threading
+import time
+from src.validator import probe_sections
+
+def _site(ok_urls, delay=0.0):
+    calls = []
+    lock = threading.Lock()
+
+    def status(url):
+        with lock:
+            calls.append(url)
+        time.sleep(delay)
+        return 200 if url in ok_urls or not url.rsplit("/", 1)[1].startswith("sh") else 404
+    return status, calls
+
+def test_probes_stop_at_first_200_per_section():
+    base = "https://ganjoor.net"
+    status, calls = _site({f"{base}/hafez/ghazal/sh1", f"{base}/saadi/golestan/sh5"})
+    results = {r.book_or_style: r for r in probe_sections(
+        [("hafez", "ghazal"), ("saadi", "golestan"), ("iraj", "ghataat")], [1, 2, 5, 10],
+        workers=1, rate_ms=0, status=status)}
+    assert results["ghazal"].has_sh_pages and results["golestan"].has_sh_pages
+    assert not results["ghataat"].has_sh_pages
+    assert all(r.section_page_exists for r in results.values())
+    # one worker: hafez stops after sh1, saadi after sh5, iraj tries every sample
+    assert [u for u in calls if "/hafez/" in u and "/sh" in u] == [f"{base}/hafez/ghazal/sh1"]
+    assert len([u for u in calls if "/saadi/" in u and "/sh" in u]) == 3
+    assert len([u for u in calls if "/iraj/" in u and "/sh" in u]) == 4
+    assert list(results["ghataat"].status_by_url.values()).count(404) == 4
+
+def test_results_stream_in_completion_order_and_run_in_parallel():
+    status, calls = _site(set(), delay=0.05)
+    sections = [("hafez", f"s{i}") for i in range(8)]
+    t0 = time.monotonic()
+    got = list(probe_sections(sections, [1, 2], workers=8, rate_ms=0, status=status))
+    elapsed = time.monotonic() - t0
+    assert sorted(r.book_or_style for r in got) == [f"s{i}" for i in range(8)]
+    assert len(calls) == 8 * 3
+    assert elapsed < 8 * 3 * 0.05 / 2  # far below the serial time
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import pytest
+import negative_index
+import url_builder
+import verdict_cache
+from benchmarks.fake_ganjoor import FakeGanjoor
+from negative_index import NegativeIndex
+from validator import probe_sections, probe_task
+from verdict_cache import VerdictCache, parse_ttl, probe_method, strip_verdict_args
+
+def _status(calls, ok=("sh1",)):
+    def status(url):
+        calls.append(url)
+        last = url.rsplit("/", 1)[1]
+        return 200 if last in ok or not last.startswith("sh") else 404
+    return status
+
+def test_parse_ttl_units():
+    assert parse_ttl("45") == 45 and parse_ttl("90m") == 5400
+    assert parse_ttl("12h") == 43200 and parse_ttl("7d") == 7 * 86400
+    with pytest.raises(ValueError):
+        parse_ttl("soon")
+
+def test_verdicts_persist_and_expire():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "verdicts.json")
+        calls = []
+        probe = lambda: (calls.append(1) or "sh_pages", {"https://x/sh1": 200})
+        VerdictCache(path, save_every=1).cached("hafez", "ghazal", "text", probe)
+        again = VerdictCache(path).cached("hafez", "/ghazal/", "text", probe)
+        assert len(calls) == 1 and again.mode == "sh_pages" and again.evidence == {"https://x/sh1": 200}
+        # another method is a separate verdict
+        VerdictCache(path).cached("hafez", "ghazal", "http", probe)
+        assert len(calls) == 2
+        expired = VerdictCache(path, ttl_s=0)
+        expired.cached("hafez", "ghazal", "text", probe)
+        assert len(calls) == 3 and expired.misses == 1
+
+def test_unknown_is_not_stored():
+    with tempfile.TemporaryDirectory() as d:
+        cache = VerdictCache(os.path.join(d, "verdicts.json"))
+        calls = []
+        probe = lambda: (calls.append(1) or "unknown", {})
+        cache.cached("hafez", "ghazal", "text", probe)
+        cache.cached("hafez", "ghazal", "text", probe)
+        assert len(calls) == 2
+
+def test_refresh_prefixes_only_reprobe_matching_sections_once():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "verdicts.json")
+        seed = VerdictCache(path)
+        for poet, sec in [("hafez", "ghazal"), ("hafez", "robaee"), ("attar", "divana/ghazal")]:
+            seed.put(poet, sec, "text", "sh_pages", {})
+        seed.save()
+        calls = []
+        probe = lambda: (calls.append(1) or "no_sh", {})
+        cache = VerdictCache(path, refresh=["hafez/ghazal", "attar"])
+        for poet, sec in [("hafez", "ghazal"), ("hafez", "robaee"), ("attar", "divana/ghazal")]:
+            cache.cached(poet, sec, "text", probe)
+        assert len(calls) == 2
+        # what this run probed is not refreshed a second time
+        assert cache.cached("hafez", "ghazal", "text", probe).mode == "no_sh" and len(calls) == 2
+        assert cache.get("hafez", "robaee", "text").mode == "sh_pages"
+
+def test_refresh_probes_past_the_negative_index(monkeypatch):
+    server = FakeGanjoor(poems=3).start()
+    monkeypatch.setattr(url_builder, "BASE_URL", server.base_url)
+    idx = NegativeIndex(None)
+    monkeypatch.setattr(negative_index, "_shared", idx)
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            idx.add(url_builder.build_poem_url("hafez", 1, "ghazal"))
+            stale = probe_task("hafez", "ghazal", [1], cache=VerdictCache(os.path.join(d, "a.json")))
+            assert not stale.has_sh_pages and server.requests["page"] == 1  # the landing page only
+            fresh = probe_task("hafez", "ghazal", [1], cache=VerdictCache(os.path.join(d, "b.json"), refresh=True))
+            assert fresh.has_sh_pages and server.requests["page"] == 3
+            idx.add(url_builder.build_poem_url("hafez", 2, "ghazal"))
+            res = list(probe_sections([("hafez", "ghazal")], [2], rate_ms=0,
+                                      cache=VerdictCache(os.path.join(d, "c.json"), refresh=["hafez/ghazal"])))
+            assert res[0].has_sh_pages and server.requests["page"] == 5
+    finally:
+        server.stop()
+
+def test_probe_sections_reuses_verdicts():
+    base = "https://ganjoor.net"
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "verdicts.json")
+        sections = [("hafez", "ghazal"), ("saadi", "golestan")]
+        calls = []
+        first = {r.book_or_style: r for r in probe_sections(
+            sections, [1, 2], workers=2, rate_ms=0, status=_status(calls), cache=VerdictCache(path, save_every=1))}
+        probed = len(calls)
+        assert probed > 0 and first["ghazal"].has_sh_pages
+        cache = VerdictCache(path)
+        second = {r.book_or_style: r for r in probe_sections(
+            sections, [1, 2], workers=2, rate_ms=0, status=_status(calls), cache=cache)}
+        assert len(calls) == probed and cache.hits == 2
+        assert second["ghazal"].has_sh_pages and second["golestan"].has_sh_pages
+        assert f"{base}/hafez/ghazal/sh1" in second["ghazal"].status_by_url
+        assert "cached verdict" in second["ghazal"].notes
+
+def test_probes_of_different_pages_keep_separate_verdicts():
+    assert probe_method("text", (1, 2, 5, 10)) == "text@1,2,5,10"
+    assert probe_method("text", [3], landing=True) == "text+landing@3"
+    calls = []
+    with tempfile.TemporaryDirectory() as d:
+        cache = VerdictCache(os.path.join(d, "verdicts.json"))
+        for method in (probe_method("text", [1, 2, 5, 10]), probe_method("text", [1, 2, 5, 10], landing=True),
+                       probe_method("text", [7], landing=True), probe_method("text", [1, 2, 5, 10])):
+            cache.cached("hafez", "ghazal", method, lambda: (calls.append(method) or "sh_pages", {}))
+    assert len(calls) == 3 and cache.hits == 1
+    # a validator run with other sh numbers probes again
+    with tempfile.TemporaryDirectory() as d:
+        cache = VerdictCache(os.path.join(d, "verdicts.json"))
+        list(probe_sections([("hafez", "ghazal")], [1, 2], rate_ms=0, status=_status(calls), cache=cache))
+        list(probe_sections([("hafez", "ghazal")], [5], rate_ms=0, status=_status(calls), cache=cache))
+        assert cache.hits == 0
+
+def test_writes_are_batched_until_save():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "verdicts.json")
+        cache = VerdictCache(path, save_every=3)
+        cache.put("hafez", "ghazal", "text", "sh_pages", {})
+        cache.put("hafez", "robaee", "text", "sh_pages", {})
+        assert not os.path.exists(path)
+        cache.put("hafez", "qaside", "text", "no_sh", {})
+        assert VerdictCache(path).get("hafez", "qaside", "text").mode == "no_sh"
+        cache.put("saadi", "golestan", "text", "sh_pages", {})
+        cache.save()
+        assert VerdictCache(path).get("saadi", "golestan", "text") is not None
+
+def test_strip_verdict_args_keeps_positional_args(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        monkeypatch.setattr(verdict_cache, "_shared", VerdictCache(os.path.join(d, "verdicts.json")))
+        argv = ["run.py", "hafez", "--verdict-ttl=2h", "1", "--refresh-verdicts=hafez,attar/divana", "5"]
+        cache = strip_verdict_args(argv)
+        assert argv == ["run.py", "hafez", "1", "5"]
+        assert cache.ttl_s == 7200 and cache.refresh == ["hafez", "attar/divana"]
+        strip_verdict_args(["run.py", "--refresh-verdicts"])
+        assert cache.refresh is True